@@ -41,6 +41,23 @@ KEYFRAME_BOUNDARY_OFFSET_SECONDS = 0.1
 # These are added IN ADDITION to keyframes from the selection strategy.
 KEYFRAME_INTERVAL_SECONDS = 30 # <--- ADDED THIS LINE: Add a keyframe every 30 seconds
 
+# Keyframes are decoded in one forward pass over the video. If the next keyframe is
+# more than this many seconds ahead, the reader seeks instead of decoding every frame
+# in between (a seek decodes from the preceding keyframe of the stream, a few seconds)
+FRAME_EXTRACTION_SEEK_GAP_SECONDS = 10.0
+
+# If True, each video is decoded once: one ffmpeg process runs shot detection, writes the
+# compressed copy and pipes the keyframes to Python. Only used with the 'boundary' strategy,
+# whose keyframes are known while decoding; other strategies decode the video separately
+INGESTION_SINGLE_DECODE = True
+
+# Worker processes of parallel_ingestor.py. Every worker loads CLIP, YOLO and EasyOCR once
+# (a few GB of RAM each), so size this by memory as well as by cores
+INGESTION_WORKERS = 4
+
+# Torch/BLAS threads per ingestion worker (0 = CPU cores divided by the number of workers)
+INGESTION_THREADS_PER_WORKER = 0
+
 
 # --- Feature Extraction Settings ---
 # Confidence threshold for including a detected object (0.0 to 1.0)
@@ -54,6 +71,13 @@ MINIMUM_TEXT_EXTRACTION_CONFIDENCE = 0.3 # Example threshold
 # Make sure this line is here and spelled correctly!
 NUMBER_OF_DOMINANT_COLORS = 10 # (Keeping this line)
 
+# Keyframes encoded per CLIP forward pass (see scripts/benchmark_clip_image_batch.py for
+# the images/sec of each batch size on the ingestion hosts)
+CLIP_IMAGE_BATCH_SIZE = 16
+
+# Keyframes passed to the YOLO model per call
+OBJECT_DETECTION_BATCH_SIZE = 8
+
 
 # --- Database Settings ---
 # Connection details for your PostgreSQL database with the pgvector extension
@@ -0,0 +1,48 @@
+# --- START OF FILE analysis_report.py ---
+
+import os
+import json
+
+# Import settings (this module must stay light: parallel_ingestor writes reports without loading the models)
+from settings import ANALYZED_COMPRESSED_VIDEO_FILENAME
+from video_processors_io import get_current_processing_time
+
+
+def build_error_report(video_id: str, original_video_filename: str, error_msg: str) -> dict:
+    """Builds the minimal JSON report of a video whose analysis failed."""
+    return {
+        'video_id': video_id,
+        'original_filename': original_video_filename,
+        'compressed_filename': ANALYZED_COMPRESSED_VIDEO_FILENAME,
+        'duration_seconds': 0, # Use default values as analysis failed early
+        'fps': 0,
+        'compressed_file_size_bytes': 0,
+        'processing_date_utc': get_current_processing_time().isoformat(),
+        'scene_change_timestamps': [0.0], # Indicate start time
+        'keyframes_analyzed_count': 0,
+        'analyzed_keyframes': [], # Empty list
+        'analysis_status': 'failed', # Status indicates failure
+        'error_message': str(error_msg) # Store the error message
+    }
+
+
+def create_error_report(video_id: str, original_video_filename: str, report_path: str, error_msg: str):
+    """Creates a minimal JSON report indicating that analysis failed."""
+    print(f"Creating error report for {video_id}: {error_msg}")
+    # Ensure parent directory exists before writing report
+    report_dir = os.path.dirname(report_path)
+    if report_dir and not os.path.exists(report_dir):
+        try:
+            os.makedirs(report_dir, exist_ok=True) # Use exist_ok=True for safety
+        except Exception as e:
+            print(f"Error creating directory for error report {report_dir}: {e}")
+
+    try:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(build_error_report(video_id, original_video_filename, error_msg), f, indent=4)
+        print(f"  Saved error report to: {report_path}")
+    except Exception as e:
+        # If even saving the error report fails... print and give up
+        print(f"  CRITICAL ERROR: Could not save error report JSON for {video_id}: {e}")
+
+# --- END OF FILE analysis_report.py ---
@@ -0,0 +1,216 @@
+# --- START OF FILE parallel_ingestor.py ---
+
+import os
+import json
+import time
+import argparse
+import multiprocessing as mp
+import queue # For queue.Empty
+from typing import Dict, List
+
+# Import settings (this module must stay light: the models are loaded in the workers only)
+from settings import (
+    DATASET_ROOT_DIR, ORIGINAL_VIDEO_FILENAME, EXTRACTED_FEATURES_JSON_FILENAME,
+    INGESTION_WORKERS, INGESTION_THREADS_PER_WORKER
+)
+from video_processors_io import get_all_video_identifiers
+from analysis_report import create_error_report
+
+# How often (seconds) the runner checks that its workers are still alive
+WORKER_POLL_SECONDS = 1.0
+
+
+def format_duration(seconds: float) -> str:
+    """Formats seconds as e.g. '1h02m', '3m05s' or '42s'."""
+    seconds = int(max(seconds, 0))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+
+def read_analysis_status(video_id: str) -> str:
+    """Reads the analysis_status of a video's JSON report ('missing' if there is no readable report)."""
+    report_path = os.path.join(DATASET_ROOT_DIR, video_id, EXTRACTED_FEATURES_JSON_FILENAME)
+    try:
+        with open(report_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('analysis_status', 'unknown')
+    except Exception:
+        return 'missing'
+
+
+def ingestion_worker(worker_index: int, task_queue, result_queue, threads_per_worker: int):
+    """
+    Worker process: loads CLIP/YOLO/EasyOCR once, then analyzes videos from the task
+    queue until it receives None. An exception in one video is reported and the worker
+    moves on to the next video.
+    """
+    # Limit the math library threads before torch is imported, so N workers share the cores
+    if threads_per_worker > 0:
+        for variable in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+            os.environ[variable] = str(threads_per_worker)
+
+    # Importing video_ingestor loads the models (feature_extractors_gpu); they stay resident
+    import video_ingestor
+    if threads_per_worker > 0:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    result_queue.put(('ready', worker_index, None, None, 0.0, None))
+
+    while True:
+        video_id = task_queue.get()
+        if video_id is None:
+            break
+        result_queue.put(('started', worker_index, video_id, None, 0.0, None))
+        start_time = time.time()
+        error = None
+        try:
+            video_ingestor.analyze_and_ingest_single_video(video_id)
+        except Exception as e:
+            error = str(e)
+            print(f"FATAL ERROR processing video {video_id} in worker {worker_index}: {e}")
+            report_path = os.path.join(DATASET_ROOT_DIR, video_id, EXTRACTED_FEATURES_JSON_FILENAME)
+            create_error_report(video_id, ORIGINAL_VIDEO_FILENAME.format(video_id), report_path,
+                                f"Fatal error during analysis: {e}")
+        status = 'failed' if error else read_analysis_status(video_id)
+        result_queue.put(('done', worker_index, video_id, status, time.time() - start_time, error))
+
+
+def start_worker(context, worker_index: int, task_queue, result_queue, threads_per_worker: int):
+    """Starts one ingestion worker process."""
+    process = context.Process(
+        target=ingestion_worker, args=(worker_index, task_queue, result_queue, threads_per_worker),
+        name=f"ingestion-worker-{worker_index}", daemon=True
+    )
+    process.start()
+    return process
+
+
+def print_progress(done: int, total: int, video_id: str, status: str, seconds: float, started_at: float):
+    """Prints one progress line with throughput and ETA."""
+    elapsed = time.time() - started_at
+    rate = done / elapsed if elapsed > 0 else 0.0
+    eta = (total - done) / rate if rate > 0 else 0.0
+    print(f"[{done}/{total}] {video_id}: {status} in {seconds:.1f}s | elapsed {format_duration(elapsed)} | "
+          f"{rate * 60:.2f} videos/min | ETA {format_duration(eta)}")
+
+
+def run_parallel_ingestion(video_ids: List[str], workers: int, threads_per_worker: int = 0) -> Dict[str, dict]:
+    """
+    Analyzes videos in parallel worker processes.
+
+    Every worker loads the models once and takes videos from a shared queue. A video
+    that raises is recorded as failed by its worker. A worker that dies (e.g. killed
+    for running out of memory) is replaced, and the video it was analyzing gets an
+    error report; the other videos are not affected.
+
+    Args:
+        video_ids: Videos to analyze
+        workers: Number of worker processes
+        threads_per_worker: Torch/BLAS threads per worker (0 = library default)
+
+    Returns:
+        {video_id: {'status', 'seconds', 'error'}}
+    """
+    # 'spawn' gives every worker a fresh interpreter: no forked torch/CUDA state
+    context = mp.get_context('spawn')
+    task_queue = context.Queue()
+    result_queue = context.Queue()
+    for video_id in video_ids:
+        task_queue.put(video_id)
+    workers = max(1, min(workers, len(video_ids)))
+    for _ in range(workers):
+        task_queue.put(None)
+
+    processes = {index: start_worker(context, index, task_queue, result_queue, threads_per_worker)
+                 for index in range(workers)}
+    in_flight = {} # worker index -> (video_id, start time)
+    results = {}
+    started_at = time.time()
+    print(f"Started {workers} ingestion workers for {len(video_ids)} videos.")
+
+    while len(results) < len(video_ids):
+        try:
+            event, worker_index, video_id, status, seconds, error = result_queue.get(timeout=WORKER_POLL_SECONDS)
+        except queue.Empty:
+            event = None
+
+        if event == 'ready':
+            print(f"  Worker {worker_index} loaded its models.")
+        elif event == 'started':
+            in_flight[worker_index] = (video_id, time.time())
+        elif event == 'done':
+            in_flight.pop(worker_index, None)
+            results[video_id] = {'status': status, 'seconds': seconds, 'error': error}
+            print_progress(len(results), len(video_ids), video_id, status, seconds, started_at)
+
+        # Replace workers that died without reporting their video
+        for index, process in list(processes.items()):
+            if process.is_alive():
+                continue
+            if process.exitcode == 0:
+                # Finished its queue; its last 'done' may still be on the way
+                if index not in in_flight:
+                    del processes[index]
+                continue
+            if index in in_flight:
+                video_id, video_started = in_flight.pop(index)
+                error = f"Worker process exited with code {process.exitcode}"
+                print(f"FATAL ERROR processing video {video_id}: {error}")
+                report_path = os.path.join(DATASET_ROOT_DIR, video_id, EXTRACTED_FEATURES_JSON_FILENAME)
+                create_error_report(video_id, ORIGINAL_VIDEO_FILENAME.format(video_id), report_path, error)
+                results[video_id] = {'status': 'failed', 'seconds': time.time() - video_started, 'error': error}
+                print_progress(len(results), len(video_ids), video_id, 'failed', time.time() - video_started, started_at)
+                # The dead worker never took its None: a replacement consumes one
+                processes[index] = start_worker(context, index, task_queue, result_queue, threads_per_worker)
+            else:
+                # Crashed between videos (e.g. while loading the models): not replaced
+                del processes[index]
+        if not processes and len(results) < len(video_ids):
+            print("Error: all ingestion workers exited before the queue was finished.")
+            break
+
+    for process in processes.values():
+        process.join(timeout=30)
+    return results
+
+
+def print_summary(results: Dict[str, dict], total_seconds: float):
+    """Prints the per-status counts, the wall time and the failed videos."""
+    counts = {}
+    for result in results.values():
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    video_seconds = sum(result['seconds'] for result in results.values())
+    print("\n" + "="*60)
+    print(f"Analyzed {len(results)} videos in {format_duration(total_seconds)} "
+          f"({format_duration(video_seconds)} of per-video time, {video_seconds / max(total_seconds, 1e-9):.1f}x parallel speedup)")
+    for status, count in sorted(counts.items()):
+        print(f"  {status}: {count}")
+    failed = [video_id for video_id, result in results.items() if result['status'] == 'failed']
+    if failed:
+        print(f"  Failed videos: {', '.join(sorted(failed))}")
+    print("="*60)
+
+
+# --- Main execution block ---
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Analyze all videos of the dataset in parallel worker processes")
+    parser.add_argument('--workers', type=int, default=INGESTION_WORKERS, help="Worker processes (default: INGESTION_WORKERS)")
+    parser.add_argument('--threads-per-worker', type=int, default=INGESTION_THREADS_PER_WORKER,
+                        help="Torch/BLAS threads per worker (0 = cores / workers)")
+    parser.add_argument('--videos', nargs='*', default=None, help="Only these video IDs (default: all)")
+    args = parser.parse_args()
+
+    video_identifiers = args.videos or get_all_video_identifiers(DATASET_ROOT_DIR)
+    if not video_identifiers:
+        print("No valid video directories found in the dataset root directory.")
+    else:
+        threads = args.threads_per_worker or max(1, (os.cpu_count() or 1) // max(args.workers, 1))
+        start_time = time.time()
+        results = run_parallel_ingestion(video_identifiers, args.workers, threads)
+        print_summary(results, time.time() - start_time)
+
+# --- END OF FILE parallel_ingestor.py ---
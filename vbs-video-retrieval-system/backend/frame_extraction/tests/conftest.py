@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The ingestion modules import each other and the settings as top-level modules
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+for subdir in ('config', 'frame_extraction', 'image_encoding'):
+    sys.path.insert(0, os.path.join(backend_dir, subdir))
@@ -0,0 +1,34 @@
+"""
+Error reports of failed videos (analysis_report.py), shared by both ingestion runners.
+"""
+
+import json
+
+import pytest
+
+pytest.importorskip('cv2')
+
+from analysis_report import build_error_report, create_error_report
+from settings import ANALYZED_COMPRESSED_VIDEO_FILENAME
+
+
+def test_error_report_has_the_fields_of_a_completed_report():
+    report = build_error_report('video_001', 'video_001.mp4', "Worker process exited with code -9")
+    assert set(report) == {
+        'video_id', 'original_filename', 'compressed_filename', 'duration_seconds', 'fps',
+        'compressed_file_size_bytes', 'processing_date_utc', 'scene_change_timestamps',
+        'keyframes_analyzed_count', 'analyzed_keyframes', 'analysis_status', 'error_message',
+    }
+    assert report['analysis_status'] == 'failed'
+    assert report['error_message'] == "Worker process exited with code -9"
+    assert report['compressed_filename'] == ANALYZED_COMPRESSED_VIDEO_FILENAME
+    assert (report['keyframes_analyzed_count'], report['analyzed_keyframes']) == (0, [])
+    assert report['scene_change_timestamps'] == [0.0]
+
+
+def test_create_error_report_writes_json_into_a_new_directory(tmp_path):
+    report_path = tmp_path / 'video_002' / 'report.json'
+    create_error_report('video_002', 'video_002.mp4', str(report_path), ValueError("decoder crashed"))
+    report = json.loads(report_path.read_text(encoding='utf-8'))
+    assert report['video_id'] == 'video_002'
+    assert report['error_message'] == "decoder crashed"
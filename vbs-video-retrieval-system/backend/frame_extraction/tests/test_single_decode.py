@@ -0,0 +1,168 @@
+"""
+Single-decode ingestion pass (video_processors_io.py) without FFMPEG.
+
+The filtergraph and commands are checked as strings, the log parsers on
+canned scdet / showinfo stderr, and SingleDecodePass.frames() runs against
+a stand-in process that writes showinfo lines to stderr and raw RGB frames
+to stdout the way FFMPEG does.
+"""
+
+import json
+import sys
+
+import pytest
+
+pytest.importorskip('cv2')
+
+import video_processors_io
+from video_processors_io import (
+    LAST_FRAME_WINDOW_SECONDS, SHOWINFO_PTS_TIME_PATTERN, SingleDecodePass,
+    build_single_decode_filtergraph, parse_shot_change_timestamps
+)
+
+# Excerpt of the stderr of a single-decode pass (FFMPEG 6)
+SINGLE_DECODE_STDERR = """\
+Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'video.mp4':
+  Duration: 00:00:12.01, start: 0.000000, bitrate: 1205 kb/s
+[Parsed_showinfo_5 @ 0x55d0c8a3c2c0] config in time_base: 1/30000, frame_rate: 30000/1001
+[Parsed_showinfo_5 @ 0x55d0c8a3c2c0] n:   0 pts:      0 pts_time:0       duration:   1001 fmt:yuv420p
+[scdet @ 0x55d0c8a41a00] lavfi.scd.score: 34.712, lavfi.scd.time: 4.1041
+[Parsed_showinfo_5 @ 0x55d0c8a3c2c0] n:   1 pts: 123123 pts_time:4.1041  duration:   1001 fmt:yuv420p
+[scdet @ 0x55d0c8a41a00] lavfi.scd.score: 18.004, lavfi.scd.time: 9.8765
+[Parsed_showinfo_5 @ 0x55d0c8a3c2c0] n:   2 pts: 296296 pts_time:9.8765  duration:   1001 fmt:yuv420p
+frame=  360 fps=120 q=-0.0 Lsize=     120kB time=00:00:12.01 bitrate=  81.9kbits/s speed=4.01x
+"""
+
+# Stand-in for FFMPEG: scdet and showinfo lines on stderr, one raw frame per showinfo line on stdout
+FAKE_FFMPEG = """
+import json, sys
+spec = json.loads(sys.argv[1])
+for time in spec['cuts']:
+    sys.stderr.write(f"[scdet @ 0x1] lavfi.scd.score: 20.000, lavfi.scd.time: {time}\\n")
+for n, (time, value) in enumerate(spec['frames']):
+    sys.stderr.write(f"[Parsed_showinfo_5 @ 0x2] n:{n:4d} pts:{int(time * 1000):7d} pts_time:{time} duration:1\\n")
+    sys.stderr.flush()
+    sys.stdout.buffer.write(bytes([value]) * spec['frame_bytes'])
+    sys.stdout.flush()
+sys.exit(spec['exit_code'])
+"""
+
+
+def fake_ffmpeg(frames, cuts=(), exit_code=0, width=4, height=2):
+    spec = {'frames': frames, 'cuts': list(cuts), 'exit_code': exit_code, 'frame_bytes': width * height * 3}
+    return [sys.executable, '-c', FAKE_FFMPEG, json.dumps(spec)]
+
+
+@pytest.fixture
+def decode_pass(tmp_path):
+    return SingleDecodePass('video.mp4', str(tmp_path / 'ffmpeg.log'), str(tmp_path / 'compressed.mp4'), 4, 2)
+
+
+# --- Filtergraph and commands ----------------------------------------------------
+
+def test_filtergraph_splits_one_decode_into_encode_and_keyframe_outputs(monkeypatch):
+    monkeypatch.setattr(video_processors_io, 'SCENE_CHANGE_THRESHOLD', 7.5)
+    monkeypatch.setattr(video_processors_io, 'KEYFRAME_INTERVAL_SECONDS', 30)
+    graph = build_single_decode_filtergraph(640, 360)
+    chains = graph.split(';')
+
+    assert chains[0] == "[0:v]scdet=s=0:t=7.5,split=3[enc][cuts][grid]"
+    assert chains[1] == "[cuts]metadata=mode=select:key=lavfi.scd.time[cutframes]"
+    # The first frame, then the first frame of every 30 second interval
+    assert chains[2] == ("[grid]select='eq(n\\,0)+gte(floor(t/30.0)\\,floor(prev_selected_t/30.0)+1)'"
+                         "[gridframes]")
+    assert chains[3] == "[cutframes][gridframes]interleave=nb_inputs=2,showinfo,scale=640:360,format=rgb24[raw]"
+
+
+@pytest.mark.parametrize('interval', [None, 0])
+def test_filtergraph_without_interval_keyframes(monkeypatch, interval):
+    monkeypatch.setattr(video_processors_io, 'KEYFRAME_INTERVAL_SECONDS', interval)
+    assert "[grid]select='eq(n\\,0)'[gridframes]" in build_single_decode_filtergraph(320, 240).split(';')
+
+
+def test_build_command_maps_both_outputs(decode_pass):
+    command = decode_pass.build_command()
+    assert command[command.index('-i') + 1] == 'video.mp4'
+    assert command[command.index('-filter_complex') + 1] == build_single_decode_filtergraph(4, 2)
+    # Output 0: the compressed video with the audio, if any
+    first_output = command.index(decode_pass.output_compressed_path)
+    assert command[command.index('-map') + 1] == '[enc]'
+    assert command[first_output - 1] == '-y'
+    # Output 1: raw RGB keyframes on stdout, one per showinfo line
+    assert command[first_output + 1:first_output + 3] == ['-map', '[raw]']
+    assert command[-1] == 'pipe:1' and command[command.index('-pix_fmt') + 1] == 'rgb24'
+
+
+def test_build_last_frame_command_keeps_the_main_pass_timestamps(decode_pass):
+    command = decode_pass.build_last_frame_command()
+    assert command[command.index('-sseof') + 1] == f'-{LAST_FRAME_WINDOW_SECONDS}'
+    assert '-copyts' in command and '-start_at_zero' in command
+    assert command.index('-sseof') < command.index('-i')
+    assert command[command.index('-vf') + 1] == 'showinfo,scale=4:2,format=rgb24'
+
+
+# --- Log parsing -----------------------------------------------------------------
+
+def test_parse_shot_change_timestamps_from_a_single_decode_log():
+    assert parse_shot_change_timestamps(SINGLE_DECODE_STDERR) == [0.0, 4.1041, 9.8765]
+
+
+def test_parse_shot_change_timestamps_old_format_unsorted_and_empty():
+    old_format = "[scdet @ 0x1] lavfi.scd.time: 12.5\n[scdet @ 0x1] lavfi.scd.time: 3\n"
+    assert parse_shot_change_timestamps(old_format) == [0.0, 3.0, 12.5]
+    # 0.0 is always present, once
+    assert parse_shot_change_timestamps("[scdet @ 0x1] lavfi.scd.time: 0.0\n") == [0.0]
+    assert parse_shot_change_timestamps("") == [0.0]
+
+
+def test_showinfo_pattern_reads_the_pts_time_of_frame_lines_only():
+    times = [float(match.group(1)) for match in map(SHOWINFO_PTS_TIME_PATTERN.search, SINGLE_DECODE_STDERR.splitlines())
+             if match]
+    assert times == [0.0, 4.1041, 9.8765]
+    negative = "[Parsed_showinfo_0 @ 0xabc] n:   0 pts:  -1001 pts_time:-0.0333667 duration: 1001"
+    assert float(SHOWINFO_PTS_TIME_PATTERN.search(negative).group(1)) == pytest.approx(-0.0333667)
+
+
+# --- SingleDecodePass.frames() ---------------------------------------------------
+
+def test_frames_pairs_every_piped_frame_with_its_timestamp(decode_pass, monkeypatch, tmp_path):
+    # 4.0 is both a shot change and an interval frame: FFMPEG pipes it twice
+    monkeypatch.setattr(decode_pass, 'build_command',
+                        lambda: fake_ffmpeg([[0.0, 10], [4.0, 20], [4.0, 20], [30.0, 30]], cuts=[4.0]))
+    monkeypatch.setattr(decode_pass, 'build_last_frame_command',
+                        lambda: fake_ffmpeg([[40.5, 40], [41.0, 41]]))
+
+    frames = list(decode_pass.frames())
+    assert [timestamp for timestamp, _ in frames] == [0.0, 4.0, 30.0, 41.0]
+    assert [image.size for _, image in frames] == [(4, 2)] * 4
+    assert [image.getpixel((0, 0)) for _, image in frames] == [(10, 10, 10), (20, 20, 20), (30, 30, 30), (41, 41, 41)]
+    assert decode_pass.returncode == 0
+    assert decode_pass.shot_timestamps == [0.0, 4.0]
+    assert 'lavfi.scd.time: 4.0' in (tmp_path / 'ffmpeg.log').read_text(encoding='utf-8')
+
+
+def test_last_frame_is_not_repeated(decode_pass, monkeypatch):
+    monkeypatch.setattr(decode_pass, 'build_command', lambda: fake_ffmpeg([[0.0, 1], [12.0, 2]]))
+    monkeypatch.setattr(decode_pass, 'build_last_frame_command', lambda: fake_ffmpeg([[11.5, 3], [12.0, 2]]))
+    assert [timestamp for timestamp, _ in decode_pass.frames()] == [0.0, 12.0]
+
+
+def test_failed_pass_reports_its_exit_code_and_skips_the_last_frame(decode_pass, monkeypatch):
+    monkeypatch.setattr(decode_pass, 'build_command', lambda: fake_ffmpeg([[0.0, 1]], cuts=[2.5], exit_code=1))
+    monkeypatch.setattr(decode_pass, 'build_last_frame_command',
+                        lambda: pytest.fail("the last frame must not be read after a failed pass"))
+
+    assert [timestamp for timestamp, _ in decode_pass.frames()] == [0.0]
+    assert decode_pass.returncode == 1
+    assert decode_pass.shot_timestamps == [0.0, 2.5]
+
+
+def test_consumer_stopping_early_does_not_leave_ffmpeg_running(decode_pass, monkeypatch):
+    monkeypatch.setattr(decode_pass, 'build_command',
+                        lambda: fake_ffmpeg([[float(n), n] for n in range(200)], width=64, height=64))
+    decode_pass.width, decode_pass.height = 64, 64
+    frames = decode_pass.frames()
+    assert next(frames)[0] == 0.0
+    frames.close()
+    # The process was killed and waited for instead of blocking on a full pipe
+    assert decode_pass.returncode is not None and decode_pass.returncode != 0
@@ -3,6 +3,7 @@
 import os
 import json
 import time
+from typing import Iterable, Iterator, List, Tuple, Union
 from PIL import Image # Need this type
 from datetime import datetime # Need this type
 import shutil # Needed for deleting folders
@@ -10,14 +11,17 @@ import shutil # Needed for deleting folders
 # Import functions and settings from our modules
 from settings import (
     DATASET_ROOT_DIR, ORIGINAL_VIDEO_FILENAME, EXTRACTED_FEATURES_JSON_FILENAME,
-    KEYFRAME_IMAGES_SUBDIR, ANALYZED_COMPRESSED_VIDEO_FILENAME
+    KEYFRAME_IMAGES_SUBDIR, ANALYZED_COMPRESSED_VIDEO_FILENAME,
+    KEYFRAME_SELECTION_STRATEGY, INGESTION_SINGLE_DECODE, CLIP_IMAGE_BATCH_SIZE
 )
 from video_processors_io import (
     get_all_video_identifiers,
     run_ffmpeg_shot_detection,
     get_video_duration_and_fps,
     select_keyframes_from_shots,
-    extract_single_frame_image,
+    iter_keyframe_images,
+    get_video_frame_size,
+    SingleDecodePass,
     compress_video_for_storage,
     get_file_size_bytes,
     get_current_processing_time,
@@ -25,9 +29,12 @@ from video_processors_io import (
     # and imported from there.
     clean_previous_analysis_files # <--- Import the cleanup function
 )
+from analysis_report import create_error_report
 from feature_extractors_gpu import (
     get_image_clip_embedding,
+    get_image_clip_embeddings_batch,
     detect_objects_with_details,
+    detect_objects_with_details_batch,
     extract_text_with_details,
     get_image_dominant_and_average_colors,
     convert_numpy_types # <--- Import the numpy converter helper
@@ -44,6 +51,9 @@ def analyze_and_ingest_single_video(video_id: str):
     6. Records video-level metadata (size, date).
     7. Saves frame images and extracts features (embeddings, objects, text, colors) for each keyframe.
     8. Saves all extracted data and video-level info to a JSON report.
+
+    With INGESTION_SINGLE_DECODE and the 'boundary' strategy, steps 3-7 share a single
+    decode of the video (SingleDecodePass) instead of decoding it once per step.
     """
     print(f"\n--- Starting analysis for video: {video_id} ---")
     start_time = time.time()
@@ -93,6 +103,41 @@ def analyze_and_ingest_single_video(video_id: str):
         return
 
 
+    # --- Steps 2-6 in one decode: shot detection, compression and keyframes ---
+    # The 'boundary' keyframes are known while decoding, so one FFMPEG process can do all three
+    if INGESTION_SINGLE_DECODE and KEYFRAME_SELECTION_STRATEGY == 'boundary':
+        width, height = get_video_frame_size(original_video_path)
+        if width > 0 and height > 0:
+            print(f"  Running single-decode pass (shot detection, compression, keyframes)...")
+            decode_pass = SingleDecodePass(original_video_path, ffmpeg_log_path, compressed_video_path, width, height)
+            analyzed_keyframes_data = []
+            for batch in iter_batches(decode_pass.frames(), CLIP_IMAGE_BATCH_SIZE):
+                print(f"    Processing keyframes at {batch[0][0]:.2f}s-{batch[-1][0]:.2f}s ({len(batch)} frames)...")
+                analyzed_keyframes_data.extend(analyze_keyframe_batch(video_id, batch))
+
+            if decode_pass.returncode == 0:
+                compressed_file_size = get_file_size_bytes(compressed_video_path)
+                print(f"  Compressed video size: {compressed_file_size} bytes.")
+                save_analysis_report(video_id, original_video_filename, extracted_data_path, video_duration, fps,
+                                     compressed_file_size, decode_pass.shot_timestamps, analyzed_keyframes_data)
+                print(f"--- Finished analysis for video: {video_id} in {time.time() - start_time:.2f} seconds ---")
+                return
+            # The shot changes, compressed video and keyframes may be incomplete: redo them separately.
+            # The separate passes select their own keyframe timestamps and the cleanup below deletes the
+            # saved keyframe images, so the keyframes analyzed so far cannot be reused
+            print(f"  Warning: Single-decode pass failed (FFMPEG exit code {decode_pass.returncode}); "
+                  f"discarding the {len(analyzed_keyframes_data)} keyframes analyzed so far (CLIP, YOLO, OCR) "
+                  f"and falling back to separate decoding passes.")
+            clean_previous_analysis_files(video_dir_path, extracted_data_path, compressed_video_path,
+                                          keyframe_images_save_dir_full, ffmpeg_log_path)
+            try:
+                os.makedirs(keyframe_images_save_dir_full, exist_ok=True)
+            except Exception as e:
+                print(f"Error creating keyframe images directory {keyframe_images_save_dir_full}: {e}. Analysis will continue, but images might not save.")
+        else:
+            print(f"  Warning: Could not get the frame size of {video_id}; falling back to separate decoding passes.")
+
+
     print(f"  Running shot detection...")
     try:
         shot_boundary_timestamps = run_ffmpeg_shot_detection(original_video_path, ffmpeg_log_path)
@@ -164,141 +209,217 @@ def analyze_and_ingest_single_video(video_id: str):
     print(f"  Extracting features from {len(keyframe_timestamps_list)} keyframes and saving images...")
     analyzed_keyframes_data = [] # List to store data for each processed keyframe
 
-    # Process each selected timestamp
-    for i, timestamp in enumerate(keyframe_timestamps_list):
-        # Ensure timestamp is within bounds
-        max_timestamp = video_duration - (1.0/fps if fps > 0 else 0)
-        timestamp = max(0.0, min(timestamp, max_timestamp))
+    # Ensure timestamps are within bounds (clamping keeps them sorted)
+    max_timestamp = video_duration - (1.0/fps if fps > 0 else 0)
+    clamped_timestamps = [max(0.0, min(timestamp, max_timestamp)) for timestamp in keyframe_timestamps_list]
 
-        print(f"    Processing keyframe {i+1}/{len(keyframe_timestamps_list)} at {timestamp:.2f}s...")
+    # Process the selected timestamps in batches; the frames are decoded in one pass over the video
+    processed = 0
+    for batch in iter_batches(iter_keyframe_images(original_video_path, clamped_timestamps, fps), CLIP_IMAGE_BATCH_SIZE):
+        print(f"    Processing keyframes {processed+1}-{processed+len(batch)}/{len(keyframe_timestamps_list)} "
+              f"at {batch[0][0]:.2f}s-{batch[-1][0]:.2f}s...")
+        analyzed_keyframes_data.extend(analyze_keyframe_batch(video_id, batch))
+        processed += len(batch)
 
-        # Create a unique identifier for this specific frame within the video
-        # Using timestamp in milliseconds provides a very high chance of uniqueness
-        frame_unique_id = f"frame_{int(timestamp * 1000):012d}" # e.g., frame_000000001234 (unique within video)
 
-        # Define paths for the keyframe image
-        frame_img_filename = f'{frame_unique_id}.jpeg'
-        # Relative path from DATASET_ROOT_DIR to the image file
-        keyframe_image_path_relative_to_dataset_root = os.path.join(video_id, KEYFRAME_IMAGES_SUBDIR, frame_img_filename)
-        frame_image_path_full = os.path.join(DATASET_ROOT_DIR, keyframe_image_path_relative_to_dataset_root) # Full path to save the file
+    # --- Steps 7 and 8: Compile and save the report ---
+    save_analysis_report(video_id, original_video_filename, extracted_data_path, video_duration, fps,
+                         compressed_file_size, shot_boundary_timestamps, analyzed_keyframes_data)
 
 
-        # Extract the frame image using OpenCV
-        frame_image = extract_single_frame_image(original_video_path, timestamp)
+    end_time = time.time()
+    print(f"--- Finished analysis for video: {video_id} in {end_time - start_time:.2f} seconds ---")
 
-        # --- Save the Frame Image (If extracted successfully) ---
-        image_save_success = False
-        if frame_image is not None: # Only try to save if we got the image
-             try:
-                 # The directory for saving keyframe images was already created at the start
-                 # Save the image using Pillow
-                 frame_image.save(frame_image_path_full)
-                 image_save_success = True
-                 # print(f"    Saved frame image to {frame_image_path_full}") # Optional detailed print
-             except Exception as e:
-                 print(f"    Warning: Could not save frame image {frame_image_path_full}: {e}")
-                 image_save_success = False
 
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    """Groups an iterable (e.g. a frame generator) into lists of up to batch_size items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
-        # --- Extract Features (If image was extracted) ---
-        # Initialize all feature variables to defaults in case extraction fails
-        clip_embedding = None
-        detected_objects_detailed = []
-        detected_object_names_list = []
-        extracted_text_detailed = []
-        extracted_words_list = []
-        dominant_colors_info = []
-        average_color_rgb = [0, 0, 0] # Default to black
 
+def analyze_keyframe_batch(video_id: str, frames: List[Tuple[float, Union[Image.Image, None]]]) -> List[dict]:
+    """
+    Analyzes a batch of (timestamp, image) keyframes. The CLIP embeddings and YOLO detections
+    of the batch are computed in batched model calls; the other features are extracted per frame.
+    Returns the moment data entries of the frames that could be extracted.
+    """
+    images = [frame_image for _, frame_image in frames if frame_image is not None]
+    embeddings, valid = None, None
+    if images:
+        try:
+            encoded = get_image_clip_embeddings_batch(images)
+            if encoded is not None:
+                embeddings, valid = encoded
+        except Exception as e:
+            print(f"    Error in batched CLIP encoding: {e}. Encoding the frames one by one.")
+    detections = detect_objects_with_details_batch(images) if images else []
 
-        if frame_image is not None: # Only try to extract features if we got the image
-            try:
-                # Get image embedding (CLIP)
+    entries = []
+    image_index = 0
+    for timestamp, frame_image in frames:
+        clip_embedding = None
+        detected_objects = None
+        if frame_image is not None:
+            if embeddings is not None and valid[image_index]:
+                # Near-zero embeddings are zero rows, as get_image_clip_embedding returns them
+                clip_embedding = embeddings[image_index].tolist()
+            # A frame CLIP could not load gets no embedding (analyze_keyframe retries it on its own)
+            detected_objects = detections[image_index]
+            image_index += 1
+        moment_data_entry = analyze_keyframe(video_id, timestamp, frame_image, clip_embedding, detected_objects)
+        if moment_data_entry is not None:
+            entries.append(moment_data_entry)
+    return entries
+
+
+def analyze_keyframe(video_id: str, timestamp: float, frame_image: Union[Image.Image, None],
+                     precomputed_clip_embedding: Union[List[float], None] = None,
+                     precomputed_detected_objects: Union[List[dict], None] = None) -> Union[dict, None]:
+    """
+    Saves one keyframe image and extracts its features (embedding, objects, text, colors).
+    The CLIP embedding and object detections are computed here unless they are given
+    (precomputed_clip_embedding / precomputed_detected_objects).
+    Returns the moment data entry for the report, or None if the frame could not be extracted.
+    """
+    # Create a unique identifier for this specific frame within the video
+    # Using timestamp in milliseconds provides a very high chance of uniqueness
+    frame_unique_id = f"frame_{int(timestamp * 1000):012d}" # e.g., frame_000000001234 (unique within video)
+
+    # Define paths for the keyframe image
+    frame_img_filename = f'{frame_unique_id}.jpeg'
+    # Relative path from DATASET_ROOT_DIR to the image file
+    keyframe_image_path_relative_to_dataset_root = os.path.join(video_id, KEYFRAME_IMAGES_SUBDIR, frame_img_filename)
+    frame_image_path_full = os.path.join(DATASET_ROOT_DIR, keyframe_image_path_relative_to_dataset_root) # Full path to save the file
+
+
+    # --- Save the Frame Image (If extracted successfully) ---
+    image_save_success = False
+    if frame_image is not None: # Only try to save if we got the image
+         try:
+             # The directory for saving keyframe images was already created at the start
+             # Save the image using Pillow
+             frame_image.save(frame_image_path_full)
+             image_save_success = True
+             # print(f"    Saved frame image to {frame_image_path_full}") # Optional detailed print
+         except Exception as e:
+             print(f"    Warning: Could not save frame image {frame_image_path_full}: {e}")
+             image_save_success = False
+
+
+    # --- Extract Features (If image was extracted) ---
+    # Initialize all feature variables to defaults in case extraction fails
+    clip_embedding = None
+    detected_objects_detailed = []
+    detected_object_names_list = []
+    extracted_text_detailed = []
+    extracted_words_list = []
+    dominant_colors_info = []
+    average_color_rgb = [0, 0, 0] # Default to black
+
+
+    if frame_image is not None: # Only try to extract features if we got the image
+        try:
+            # Get image embedding (CLIP)
+            clip_embedding = precomputed_clip_embedding
+            if clip_embedding is None:
                 clip_embedding = get_image_clip_embedding(frame_image)
-                # clip_embedding is None or list[float]
+            # clip_embedding is None or list[float]
 
-                # Detect objects (YOLO) - returns list of dicts with potential numpy types
+            # Detect objects (YOLO) - returns list of dicts with potential numpy types
+            detected_objects_detailed = precomputed_detected_objects
+            if detected_objects_detailed is None:
                 detected_objects_detailed = detect_objects_with_details(frame_image)
-                # Create a simple list of just object names for easier searching
-                detected_object_names_list = sorted(list(set([obj['name'].lower() for obj in detected_objects_detailed]))) # Get unique names, lowercase, sorted
+            # Create a simple list of just object names for easier searching
+            detected_object_names_list = sorted(list(set([obj['name'].lower() for obj in detected_objects_detailed]))) # Get unique names, lowercase, sorted
 
 
-                # Extract text (EasyOCR) - returns list of dicts with potential numpy types
-                extracted_text_detailed = extract_text_with_details(frame_image)
-                # Get a simple list of unique lowercase words for easier searching
-                all_words = []
-                for item in extracted_text_detailed:
-                    if isinstance(item, dict) and 'text' in item and isinstance(item['text'], str):
-                         # Basic split into words and clean punctuation
-                        words = [word.strip('.,!?;:"\'()[]{}\n').lower() for word in item['text'].split()]
-                        all_words.extend([word for word in words if word]) # Add non-empty words
+            # Extract text (EasyOCR) - returns list of dicts with potential numpy types
+            extracted_text_detailed = extract_text_with_details(frame_image)
+            # Get a simple list of unique lowercase words for easier searching
+            all_words = []
+            for item in extracted_text_detailed:
+                if isinstance(item, dict) and 'text' in item and isinstance(item['text'], str):
+                     # Basic split into words and clean punctuation
+                    words = [word.strip('.,!?;:"\'()[]{}\n').lower() for word in item['text'].split()]
+                    all_words.extend([word for word in words if word]) # Add non-empty words
 
-                extracted_words_list = sorted(list(set(all_words))) # Get unique lowercase words, sorted
+            extracted_words_list = sorted(list(set(all_words))) # Get unique lowercase words, sorted
 
 
-                # Get dominant and average colors - returns list of dicts and list[int], potentially with numpy types
-                dominant_colors_info, average_color_rgb = get_image_dominant_and_average_colors(frame_image)
+            # Get dominant and average colors - returns list of dicts and list[int], potentially with numpy types
+            dominant_colors_info, average_color_rgb = get_image_dominant_and_average_colors(frame_image)
 
 
-            except Exception as e:
-                print(f"    An error occurred during feature extraction for frame {frame_unique_id}: {e}. This frame might have incomplete data.")
-                # Continue processing, but acknowledge error for this frame
+        except Exception as e:
+            print(f"    An error occurred during feature extraction for frame {frame_unique_id}: {e}. This frame might have incomplete data.")
+            # Continue processing, but acknowledge error for this frame
 
 
-            # --- Compile Detailed Features Dictionary ---
-            # This dictionary holds data that will go into the JSONB column in the DB
-            # It contains potentially nested structures and numpy types
-            detailed_features_dict = {
-                 'detected_objects_detailed': detected_objects_detailed, # Full list from detector
-                 'extracted_text_detailed': extracted_text_detailed,     # Full list from OCR
-                 'dominant_colors_info': dominant_colors_info            # Full list of dominant colors
-            }
+        # --- Compile Detailed Features Dictionary ---
+        # This dictionary holds data that will go into the JSONB column in the DB
+        # It contains potentially nested structures and numpy types
+        detailed_features_dict = {
+             'detected_objects_detailed': detected_objects_detailed, # Full list from detector
+             'extracted_text_detailed': extracted_text_detailed,     # Full list from OCR
+             'dominant_colors_info': dominant_colors_info            # Full list of dominant colors
+        }
 
-            # --- NEW: Convert numpy types in the detailed features dictionary ---
-            # Use the helper function to convert any numpy types to standard Python types
-            # This needs to be done *before* saving to JSON later and before putting into moment_data_entry
-            # as moment_data_entry also gets saved to JSON eventually (as part of the main report).
-            # Call convert_numpy_types on the dictionary itself
-            cleaned_detailed_features = convert_numpy_types(detailed_features_dict)
+        # --- NEW: Convert numpy types in the detailed features dictionary ---
+        # Use the helper function to convert any numpy types to standard Python types
+        # This needs to be done *before* saving to JSON later and before putting into moment_data_entry
+        # as moment_data_entry also gets saved to JSON eventually (as part of the main report).
+        # Call convert_numpy_types on the dictionary itself
+        cleaned_detailed_features = convert_numpy_types(detailed_features_dict)
 
 
-            # --- Store Data for this Keyframe (Moment) ---
-            # This dictionary holds data for one row in the 'video_moments' table
-            moment_data_entry = {
-                # The primary key for the database entry
-                # Using video_id + frame_unique_id ensures uniqueness across all videos
-                'moment_id': f"{video_id}_{frame_unique_id}", # e.g., 00001_frame_000000001234
+        # --- Store Data for this Keyframe (Moment) ---
+        # This dictionary holds data for one row in the 'video_moments' table
+        moment_data_entry = {
+            # The primary key for the database entry
+            # Using video_id + frame_unique_id ensures uniqueness across all videos
+            'moment_id': f"{video_id}_{frame_unique_id}", # e.g., 00001_frame_000000001234
 
-                'video_id': video_id,
-                'timestamp_seconds': timestamp,
+            'video_id': video_id,
+            'timestamp_seconds': timestamp,
 
-                # --- NEW: Add the frame_unique_id to the dictionary using the key 'frame_identifier' ---
-                # This key is expected by db_uploader.py
-                'frame_identifier': frame_unique_id, # <-- ADD THIS LINE
+            # --- NEW: Add the frame_unique_id to the dictionary using the key 'frame_identifier' ---
+            # This key is expected by db_uploader.py
+            'frame_identifier': frame_unique_id, # <-- ADD THIS LINE
 
-                # Store the relative path to the image from the DATASET_ROOT_DIR
-                # This path will be used by the API server to serve the image file
-                'keyframe_image_path': keyframe_image_path_relative_to_dataset_root if image_save_success else None, # Store path only if save was successful
+            # Store the relative path to the image from the DATASET_ROOT_DIR
+            # This path will be used by the API server to serve the image file
+            'keyframe_image_path': keyframe_image_path_relative_to_dataset_root if image_save_success else None, # Store path only if save was successful
 
-                'clip_embedding': clip_embedding, # Can be None if extraction failed
+            'clip_embedding': clip_embedding, # Can be None if extraction failed
 
-                # Simple feature lists/values for search filtering and scoring
-                'detected_object_names': detected_object_names_list,
-                'extracted_search_words': extracted_words_list,
-                'average_color_rgb': average_color_rgb, # This is already a list of ints from get_image_dominant_and_average_colors
+            # Simple feature lists/values for search filtering and scoring
+            'detected_object_names': detected_object_names_list,
+            'extracted_search_words': extracted_words_list,
+            'average_color_rgb': average_color_rgb, # This is already a list of ints from get_image_dominant_and_average_colors
 
-                # The detailed features dictionary (with numpy types converted) for the JSONB column
-                'detailed_features': cleaned_detailed_features # Use the cleaned dictionary here
-            }
+            # The detailed features dictionary (with numpy types converted) for the JSONB column
+            'detailed_features': cleaned_detailed_features # Use the cleaned dictionary here
+        }
 
-            analyzed_keyframes_data.append(moment_data_entry)
+        return moment_data_entry
 
-        else:
-             # This case happens if extract_single_frame_image returns None
-             print(f"    Skipped feature extraction, saving, and data compilation for frame at {timestamp:.2f}s as image extraction failed.")
-             # Optionally, you could create a minimal entry here just with video/timestamp/status info
+    else:
+         # This case happens if iter_keyframe_images yields None for this timestamp
+         print(f"    Skipped feature extraction, saving, and data compilation for frame at {timestamp:.2f}s as image extraction failed.")
+         # Optionally, you could create a minimal entry here just with video/timestamp/status info
+         return None
 
 
+def save_analysis_report(video_id: str, original_video_filename: str, extracted_data_path: str, video_duration: float,
+                         fps: float, compressed_file_size: int, shot_boundary_timestamps: List[float],
+                         analyzed_keyframes_data: List[dict]):
+    """Compiles the video-level and keyframe data of an analyzed video and saves it as the JSON report."""
     # --- Step 7: Compile All Video-level and Keyframe Data for the Report ---
     # Get the current time *after* all processing for this video is done
     processing_completion_time = get_current_processing_time()
@@ -307,7 +428,7 @@ def analyze_and_ingest_single_video(video_id: str):
     video_analysis_report = {
         'video_id': video_id,
         'original_filename': original_video_filename,
-        'compressed_filename': compressed_video_filename,
+        'compressed_filename': ANALYZED_COMPRESSED_VIDEO_FILENAME,
         'duration_seconds': video_duration,
         'fps': fps,
         'compressed_file_size_bytes': compressed_file_size, # Add compressed file size
@@ -338,48 +459,6 @@ def analyze_and_ingest_single_video(video_id: str):
         create_error_report(video_id, original_video_filename, extracted_data_path, f"Failed to save main report JSON: {e}")
 
 
-    end_time = time.time()
-    print(f"--- Finished analysis for video: {video_id} in {end_time - start_time:.2f} seconds ---")
-
-
-# Helper function to create a minimal error report if analysis fails early
-# This function also needs to use the numpy type converter before saving
-def create_error_report(video_id: str, original_video_filename: str, report_path: str, error_msg: str):
-    """Creates a minimal JSON report indicating that analysis failed."""
-    print(f"Creating error report for {video_id}: {error_msg}")
-    # Ensure parent directory exists before writing report
-    report_dir = os.path.dirname(report_path)
-    if report_dir and not os.path.exists(report_dir):
-        try:
-            os.makedirs(report_dir, exist_ok=True) # Use exist_ok=True for safety
-        except Exception as e:
-            print(f"Error creating directory for error report {report_dir}: {e}")
-
-    error_report_data = {
-        'video_id': video_id,
-        'original_filename': original_video_filename,
-        'compressed_filename': ANALYZED_COMPRESSED_VIDEO_FILENAME,
-        'duration_seconds': 0, # Use default values as analysis failed early
-        'fps': 0,
-        'compressed_file_size_bytes': 0,
-        'processing_date_utc': get_current_processing_time().isoformat(),
-        'scene_change_timestamps': [0.0], # Indicate start time
-        'keyframes_analyzed_count': 0,
-        'analyzed_keyframes': [], # Empty list
-        'analysis_status': 'failed', # Status indicates failure
-        'error_message': error_msg # Store the error message
-    }
-    try:
-        # Apply numpy type conversion just in case the error message or other data contains numpy types
-        cleaned_error_report = convert_numpy_types(error_report_data)
-        with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(cleaned_error_report, f, indent=4)
-        print(f"  Saved error report to: {report_path}")
-    except Exception as e:
-        # If even saving the error report fails... print and give up
-        print(f"  CRITICAL ERROR: Could not save error report JSON for {video_id}: {e}")
-
-
 # --- Add Cleanup Function (Included here for completeness of the video_ingestor logic block) ---
 # NOTE: In a real project, this function should ideally be in video_processors_io.py
 # and imported from there. But for providing the full code in one response,
@@ -428,6 +507,7 @@ if __name__ == '__main__':
         print(f"Please ensure your video folders (e.g., '00001') are inside '{DATASET_ROOT_DIR}' and contain '{ORIGINAL_VIDEO_FILENAME.format('video_id')}' file.")
     else:
         print(f"Found {len(video_identifiers)} videos to analyze.")
+        print("(Sequential run; use parallel_ingestor.py --workers N to analyze several videos at once.)")
 
         # Loop through each video identifier and start the analysis process
         total_videos = len(video_identifiers)
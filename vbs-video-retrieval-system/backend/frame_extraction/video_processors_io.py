@@ -1,10 +1,14 @@
 # --- START OF FILE video_processors_io.py ---
 
 import os
+import re
+import queue
 import subprocess
+import threading
+from contextlib import closing
 import cv2 as cv # Using OpenCV for efficient frame extraction
 import numpy as np # For image processing
-from typing import List, Tuple, Union
+from typing import Iterator, List, Tuple, Union
 from PIL import Image # For image format conversion
 from datetime import datetime # To get the current date/time
 import time # To add delays if needed
@@ -16,7 +20,8 @@ from settings import (
     DATASET_ROOT_DIR, ORIGINAL_VIDEO_FILENAME,
     SCENE_CHANGE_THRESHOLD, KEYFRAME_SELECTION_STRATEGY,
     KEYFRAME_BOUNDARY_OFFSET_SECONDS, ANALYZED_COMPRESSED_VIDEO_FILENAME,
-    KEYFRAME_INTERVAL_SECONDS # <--- Import the new setting for interval keyframes
+    KEYFRAME_INTERVAL_SECONDS, # <--- Import the new setting for interval keyframes
+    FRAME_EXTRACTION_SEEK_GAP_SECONDS
 )
 
 def get_all_video_identifiers(base_dir: str) -> List[str]:
@@ -76,6 +81,24 @@ def execute_ffmpeg_command(command: str) -> Tuple[int, str, str]:
         print(f"Error running FFMPEG command: {e}")
         return -1, "", str(e) # Return error code -1 and error message
 
+def parse_shot_change_timestamps(ffmpeg_output: str) -> List[float]:
+    """
+    Parses the shot change timestamps logged by FFMPEG's scdet filter.
+    Returns the sorted timestamps, always including the start of the video (0.0).
+    """
+    # Look for lines like '[scdet @ ...] lavfi.scd.score: 12.3, lavfi.scd.time: 4.56'
+    # (older FFMPEG versions log '[scdet @ ...] lavfi.scd.time: 4.56')
+    scdet_matches = re.findall(r"\[scdet.*?\].*?lavfi\.scd\.time: (\d+(?:\.\d+)?)", ffmpeg_output)
+    shot_change_timestamps = [float(ts) for ts in scdet_matches]
+
+    # Add the start of the video (time 0)
+    if 0.0 not in shot_change_timestamps:
+         shot_change_timestamps.insert(0, 0.0)
+
+    # Sort the timestamps
+    shot_change_timestamps.sort()
+    return shot_change_timestamps
+
 def run_ffmpeg_shot_detection(video_full_path: str, output_log_path: str) -> List[float]:
     """
     Runs FFMPEG's scdet filter on a video to find shot change timestamps.
@@ -100,19 +123,7 @@ def run_ffmpeg_shot_detection(video_full_path: str, output_log_path: str) -> Lis
 
 
     # Parse the output to find the timestamps from scdet
-    shot_change_timestamps = []
-    import re
-    # Look for lines containing '[scdet @ ...] lavfi.scd.time: X.Y'
-    # The regex looks for [scdet followed by anything up to ] space lavfi.scd.time: and then captures the number
-    scdet_matches = re.findall(r"\[scdet.*?\] lavfi\.scd\.time: (\d+\.\d+)", full_output)
-    shot_change_timestamps = [float(ts) for ts in scdet_matches]
-
-    # Add the start of the video (time 0)
-    if 0.0 not in shot_change_timestamps:
-         shot_change_timestamps.insert(0, 0.0)
-
-    # Sort the timestamps
-    shot_change_timestamps.sort()
+    shot_change_timestamps = parse_shot_change_timestamps(full_output)
 
     print(f"Detected {len(shot_change_timestamps)} shot change points.")
 
@@ -347,6 +358,66 @@ def extract_single_frame_image(video_full_path: str, timestamp_seconds: float) -
             cap.release()
 
 
+def iter_keyframe_images(video_full_path: str, timestamps_seconds: List[float], fps: float) -> Iterator[Tuple[float, Union[Image.Image, None]]]:
+    """
+    Decodes the frames at the given (sorted) timestamps in a single pass over the video.
+
+    The video is opened once and read forward: frames between two keyframes are only
+    grabbed, not converted. If the next keyframe is more than FRAME_EXTRACTION_SEEK_GAP_SECONDS
+    ahead, the reader seeks to it instead. Each timestamp maps to frame round(timestamp * fps),
+    the frame the CAP_PROP_POS_MSEC seek of extract_single_frame_image lands on.
+
+    Yields (timestamp, PIL image or None if the frame could not be read) in the given order.
+    """
+    cap = cv.VideoCapture(video_full_path)
+    if not cap.isOpened():
+        print(f"Error: Could not open video file {video_full_path} for frame extraction.")
+        for timestamp in timestamps_seconds:
+            yield timestamp, None
+        return
+
+    seek_gap_frames = int(FRAME_EXTRACTION_SEEK_GAP_SECONDS * fps)
+    next_frame = 0 # Index of the frame the next grab()/read() returns, None after a failed read
+    last_frame, last_image = None, None
+    try:
+        for timestamp in timestamps_seconds:
+            target_frame = int(timestamp * fps + 0.5)
+            # Timestamps closer than one frame map to the same image
+            if target_frame == last_frame:
+                yield timestamp, last_image
+                continue
+
+            if next_frame is None or target_frame < next_frame or target_frame - next_frame > seek_gap_frames:
+                cap.set(cv.CAP_PROP_POS_FRAMES, target_frame)
+                next_frame = target_frame
+
+            # Skip ahead sequentially; grab() decodes without the BGR conversion and copy of read()
+            success = True
+            while success and next_frame < target_frame:
+                success = cap.grab()
+                next_frame += 1
+            frame = None
+            if success:
+                success, frame = cap.read()
+
+            pil_image = None
+            if success and frame is not None:
+                next_frame += 1
+                try:
+                    # Convert color format from BGR (OpenCV default) to RGB (PIL default)
+                    pil_image = Image.fromarray(cv.cvtColor(frame, cv.COLOR_BGR2RGB))
+                except Exception as e:
+                    print(f"Error extracting frame from {video_full_path} at {timestamp:.2f}s: {e}")
+            else:
+                # Position is unknown after a failed read: seek for the next keyframe
+                next_frame = None
+
+            last_frame, last_image = target_frame, pil_image
+            yield timestamp, pil_image
+    finally:
+        cap.release()
+
+
 def compress_video_for_storage(video_full_path: str, output_compressed_path: str):
     """Compresses the video using FFMPEG."""
     ffmpeg_cmd = f'ffmpeg -i "{video_full_path}" -vcodec libx264 -acodec aac -ac 1 -crf 35 -y "{output_compressed_path}" -nostats -loglevel 0'
@@ -355,6 +426,189 @@ def compress_video_for_storage(video_full_path: str, output_compressed_path: str
     if returncode == 0: print("  Compression successful.")
     else: print("  Compression failed.\n  FFMPEG Stderr:\n{stderr}")
 
+# showinfo log line of a frame piped to Python: '[Parsed_showinfo_5 @ 0x...] n:   3 pts:  90090 pts_time:3.003 ...'
+SHOWINFO_PTS_TIME_PATTERN = re.compile(r"\[Parsed_showinfo_\d+ @ [^\]]*\] n:\s*\d+ pts:\s*-?\d+\s+pts_time:(-?\d+(?:\.\d+)?)")
+
+def get_video_frame_size(video_full_path: str) -> Tuple[int, int]:
+    """
+    Uses OpenCV to get the displayed (width, height) of a video, i.e. after the
+    rotation from its metadata, which FFMPEG applies when decoding.
+    Returns (0, 0) on failure.
+    """
+    cap = cv.VideoCapture(video_full_path)
+    if not cap.isOpened():
+        print(f"Error: Could not open video file {video_full_path} with OpenCV to get the frame size.")
+        return 0, 0
+    try:
+        width, height = int(cap.get(cv.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv.CAP_PROP_FRAME_HEIGHT))
+        # The frame size properties are those of the coded (unrotated) frames
+        orientation_property = getattr(cv, 'CAP_PROP_ORIENTATION_META', None) # OpenCV >= 4.5
+        if orientation_property is not None and int(cap.get(orientation_property)) % 180 == 90:
+            width, height = height, width
+        return width, height
+    finally:
+        cap.release()
+
+def build_single_decode_filtergraph(width: int, height: int) -> str:
+    """
+    Builds the filtergraph of a single-decode pass. The decoded video goes through scdet once
+    and is split into:
+      [enc] the stream re-encoded for storage
+      [raw] the 'boundary' keyframes for Python: the first frame, every frame scdet flags
+            as a shot change and one frame per KEYFRAME_INTERVAL_SECONDS, scaled to
+            width x height so every piped frame has the size Python reads
+    The last frame is not known until the end of the stream; SingleDecodePass reads it separately.
+    """
+    keyframe_select = "eq(n\\,0)"
+    if KEYFRAME_INTERVAL_SECONDS is not None and KEYFRAME_INTERVAL_SECONDS > 0:
+        # The first frame at or after every multiple of the interval
+        interval = float(KEYFRAME_INTERVAL_SECONDS)
+        keyframe_select += f"+gte(floor(t/{interval})\\,floor(prev_selected_t/{interval})+1)"
+    return (
+        f"[0:v]scdet=s=0:t={SCENE_CHANGE_THRESHOLD},split=3[enc][cuts][grid];"
+        f"[cuts]metadata=mode=select:key=lavfi.scd.time[cutframes];"
+        f"[grid]select='{keyframe_select}'[gridframes];"
+        f"[cutframes][gridframes]interleave=nb_inputs=2,showinfo,scale={width}:{height},format=rgb24[raw]"
+    )
+
+# Seconds before the end of the stream decoded to find the last frame of a video
+LAST_FRAME_WINDOW_SECONDS = 2.0
+
+class SingleDecodePass:
+    """
+    Decodes a video once for shot detection, compression and keyframe extraction.
+
+    One FFMPEG process runs scdet on the decoded frames, encodes them for storage
+    (same settings as compress_video_for_storage) and pipes the keyframes of the
+    'boundary' strategy to Python as raw RGB frames. The timestamp of each piped
+    frame is read from the showinfo log on stderr, which a thread drains while the
+    frames are consumed, so neither pipe can fill up and stall FFMPEG. The last
+    frame of the video is then read by a second FFMPEG process that decodes only
+    the final LAST_FRAME_WINDOW_SECONDS of the stream.
+
+    Usage:
+        decode_pass = SingleDecodePass(video_path, log_path, compressed_path, width, height)
+        for timestamp, image in decode_pass.frames():
+            ...
+        decode_pass.shot_timestamps  # available once frames() is exhausted
+        decode_pass.returncode       # non-zero: the outputs may be incomplete, redo them separately
+    """
+
+    def __init__(self, video_full_path: str, output_log_path: str, output_compressed_path: str,
+                 width: int, height: int):
+        self.video_full_path = video_full_path
+        self.output_log_path = output_log_path
+        self.output_compressed_path = output_compressed_path
+        self.width = width
+        self.height = height
+        self.shot_timestamps = [0.0]
+        self.returncode = None
+
+    def build_command(self) -> List[str]:
+        """FFMPEG arguments: output 0 is the compressed video, output 1 the raw keyframes on stdout."""
+        return [
+            'ffmpeg', '-nostats', '-loglevel', 'info', '-i', self.video_full_path,
+            '-filter_complex', build_single_decode_filtergraph(self.width, self.height),
+            '-map', '[enc]', '-map', '0:a?', '-vcodec', 'libx264', '-acodec', 'aac', '-ac', '1', '-crf', '35',
+            '-y', self.output_compressed_path,
+            '-map', '[raw]', '-vsync', 'passthrough', '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1'
+        ]
+
+    def build_last_frame_command(self) -> List[str]:
+        """
+        FFMPEG arguments that pipe every frame of the final LAST_FRAME_WINDOW_SECONDS;
+        -copyts -start_at_zero keeps the timestamps of the main pass.
+        """
+        return [
+            'ffmpeg', '-nostats', '-loglevel', 'info', '-sseof', f'-{LAST_FRAME_WINDOW_SECONDS}',
+            '-copyts', '-start_at_zero', '-i', self.video_full_path,
+            '-map', '0:v:0', '-vf', f'showinfo,scale={self.width}:{self.height},format=rgb24',
+            '-vsync', 'passthrough', '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1'
+        ]
+
+    def pipe_frames(self, command: List[str], log_lines: List[str], status: dict) -> Iterator[Tuple[float, bytes]]:
+        """
+        Runs FFMPEG and yields (timestamp, raw RGB frame) for every frame it pipes.
+        The stderr lines are collected in log_lines; status['returncode'] is set on exit.
+        """
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        frame_times = queue.Queue()
+
+        def read_log():
+            for raw_line in process.stderr:
+                line = raw_line.decode('utf-8', errors='replace')
+                log_lines.append(line)
+                match = SHOWINFO_PTS_TIME_PATTERN.search(line)
+                if match:
+                    frame_times.put(float(match.group(1)))
+            frame_times.put(None) # End of the log
+
+        reader = threading.Thread(target=read_log, daemon=True)
+        reader.start()
+
+        frame_bytes = self.width * self.height * 3
+        finished = False
+        try:
+            while True:
+                buffer = process.stdout.read(frame_bytes)
+                if len(buffer) < frame_bytes:
+                    break
+                timestamp = frame_times.get()
+                if timestamp is None:
+                    break
+                yield timestamp, buffer
+            finished = True
+        finally:
+            if not finished and process.poll() is None:
+                # The consumer stopped early: do not leave FFMPEG blocked on the pipe
+                process.kill()
+            process.stdout.close()
+            status['returncode'] = process.wait()
+            reader.join()
+
+    def frames(self) -> Iterator[Tuple[float, Image.Image]]:
+        """Yields (timestamp, PIL image) for every keyframe, in timestamp order."""
+        log_lines, status = [], {}
+        last_timestamp = None
+        try:
+            with closing(self.pipe_frames(self.build_command(), log_lines, status)) as piped_frames:
+                for timestamp, buffer in piped_frames:
+                    # A frame that is both a shot change and an interval frame is piped twice
+                    if timestamp == last_timestamp:
+                        continue
+                    last_timestamp = timestamp
+                    yield timestamp, Image.frombytes('RGB', (self.width, self.height), buffer)
+        finally:
+            self.returncode = status.get('returncode')
+            self.finish(''.join(log_lines))
+        if self.returncode != 0:
+            return
+
+        # The last frame, taken from the actual end of the stream
+        last_frame, last_frame_log, last_frame_status = None, [], {}
+        with closing(self.pipe_frames(self.build_last_frame_command(), last_frame_log, last_frame_status)) as piped_frames:
+            for timestamp, buffer in piped_frames:
+                last_frame = (timestamp, buffer)
+        if last_frame_status.get('returncode') != 0 or last_frame is None:
+            print(f"Warning: Could not read the last frame of {self.video_full_path} "
+                  f"(FFMPEG exit code {last_frame_status.get('returncode')})")
+        elif last_timestamp is None or last_frame[0] > last_timestamp:
+            yield last_frame[0], Image.frombytes('RGB', (self.width, self.height), last_frame[1])
+
+    def finish(self, full_output: str):
+        """Saves the FFMPEG log and parses the shot change timestamps from it."""
+        try:
+            with open(self.output_log_path, 'w', encoding='utf-8') as f:
+                f.write(full_output)
+        except Exception as e:
+            print(f"Warning: Could not save FFMPEG log to {self.output_log_path}: {e}")
+
+        self.shot_timestamps = parse_shot_change_timestamps(full_output)
+        print(f"Detected {len(self.shot_timestamps)} shot change points.")
+        if self.returncode != 0:
+            print(f"Warning: single-decode FFMPEG pass finished with exit code {self.returncode}")
+            print(f"  Stderr (tail): {full_output[-2000:]}")
+
 def get_file_size_bytes(file_path: str) -> int:
     """Gets the size of a file in bytes."""
     if os.path.exists(file_path):
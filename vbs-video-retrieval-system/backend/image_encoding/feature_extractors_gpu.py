@@ -7,10 +7,13 @@ from ultralytics import YOLO
 import easyocr # <-- Switched from paddleocr
 import numpy as np
 from PIL import Image
-from typing import Union, List, Dict, Tuple, Any
+from typing import Union, List, Dict, Tuple, Any, Iterable
 
 # Import settings
-from settings import MINIMUM_OBJECT_DETECTION_CONFIDENCE, MINIMUM_TEXT_EXTRACTION_CONFIDENCE, NUMBER_OF_DOMINANT_COLORS
+from settings import (
+    MINIMUM_OBJECT_DETECTION_CONFIDENCE, MINIMUM_TEXT_EXTRACTION_CONFIDENCE, NUMBER_OF_DOMINANT_COLORS,
+    CLIP_IMAGE_BATCH_SIZE, OBJECT_DETECTION_BATCH_SIZE
+)
 
 # --- Model Loading ---
 # Determine the device to use (GPU if available, otherwise CPU)
@@ -110,6 +113,57 @@ def get_image_clip_embedding(image: Union[Image.Image, os.PathLike]) -> Union[Li
         return None
 
 
+
+def get_image_clip_embeddings_batch(images: Iterable[Union[Image.Image, os.PathLike]],
+                                    batch_size: int = CLIP_IMAGE_BATCH_SIZE) -> Union[Tuple[np.ndarray, np.ndarray], None]:
+    """
+    Gets the CLIP embeddings of many images, batch_size images per forward pass.
+    Takes a list or any iterator of images (e.g. frames from a generator).
+    Returns (embeddings, valid): a normalized (N, 768) float32 array in input order and
+    an (N,) bool mask that is False for images that could not be loaded (their rows are
+    zero and are not embeddings). Near-zero embeddings are zero rows, like
+    get_image_clip_embedding returns them. Returns None if CLIP is not loaded.
+    """
+    if clip_model is None or clip_preprocess is None:
+        return None
+
+    def preprocess(image):
+        try:
+            if isinstance(image, os.PathLike):
+                image = Image.open(image)
+            return clip_preprocess(image.convert("RGB"))
+        except Exception as e:
+            print(f"Error preprocessing image for CLIP: {e}")
+            return None
+
+    def encode(tensors):
+        # Encodes one batch; None entries (failed images) become zero rows marked invalid
+        loaded = [i for i, tensor in enumerate(tensors) if tensor is not None]
+        batch_embeddings = np.zeros((len(tensors), clip_model.visual.output_dim), dtype=np.float32)
+        batch_valid = np.zeros(len(tensors), dtype=bool)
+        if loaded:
+            batch = torch.stack([tensors[i] for i in loaded]).to(DEVICE)
+            with torch.inference_mode():
+                features = clip_model.encode_image(batch).float()
+            norms = features.norm(dim=-1, keepdim=True)
+            features = torch.where(norms > 1e-6, features / norms.clamp(min=1e-6), torch.zeros_like(features))
+            batch_embeddings[loaded] = features.cpu().numpy()
+            batch_valid[loaded] = True
+        return batch_embeddings, batch_valid
+
+    chunks = []
+    tensors = []
+    for image in images:
+        tensors.append(preprocess(image))
+        if len(tensors) == batch_size:
+            chunks.append(encode(tensors))
+            tensors = []
+    if tensors:
+        chunks.append(encode(tensors))
+    if not chunks:
+        return np.zeros((0, clip_model.visual.output_dim), dtype=np.float32), np.zeros(0, dtype=bool)
+    return np.concatenate([chunk[0] for chunk in chunks]), np.concatenate([chunk[1] for chunk in chunks])
+
 def get_text_clip_embedding(text: str) -> Union[List[float], None]:
     """Gets the CLIP embedding vector for text."""
     if clip_model is None:
@@ -130,11 +184,31 @@ def get_text_clip_embedding(text: str) -> Union[List[float], None]:
         return None
 
 
+def detections_from_yolo_result(result) -> List[Dict[str, Any]]:
+    """
+    Converts one YOLO result into the list of detail dicts ({'name', 'confidence', 'box'}).
+    Confidences, classes and boxes are copied off the device once and filtered by
+    MINIMUM_OBJECT_DETECTION_CONFIDENCE as arrays, instead of one .item() call per box.
+    """
+    if result.boxes is None or len(result.boxes) == 0:
+        return []
+    confidences = result.boxes.conf.cpu().numpy()
+    class_ids = result.boxes.cls.cpu().numpy().astype(np.int64)
+    boxes = result.boxes.xyxy.cpu().numpy()
+
+    # Keep boxes above the confidence threshold whose class name is known by the model
+    keep = (confidences >= MINIMUM_OBJECT_DETECTION_CONFIDENCE) & np.isin(class_ids, list(result.names))
+    return [
+        {'name': result.names[class_id], 'confidence': confidence, 'box': box}
+        for class_id, confidence, box in zip(class_ids[keep].tolist(), confidences[keep].tolist(), boxes[keep].tolist())
+    ]
+
+
 def detect_objects_with_details(image: Image.Image) -> List[Dict[str, Any]]:
     """
     Uses the YOLO model to find objects, their confidence scores, and bounding boxes.
     Returns a list of dictionaries. Filters results by MINIMUM_OBJECT_DETECTION_CONFIDENCE.
-    Numbers in the output (confidence, box coords) will be converted to standard types by convert_numpy_types.
+    Numbers in the output (confidence, box coords) are standard Python floats.
     """
     if object_detection_model is None:
         return []
@@ -142,33 +216,35 @@ def detect_objects_with_details(image: Image.Image) -> List[Dict[str, Any]]:
     try:
         # Running on the correct device is handled by moving the model.
         results = object_detection_model(source=image, save=False, verbose=False)[0]
-
-        detected_list = []
-        if results.boxes is not None: # Check if any boxes were detected
-             # Iterate through each detected box/object
-             for box in results.boxes:
-                 confidence = box.conf.item() # Confidence score (as a standard Python number)
-                 class_id = int(box.cls.item()) # Class ID (as an integer)
-
-                 # Check confidence threshold and if the class name is known by the model
-                 if confidence >= MINIMUM_OBJECT_DETECTION_CONFIDENCE and class_id in results.names:
-                     object_name = results.names[class_id]
-                     # Get bounding box coordinates [x1, y1, x2, y2] as a list of standard Python numbers
-                     bbox = box.xyxy[0].tolist()
-
-                     detected_list.append({
-                         'name': object_name,
-                         'confidence': confidence,
-                         'box': bbox
-                     })
-
-        return detected_list
+        return detections_from_yolo_result(results)
 
     except Exception as e:
         print(f"Error during object detection: {e}")
         return []
 
 
+def detect_objects_with_details_batch(images: List[Image.Image],
+                                      batch_size: int = OBJECT_DETECTION_BATCH_SIZE) -> List[List[Dict[str, Any]]]:
+    """
+    Runs the YOLO model over a list of images, batch_size images per call.
+    Returns one list of detail dicts per image, the same as detect_objects_with_details.
+    If a batch fails, its images are detected one by one.
+    """
+    if object_detection_model is None:
+        return [[] for _ in images]
+
+    detections = []
+    for start in range(0, len(images), batch_size):
+        batch = images[start:start + batch_size]
+        try:
+            results = object_detection_model(source=batch, save=False, verbose=False)
+            detections.extend(detections_from_yolo_result(result) for result in results)
+        except Exception as e:
+            print(f"Error during batched object detection: {e}. Detecting the images one by one.")
+            detections.extend(detect_objects_with_details(image) for image in batch)
+    return detections
+
+
 def extract_text_with_details(image: Image.Image) -> List[Dict[str, Any]]:
     """
     Uses EasyOCR to extract text from the image, including confidence and bounding boxes.
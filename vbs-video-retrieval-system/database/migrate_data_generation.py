@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Add the data generation counter to an existing database.
+
+Creates the single-row data_generation table and bump_data_generation().
+The importers bump the generation after every import; the query server
+compares it with the generation its cached search results were computed
+for and drops the cache when it changes. Safe to run more than once.
+"""
+
+import os
+import sys
+
+# Add the query_server directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'query_server'))
+
+from db_utils import get_db_connection
+
+MIGRATION_SQL = """
+CREATE TABLE IF NOT EXISTS data_generation (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    generation BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION bump_data_generation()
+RETURNS BIGINT AS $$
+    INSERT INTO data_generation (id, generation, updated_at)
+    VALUES (1, 1, CURRENT_TIMESTAMP)
+    ON CONFLICT (id) DO UPDATE
+    SET generation = data_generation.generation + 1, updated_at = CURRENT_TIMESTAMP
+    RETURNING generation;
+$$ LANGUAGE sql;
+"""
+
+
+def main():
+    """Main migration function."""
+    print("🚀 Starting data generation migration")
+    print("=" * 50)
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+
+        print("🔧 Creating data_generation table and bump_data_generation()...")
+        cursor.execute(MIGRATION_SQL)
+        cursor.execute("SELECT bump_data_generation()")
+        generation = cursor.fetchone()[0]
+
+        conn.commit()
+        print(f"✅ Data generation is now {generation}")
+        print("\n🎉 Data generation migration completed")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error during data generation migration: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
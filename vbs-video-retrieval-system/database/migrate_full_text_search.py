@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Add ranked full-text search to an existing database.
+
+Creates the video_moments.search_document tsvector column (OCR words weighted
+A, object labels B, video filename C), the triggers that keep it up to date,
+backfills it for all existing moments and builds the GIN index used by the
+text, keyword and multimodal search endpoints. Safe to run more than once.
+"""
+
+import os
+import sys
+import time
+
+# Add the query_server directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'query_server'))
+
+from db_utils import get_db_connection
+
+MIGRATION_SQL = """
+ALTER TABLE video_moments ADD COLUMN IF NOT EXISTS search_document TSVECTOR;
+
+CREATE OR REPLACE FUNCTION build_moment_search_document(words TEXT[], objects TEXT[], filename TEXT)
+RETURNS TSVECTOR AS $$
+    SELECT setweight(to_tsvector('simple', COALESCE(array_to_string(words, ' '), '')), 'A') ||
+           setweight(to_tsvector('simple', COALESCE(array_to_string(objects, ' '), '')), 'B') ||
+           setweight(to_tsvector('simple', COALESCE(filename, '')), 'C');
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION update_moment_search_document()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_document = build_moment_search_document(
+        NEW.extracted_search_words,
+        NEW.detected_object_names,
+        (SELECT original_filename FROM videos WHERE video_id = NEW.video_id)
+    );
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_moments_search_document ON video_moments;
+CREATE TRIGGER update_moments_search_document
+BEFORE INSERT OR UPDATE OF extracted_search_words, detected_object_names, video_id ON video_moments
+FOR EACH ROW EXECUTE FUNCTION update_moment_search_document();
+
+CREATE OR REPLACE FUNCTION refresh_video_search_documents()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.original_filename IS DISTINCT FROM OLD.original_filename THEN
+        UPDATE video_moments
+        SET search_document = build_moment_search_document(extracted_search_words, detected_object_names, NEW.original_filename)
+        WHERE video_id = NEW.video_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS refresh_video_search_documents ON videos;
+CREATE TRIGGER refresh_video_search_documents
+AFTER UPDATE OF original_filename ON videos
+FOR EACH ROW EXECUTE FUNCTION refresh_video_search_documents();
+"""
+
+BACKFILL_SQL = """
+UPDATE video_moments m
+SET search_document = build_moment_search_document(m.extracted_search_words, m.detected_object_names, v.original_filename)
+FROM videos v
+WHERE m.video_id = v.video_id
+"""
+
+INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_moments_search_document
+ON video_moments USING gin(search_document)
+"""
+
+
+def main():
+    """Main migration function."""
+    print("🚀 Starting full-text search migration")
+    print("=" * 50)
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        start = time.time()
+
+        print("🔧 Creating search_document column and triggers...")
+        cursor.execute(MIGRATION_SQL)
+
+        print("📊 Backfilling search documents...")
+        cursor.execute(BACKFILL_SQL)
+        print(f"✅ Updated {cursor.rowcount} moments")
+
+        print("🔧 Building GIN index...")
+        cursor.execute(INDEX_SQL)
+        cursor.execute("ANALYZE video_moments")
+
+        conn.commit()
+        print(f"\n🎉 Full-text search migration completed in {time.time() - start:.1f}s")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error during full-text search migration: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Add fuzzy OCR keyword matching to an existing database.
+
+Enables pg_trgm, creates the ocr_vocabulary table of distinct OCR words with
+a trigram GIN index, and fills it with refresh_ocr_vocabulary(). Query
+keywords are expanded to similar vocabulary words before the moment lookup,
+so misread or split OCR tokens are still found at index speed.
+Safe to run more than once; re-running refreshes the vocabulary.
+"""
+
+import os
+import sys
+import time
+
+# Add the query_server directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'query_server'))
+
+from db_utils import get_db_connection
+
+MIGRATION_SQL = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE TABLE IF NOT EXISTS ocr_vocabulary (
+    word TEXT PRIMARY KEY,
+    moment_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_ocr_vocabulary_trgm
+ON ocr_vocabulary USING gin(word gin_trgm_ops);
+
+CREATE OR REPLACE FUNCTION refresh_ocr_vocabulary()
+RETURNS INTEGER AS $$
+DECLARE
+    vocabulary_size INTEGER;
+BEGIN
+    DELETE FROM ocr_vocabulary;
+    INSERT INTO ocr_vocabulary (word, moment_count)
+    SELECT word, COUNT(*)
+    FROM video_moments m, unnest(m.extracted_search_words) AS word
+    WHERE word <> ''
+    GROUP BY word;
+    GET DIAGNOSTICS vocabulary_size = ROW_COUNT;
+    RETURN vocabulary_size;
+END;
+$$ language 'plpgsql';
+"""
+
+
+def main():
+    """Main migration function."""
+    print("🚀 Starting OCR vocabulary migration")
+    print("=" * 50)
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        start = time.time()
+
+        print("🔧 Creating pg_trgm extension, ocr_vocabulary table and index...")
+        cursor.execute(MIGRATION_SQL)
+
+        print("📊 Building vocabulary from extracted_search_words...")
+        cursor.execute("SELECT refresh_ocr_vocabulary()")
+        vocabulary_size = cursor.fetchone()[0]
+        cursor.execute("ANALYZE ocr_vocabulary")
+
+        conn.commit()
+        print(f"✅ {vocabulary_size} distinct OCR words indexed")
+        print(f"\n🎉 OCR vocabulary migration completed in {time.time() - start:.1f}s")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error during OCR vocabulary migration: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Rebuild the ANN index on video_moments.clip_embedding.
+
+schema.sql creates an ivfflat index with a fixed `lists = 100` before any
+data is loaded, so its centroids are trained on an empty table. Run this
+script after importing data to replace it with either:
+
+  * an HNSW index with configurable m / ef_construction, or
+  * a re-trained ivfflat index whose lists are sized from the row count.
+
+Examples:
+    python database/migrate_vector_index.py --type hnsw --m 16 --ef-construction 64
+    python database/migrate_vector_index.py --type ivfflat            # lists sized automatically
+    python database/migrate_vector_index.py --type ivfflat --lists 200
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+# Add the query_server directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'query_server'))
+
+from db_utils import get_db_connection
+
+INDEX_NAME = 'idx_moments_clip_embedding'
+
+
+def recommended_ivfflat_lists(row_count: int) -> int:
+    """
+    Size ivfflat lists from the row count following the pgvector guidance:
+    rows / 1000 up to 1M rows, sqrt(rows) beyond that.
+    """
+    if row_count <= 1_000_000:
+        return max(1, row_count // 1000)
+    return int(math.sqrt(row_count))
+
+
+def recommended_ivfflat_probes(lists: int) -> int:
+    """A reasonable starting point for ivfflat.probes: sqrt(lists)."""
+    return max(1, int(math.sqrt(lists)))
+
+
+def count_embeddings(conn) -> int:
+    """Count the moments that have an embedding."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM video_moments WHERE clip_embedding IS NOT NULL")
+    return cursor.fetchone()[0]
+
+
+def build_index_sql(index_type: str, index_name: str = INDEX_NAME, lists: int = None,
+                    m: int = None, ef_construction: int = None) -> str:
+    """Return the CREATE INDEX statement for the requested index type."""
+    if index_type == 'hnsw':
+        return (f"CREATE INDEX {index_name} ON video_moments "
+                f"USING hnsw (clip_embedding vector_cosine_ops) "
+                f"WITH (m = {int(m)}, ef_construction = {int(ef_construction)})")
+    if index_type == 'ivfflat':
+        return (f"CREATE INDEX {index_name} ON video_moments "
+                f"USING ivfflat (clip_embedding vector_cosine_ops) "
+                f"WITH (lists = {int(lists)})")
+    raise ValueError(f"Unknown index type: {index_type}")
+
+
+def rebuild_vector_index(conn, index_type: str, index_name: str = INDEX_NAME, lists: int = None,
+                         m: int = 16, ef_construction: int = 64, maintenance_work_mem: str = None) -> dict:
+    """
+    Drop and recreate the embedding index.
+
+    Args:
+        conn: Database connection
+        index_type: 'hnsw' or 'ivfflat'
+        index_name: Name of the index to replace
+        lists: ivfflat lists (None = sized from the row count)
+        m: HNSW max connections per layer
+        ef_construction: HNSW candidate list size during build
+        maintenance_work_mem: Optional memory budget for the build, e.g. '1GB'
+
+    Returns:
+        dict describing the built index and how long the build took
+    """
+    row_count = count_embeddings(conn)
+    if index_type == 'ivfflat' and not lists:
+        lists = recommended_ivfflat_lists(row_count)
+
+    sql = build_index_sql(index_type, index_name, lists=lists, m=m, ef_construction=ef_construction)
+    cursor = conn.cursor()
+    try:
+        if maintenance_work_mem:
+            cursor.execute("SELECT set_config('maintenance_work_mem', %s, true)", (maintenance_work_mem,))
+        start = time.time()
+        cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+        cursor.execute(sql)
+        cursor.execute("ANALYZE video_moments")
+        conn.commit()
+        build_seconds = time.time() - start
+    except Exception:
+        conn.rollback()
+        raise
+
+    info = {
+        'index_name': index_name,
+        'index_type': index_type,
+        'rows': row_count,
+        'build_seconds': build_seconds,
+        'sql': sql,
+    }
+    if index_type == 'ivfflat':
+        info['lists'] = lists
+        info['recommended_probes'] = recommended_ivfflat_probes(lists)
+    else:
+        info['m'] = m
+        info['ef_construction'] = ef_construction
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the CLIP embedding ANN index")
+    parser.add_argument('--type', choices=['hnsw', 'ivfflat'], required=True, help="Index type to build")
+    parser.add_argument('--lists', type=int, default=None, help="ivfflat lists (default: sized from row count)")
+    parser.add_argument('--m', type=int, default=16, help="HNSW m (default: 16)")
+    parser.add_argument('--ef-construction', type=int, default=64, help="HNSW ef_construction (default: 64)")
+    parser.add_argument('--maintenance-work-mem', default=None, help="e.g. 1GB, speeds up large builds")
+    parser.add_argument('--index-name', default=INDEX_NAME, help=f"Index name (default: {INDEX_NAME})")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        print(f"🔧 Rebuilding {args.index_name} as {args.type}...")
+        info = rebuild_vector_index(
+            conn, args.type, index_name=args.index_name, lists=args.lists, m=args.m,
+            ef_construction=args.ef_construction, maintenance_work_mem=args.maintenance_work_mem
+        )
+        print(f"✅ {info['sql']}")
+        print(f"   Rows indexed: {info['rows']} | Build time: {info['build_seconds']:.1f}s")
+        if args.type == 'ivfflat':
+            print(f"   Suggested IVFFLAT_PROBES: {info['recommended_probes']}")
+        return True
+    except Exception as e:
+        print(f"❌ Error rebuilding vector index: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
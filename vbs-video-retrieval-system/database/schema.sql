@@ -1,6 +1,9 @@
 -- Enable pgvector extension for vector operations
 CREATE EXTENSION IF NOT EXISTS vector;
 
+-- Enable pg_trgm for fuzzy matching of noisy OCR words
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Main table for video metadata (based on your video_analysis_report structure)
 CREATE TABLE IF NOT EXISTS videos (
     video_id VARCHAR(255) PRIMARY KEY,
@@ -47,6 +50,9 @@ CREATE TABLE IF NOT EXISTS video_moments (
     -- Detailed features (JSONB for complex search)
     detailed_features JSONB,  -- Your detected_objects_detailed, extracted_text_detailed, etc.
     
+    -- Full-text search document (maintained by trigger, see build_moment_search_document)
+    search_document TSVECTOR,
+    
     -- Technical metadata
     extraction_success BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -54,6 +60,21 @@ CREATE TABLE IF NOT EXISTS video_moments (
     FOREIGN KEY (video_id) REFERENCES videos(video_id) ON DELETE CASCADE
 );
 
+-- Vocabulary of distinct OCR words, trigram-indexed for fuzzy query expansion
+-- (rebuilt with refresh_ocr_vocabulary() after each import)
+CREATE TABLE IF NOT EXISTS ocr_vocabulary (
+    word TEXT PRIMARY KEY,
+    moment_count INTEGER NOT NULL DEFAULT 0
+);
+
+-- Single-row counter bumped by the importers after every import; the query server
+-- drops its cached search results when the generation changes
+CREATE TABLE IF NOT EXISTS data_generation (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    generation BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Indexes for performance optimization
 CREATE INDEX IF NOT EXISTS idx_videos_status ON videos(analysis_status);
 CREATE INDEX IF NOT EXISTS idx_videos_duration ON videos(duration_seconds);
@@ -63,6 +84,10 @@ CREATE INDEX IF NOT EXISTS idx_moments_timestamp ON video_moments(timestamp_seco
 CREATE INDEX IF NOT EXISTS idx_moments_frame_id ON video_moments(frame_identifier);
 
 -- Vector similarity search index (768 dimensions for your CLIP model)
+-- NOTE: ivfflat centroids are trained at build time, so this index is poor when created on an
+-- empty table. After importing data rebuild it as HNSW or as ivfflat with lists sized from the
+-- row count: python database/migrate_vector_index.py --type hnsw|ivfflat
+-- Compare configurations with scripts/benchmark_vector_index.py
 CREATE INDEX IF NOT EXISTS idx_moments_clip_embedding 
 ON video_moments USING ivfflat (clip_embedding vector_cosine_ops) 
 WITH (lists = 100);
@@ -74,6 +99,14 @@ ON video_moments USING gin(detected_object_names);
 CREATE INDEX IF NOT EXISTS idx_moments_words 
 ON video_moments USING gin(extracted_search_words);
 
+-- Full-text search index (OCR words, object labels and filename, ranked with ts_rank)
+CREATE INDEX IF NOT EXISTS idx_moments_search_document 
+ON video_moments USING gin(search_document);
+
+-- Trigram index for fuzzy OCR vocabulary lookups (word % 'query')
+CREATE INDEX IF NOT EXISTS idx_ocr_vocabulary_trgm 
+ON ocr_vocabulary USING gin(word gin_trgm_ops);
+
 -- JSON search index for detailed features
 CREATE INDEX IF NOT EXISTS idx_moments_detailed_features 
 ON video_moments USING gin(detailed_features);
@@ -96,6 +129,74 @@ CREATE TRIGGER update_videos_updated_at
 BEFORE UPDATE ON videos
 FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Full-text search document: OCR words (weight A), object labels (B), video filename (C)
+CREATE OR REPLACE FUNCTION build_moment_search_document(words TEXT[], objects TEXT[], filename TEXT)
+RETURNS TSVECTOR AS $$
+    SELECT setweight(to_tsvector('simple', COALESCE(array_to_string(words, ' '), '')), 'A') ||
+           setweight(to_tsvector('simple', COALESCE(array_to_string(objects, ' '), '')), 'B') ||
+           setweight(to_tsvector('simple', COALESCE(filename, '')), 'C');
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION update_moment_search_document()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_document = build_moment_search_document(
+        NEW.extracted_search_words,
+        NEW.detected_object_names,
+        (SELECT original_filename FROM videos WHERE video_id = NEW.video_id)
+    );
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER update_moments_search_document
+BEFORE INSERT OR UPDATE OF extracted_search_words, detected_object_names, video_id ON video_moments
+FOR EACH ROW EXECUTE FUNCTION update_moment_search_document();
+
+-- Keep moment search documents in sync when a video is renamed
+CREATE OR REPLACE FUNCTION refresh_video_search_documents()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.original_filename IS DISTINCT FROM OLD.original_filename THEN
+        UPDATE video_moments
+        SET search_document = build_moment_search_document(extracted_search_words, detected_object_names, NEW.original_filename)
+        WHERE video_id = NEW.video_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER refresh_video_search_documents
+AFTER UPDATE OF original_filename ON videos
+FOR EACH ROW EXECUTE FUNCTION refresh_video_search_documents();
+
+-- Rebuild the OCR vocabulary from all moments
+CREATE OR REPLACE FUNCTION refresh_ocr_vocabulary()
+RETURNS INTEGER AS $$
+DECLARE
+    vocabulary_size INTEGER;
+BEGIN
+    DELETE FROM ocr_vocabulary;
+    INSERT INTO ocr_vocabulary (word, moment_count)
+    SELECT word, COUNT(*)
+    FROM video_moments m, unnest(m.extracted_search_words) AS word
+    WHERE word <> ''
+    GROUP BY word;
+    GET DIAGNOSTICS vocabulary_size = ROW_COUNT;
+    RETURN vocabulary_size;
+END;
+$$ language 'plpgsql';
+
+-- Bump the data generation (call after importing or changing moments)
+CREATE OR REPLACE FUNCTION bump_data_generation()
+RETURNS BIGINT AS $$
+    INSERT INTO data_generation (id, generation, updated_at)
+    VALUES (1, 1, CURRENT_TIMESTAMP)
+    ON CONFLICT (id) DO UPDATE
+    SET generation = data_generation.generation + 1, updated_at = CURRENT_TIMESTAMP
+    RETURNING generation;
+$$ LANGUAGE sql;
+
 -- View for detailed moment information with video context
 CREATE VIEW IF NOT EXISTS moments_with_video_info AS
 SELECT 
@@ -189,6 +290,9 @@ COMMENT ON COLUMN video_moments.clip_embedding IS '768-dimensional CLIP embeddin
 COMMENT ON COLUMN video_moments.detailed_features IS 'JSONB containing detected_objects_detailed, extracted_text_detailed, dominant_colors_info';
 COMMENT ON COLUMN video_moments.detected_object_names IS 'Array of object names for quick filtering';
 COMMENT ON COLUMN video_moments.extracted_search_words IS 'Array of extracted words for text search';
+COMMENT ON TABLE ocr_vocabulary IS 'Distinct OCR words with trigram index, used to expand noisy query keywords';
+COMMENT ON TABLE data_generation IS 'Import counter used to invalidate the query server result cache';
+COMMENT ON COLUMN video_moments.search_document IS 'tsvector over OCR words (A), object labels (B) and filename (C) for ranked full-text search';
 
 -- Example of initial setup queries you might want to run
 -- SELECT 'Database schema created successfully for Video Retrieval System' as status;
\ No newline at end of file
@@ -7,6 +7,10 @@ import psycopg2
 from pathlib import Path
 from datetime import datetime
 import logging
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from import_maintenance import publish_import, refresh_ocr_vocabulary
 
 # Database configuration
 DB_CONFIG = {
@@ -186,6 +190,16 @@ def main():
             failed += 1
             logger.error(f"Failed: {message}")
 
+    if successful:
+        conn = get_db_connection()
+        try:
+            refresh_ocr_vocabulary(conn, logger)
+            # Writes the embedding store before the bump becomes visible to the query servers
+            publish_import(conn, logger)
+        finally:
+            if conn:
+                conn.close()
+
     logger.info("\n=== IMPORT SUMMARY ===")
     logger.info(f"Successful imports: {successful}")
     logger.info(f"Failed imports: {failed}")
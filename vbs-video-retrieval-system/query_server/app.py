@@ -6,9 +6,33 @@ import psycopg2.extras
 from datetime import datetime
 import os
 import json
-
-from db_utils import get_db_connection, fetch_all_moments_with_colors_and_embeddings
-from utils_server import color_distance, cosine_similarity_score, parse_json_field, extract_keywords_from_sentence
+import functools
+import math
+import threading
+
+from config import (
+    VECTOR_SEARCH_MODE, IVFFLAT_PROBES, IVFPQ_NPROBE, HNSW_EF_SEARCH, DEFAULT_CLIP_TEXT_THRESHOLD, OCR_FUZZY_SIMILARITY,
+    RESULT_CACHE_ENABLED, STREAM_MAX_RESULTS, BATCH_MAX_QUERIES
+)
+from db_utils import (
+    db_connection, get_connection_pool, fetch_moments_by_ids, search_moments_by_embedding,
+    expand_keywords_fuzzy, parse_include, moment_columns_sql,
+    embedding_search_query, ranked_moments_query, stream_query, set_ivfflat_probes, set_hnsw_ef_search,
+    text_search_query, time_range_query, object_search_query, video_frames_query
+)
+from utils_server import (
+    parse_json_field, extract_keywords_from_sentence, build_prefix_tsquery, resolve_page_size,
+    encode_cursor, decode_cursor
+)
+from embedding_index import get_embedding_index, reload_embedding_index
+from ivfpq_index import get_ivfpq_index, reload_ivfpq_index, ivfpq_index_loaded
+from moment_timeline import get_moment_timeline
+from sequence_search import search_sequence, DEFAULT_MAX_GAP_SECONDS, MAX_SEQUENCE_STEPS
+from video_ranking import rank_videos, POOLING_METHODS
+from color_index import get_color_index, reload_color_index
+from query_planner import MultimodalQuery, DEFAULT_FUSION_WEIGHTS
+from result_cache import get_result_cache, make_cache_key
+from data_generation import get_generation_watcher
 
 # Import DRES client
 try:
@@ -18,6 +42,14 @@ except ImportError:
     DRES_AVAILABLE = False
     print("Warning: DRES client not available. VBS competition features will be disabled.")
 
+# Import the CLIP text encoder (needs torch + clip)
+try:
+    from text_encoder import get_text_encoder
+    CLIP_TEXT_AVAILABLE = True
+except ImportError:
+    CLIP_TEXT_AVAILABLE = False
+    print("Warning: CLIP text encoder not available. /api/search/clip-text will be disabled.")
+
 try:
     from flasgger import Swagger
     swagger = Swagger(app)
@@ -42,7 +74,8 @@ def health():
         'status': 'ok',
         'timestamp': datetime.now().isoformat(),
         'service': 'IR Video Retrieval API',
-        'dres_available': DRES_AVAILABLE
+        'dres_available': DRES_AVAILABLE,
+        'clip_text_available': CLIP_TEXT_AVAILABLE
     })
 
 @app.route('/api/videos/<video_id>/<filename>')
@@ -87,97 +120,288 @@ def transform_result(row):
     }
     if row.get('average_color_rgb'):
         transformed['dominant_colors'].append(parse_json_field(row.get('average_color_rgb')))
+
+    # Heavy fields are only present when requested with include=
+    if 'clip_embedding' in row:
+        transformed['clip_embedding'] = parse_json_field(row['clip_embedding'])
+    if 'detailed_features' in row:
+        transformed['detailed_features'] = parse_json_field(row['detailed_features'])
+    for column in ('text_relevance_score', 'object_relevance_score', 'color_relevance_score',
+                   'overall_relevance_score', 'extraction_success', 'created_at'):
+        if column in row:
+            transformed[column] = row[column]
     
     return transformed
 
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def wants_ndjson():
+    """Whether the client asked for a streamed NDJSON response (Accept: application/x-ndjson)."""
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def read_page_params(data, streaming=False):
+    """
+    Page size (capped at MAX_ITEMS_PER_PAGE) and decoded keyset cursor of a search request.
+
+    Streamed responses default to and are capped at STREAM_MAX_RESULTS instead.
+
+    Raises:
+        ValueError: for an invalid limit or cursor
+    """
+    if streaming:
+        limit = resolve_page_size(data.get('limit'), STREAM_MAX_RESULTS, STREAM_MAX_RESULTS)
+    else:
+        limit = resolve_page_size(data.get('limit'))
+    return limit, decode_cursor(data.get('cursor'))
+
+def stream_rows(sql, params, transform=transform_result, headers=None, setup=None):
+    """
+    Stream query results as NDJSON, one JSON object per line.
+
+    Rows are read through a named server-side cursor (STREAM_ITERSIZE rows per
+    round trip), so memory stays flat however many rows are returned. The
+    pooled connection is held until the stream ends or the client disconnects.
+
+    Args:
+        transform: Function turning a row into the emitted object
+        headers: Extra response headers (e.g. X-Total-Count)
+        setup: Optional function called with the connection before the query runs
+    """
+    def generate():
+        with db_connection() as conn:
+            if setup:
+                setup(conn)
+            for row in stream_query(conn, sql, params):
+                yield app.json.dumps(transform(row)) + "\n"
+
+    headers = {key: str(value) for key, value in (headers or {}).items() if value is not None}
+    return app.response_class(generate(), mimetype=NDJSON_MIMETYPE, headers=headers)
+
+def read_include(data):
+    """
+    Optional heavy fields requested with include= (JSON body or query string).
+
+    Raises:
+        ValueError: for unknown field names
+    """
+    return parse_include(data.get('include') or request.args.get('include'))
+
+def split_page(rows, limit, sort_key):
+    """
+    Split limit + 1 fetched rows into the page and the cursor of the next page
+    (None on the last page).
+    """
+    page = rows[:limit]
+    if len(rows) <= limit or not page:
+        return page, None
+    return page, encode_cursor(sort_key(page[-1]), page[-1]['moment_id'])
+
+def read_fusion_weights(data):
+    """
+    Optional /api/search/multimodal fusion weights: {'text' | 'color' | 'embedding': number >= 0}.
+
+    Raises:
+        ValueError: for anything else
+    """
+    weights = data.get('weights')
+    if weights is None:
+        return None
+    if not isinstance(weights, dict):
+        raise ValueError("weights must be an object mapping 'text', 'color' or 'embedding' to a number")
+    parsed = {}
+    for name, value in weights.items():
+        if name not in DEFAULT_FUSION_WEIGHTS:
+            raise ValueError(f"Unknown weight '{name}': use 'text', 'color' or 'embedding'")
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+            raise ValueError(f"Weight '{name}' must be a non-negative number")
+        parsed[name] = float(value)
+    return parsed
+
+def text_query_echo(data):
+    """Request-specific fields of a cached /api/search/text response."""
+    query = data.get('query')
+    return {'query': query, 'extracted_keywords': extract_keywords_from_sentence(query)}
+
+def multimodal_echo(data):
+    """Request-specific fields of a cached /api/search/multimodal response."""
+    text = data.get('text')
+    if not text:
+        return {}
+    return {'original_text': text, 'extracted_keywords': extract_keywords_from_sentence(text)}
+
+def cached_search(endpoint, echo=None):
+    """
+    Serve a search endpoint from the result cache.
+
+    Successful responses are cached under the normalized request payload. Fields
+    that are normalized away in the key (e.g. the original query text) are
+    re-filled from the current request by `echo` on a hit.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Streamed responses are never cached
+            if not RESULT_CACHE_ENABLED or wants_ndjson():
+                return view(*args, **kwargs)
+            data = request.get_json(silent=True) or {}
+            cache = get_result_cache()
+            # include= may also come from the query string (read_include); it changes the response
+            key = make_cache_key(endpoint, dict(data, include=data.get('include') or request.args.get('include')))
+            cached = cache.get(key)
+            if cached is not None:
+                payload = dict(cached, **echo(data)) if echo else cached
+                response = jsonify(payload)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            generation = cache.generation
+            response = view(*args, **kwargs)
+            if isinstance(response, app.response_class) and response.status_code == 200:
+                cache.put(key, response.get_json(), len(response.get_data()), generation)
+                response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+# Serializes index reloads, so back-to-back imports reload one after another
+_index_reload_lock = threading.Lock()
+
+def reload_indexes(generation):
+    """
+    Reload the resident embedding, color and (if loaded) IVF-PQ indexes after the
+    importers bumped the data generation. Queries keep using the previous
+    indexes until each new one is loaded.
+    """
+    with _index_reload_lock:
+        try:
+            reload_embedding_index()
+            reload_color_index()
+            # Re-attaches the IVF-PQ re-ranker to the new embedding index
+            if ivfpq_index_loaded():
+                reload_ivfpq_index()
+            print(f"Reloaded search indexes for data generation {generation}")
+        except Exception as e:
+            print(f"Warning: Could not reload search indexes: {e}")
+
+def reload_indexes_in_background(generation, previous):
+    """Generation listener: reload the indexes without blocking the request that noticed the change."""
+    # The first read only records the generation the indexes were loaded at
+    if previous is None:
+        return
+    threading.Thread(target=reload_indexes, args=(generation,), name='index-reload', daemon=True).start()
+
+def clear_result_cache(generation, previous):
+    """Generation listener: drop the cached responses of the previous generation."""
+    get_result_cache().apply_generation(generation)
+
+# Subscribers of the data generation watcher, independent of each other
+if RESULT_CACHE_ENABLED:
+    get_generation_watcher().add_listener(clear_result_cache)
+get_generation_watcher().add_listener(reload_indexes_in_background)
+
+@app.before_request
+def check_data_generation():
+    """Re-read the data generation (at most every DATA_GENERATION_CHECK_SECONDS)."""
+    get_generation_watcher().check()
+
+@app.route('/api/cache/stats', methods=['GET'])
+def result_cache_stats():
+    """Result cache hit/miss counters and size."""
+    if not RESULT_CACHE_ENABLED:
+        return jsonify({'enabled': False})
+    return jsonify(dict(get_result_cache().stats(), enabled=True))
+
 @app.route('/api/stats', methods=['GET'])
 def get_system_stats():
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
     try:
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        with db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
 
-        cursor.execute("SELECT COUNT(*) AS count FROM videos")
-        video_count = cursor.fetchone()['count']
+            cursor.execute("SELECT COUNT(*) AS count FROM videos")
+            video_count = cursor.fetchone()['count']
 
-        cursor.execute("SELECT COUNT(*) AS count FROM video_moments")
-        moment_count = cursor.fetchone()['count']
+            cursor.execute("SELECT COUNT(*) AS count FROM video_moments")
+            moment_count = cursor.fetchone()['count']
 
-        cursor.execute("SELECT COUNT(*) AS count FROM video_moments WHERE average_color_rgb IS NOT NULL")
-        color_count = cursor.fetchone()['count']
+            cursor.execute("SELECT COUNT(*) AS count FROM video_moments WHERE average_color_rgb IS NOT NULL")
+            color_count = cursor.fetchone()['count']
 
-        cursor.execute("SELECT COUNT(*) AS count FROM video_moments WHERE clip_embedding IS NOT NULL")
-        vector_count = cursor.fetchone()['count']
+            cursor.execute("SELECT COUNT(*) AS count FROM video_moments WHERE clip_embedding IS NOT NULL")
+            vector_count = cursor.fetchone()['count']
 
-        cursor.execute("SELECT SUM(duration_seconds) AS total, AVG(duration_seconds) AS avg FROM videos")
-        result = cursor.fetchone()
-        total_duration = result['total']
-        avg_duration = result['avg']
+            cursor.execute("SELECT SUM(duration_seconds) AS total, AVG(duration_seconds) AS avg FROM videos")
+            result = cursor.fetchone()
+            total_duration = result['total']
+            avg_duration = result['avg']
 
-        return jsonify({
-            'videos': video_count,
-            'moments': moment_count,
-            'moments_with_color': color_count,
-            'moments_with_embedding': vector_count,
-            'total_duration_seconds': float(total_duration or 0),
-            'average_duration_seconds': float(avg_duration or 0),
-            'last_updated': datetime.now().isoformat()
-        })
+            return jsonify({
+                'videos': video_count,
+                'moments': moment_count,
+                'moments_with_color': color_count,
+                'moments_with_embedding': vector_count,
+                'total_duration_seconds': float(total_duration or 0),
+                'average_duration_seconds': float(avg_duration or 0),
+                'last_updated': datetime.now().isoformat(),
+                'connection_pool': get_connection_pool().stats()
+            })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/search/keywords', methods=['POST'])
+@cached_search('keywords')
 def search_by_keywords():
     data = request.get_json()
     keywords = data.get('keywords', [])
     match_all = data.get('match_all', False)
-    limit = data.get('limit', 50)
+    fuzzy = data.get('fuzzy', False)
+    fuzzy_threshold = float(data.get('fuzzy_threshold', OCR_FUZZY_SIMILARITY))
 
     if not keywords:
         return jsonify({'error': 'keywords array is required'}), 400
-
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        where_clauses = []
-        params = []
-
-        for word in keywords:
-            where_clauses.append("array_to_string(m.extracted_search_words, ' ') ILIKE %s")
-            params.append(f'%{word}%')
-
-        clause = " AND ".join(where_clauses) if match_all else " OR ".join(where_clauses)
-        sql = f"""
-            SELECT m.*, v.original_filename FROM video_moments m
-            JOIN videos v ON m.video_id = v.video_id
-            WHERE {clause}
-            ORDER BY m.timestamp_seconds
-            LIMIT %s
-        """
-        params.append(limit)
-        cursor.execute(sql, params)
-        results = cursor.fetchall()
-
-        formatted = [transform_result(row) for row in results]
+        limit, after = read_page_params(data)
+        include = read_include(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        return jsonify({'results': formatted, 'count': len(formatted)})
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            # Optionally expand keywords to similar (noisy) OCR vocabulary words
+            expansions = expand_keywords_fuzzy(conn, keywords, fuzzy_threshold) if fuzzy else None
+            # Keywords only match OCR words, which carry weight A in search_document
+            tsquery = build_prefix_tsquery(keywords, match_all=match_all, weights='A', expansions=expansions)
+            if not tsquery:
+                return jsonify({'error': 'No searchable keywords provided'}), 400
+
+            # Keyset pagination on (score, moment_id): resume right after the cursor row
+            cursor.execute(*text_search_query(tsquery, limit + 1, after=after, include=include))
+            results, next_cursor = split_page(cursor.fetchall(), limit, lambda row: row['score'])
+
+            formatted = [transform_result(row) for row in results]
+
+            response_data = {'results': formatted, 'count': len(formatted), 'next_cursor': next_cursor}
+            if fuzzy:
+                response_data['expanded_keywords'] = expansions
+            return jsonify(response_data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/search/text', methods=['POST'])
+@cached_search('text', echo=text_query_echo)
 def search_by_text():
     data = request.get_json()
     query = data.get('query')
-    limit = data.get('limit', 50)
+    fuzzy = data.get('fuzzy', False)
+    fuzzy_threshold = float(data.get('fuzzy_threshold', OCR_FUZZY_SIMILARITY))
 
     if not query:
         return jsonify({'error': 'Missing query'}), 400
+    try:
+        limit, after = read_page_params(data)
+        include = read_include(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     # Extract keywords from the user's sentence
     keywords = extract_keywords_from_sentence(query)
@@ -185,118 +409,502 @@ def search_by_text():
     if not keywords:
         return jsonify({'error': 'No meaningful keywords found in query'}), 400
 
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        
-        # Build SQL query to search for any of the extracted keywords
-        where_clauses = []
-        params = []
+        with db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
         
-        for keyword in keywords:
-            # Search in extracted_search_words, detected_object_names, and filename
-            where_clauses.append("""
-                (array_to_string(m.extracted_search_words, ' ') ILIKE %s
-                 OR array_to_string(m.detected_object_names, ' ') ILIKE %s
-                 OR v.original_filename ILIKE %s)
-            """)
-            params.extend([f'%{keyword}%', f'%{keyword}%', f'%{keyword}%'])
-        
-        # Use OR to match any of the keywords and order by pre-computed text relevance score
-        sql = f"""
-            SELECT m.*, v.original_filename, v.compressed_filename, v.duration_seconds,
-                   m.text_relevance_score as score
-            FROM video_moments m
-            JOIN videos v ON m.video_id = v.video_id
-            WHERE {' OR '.join(where_clauses)}
-            ORDER BY m.text_relevance_score DESC, m.timestamp_seconds
-            LIMIT %s
-        """
-        params.append(limit)
-        
-        cursor.execute(sql, params)
-        results = cursor.fetchall()
-
-        formatted = [transform_result(row) for row in results]
-
-        return jsonify({
-            'results': formatted, 
-            'count': len(formatted),
-            'extracted_keywords': keywords,
-            'query': query,
-            'score_type': 'pre_computed_text_relevance'
-        })
+            # Match any of the extracted keywords (prefix match, plus similar OCR words
+            # when fuzzy matching is requested) and rank with ts_rank
+            expansions = expand_keywords_fuzzy(conn, keywords, fuzzy_threshold) if fuzzy else None
+            tsquery = build_prefix_tsquery(keywords, expansions=expansions)
+            cursor.execute(*text_search_query(tsquery, limit + 1, after=after, include=include))
+            results, next_cursor = split_page(cursor.fetchall(), limit, lambda row: row['score'])
+
+            formatted = [transform_result(row) for row in results]
+
+            response_data = {
+                'results': formatted, 
+                'count': len(formatted),
+                'next_cursor': next_cursor,
+                'extracted_keywords': keywords,
+                'query': query,
+                'score_type': 'ts_rank'
+            }
+            if fuzzy:
+                response_data['expanded_keywords'] = expansions
+            return jsonify(response_data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/search/color', methods=['POST'])
+@cached_search('color')
 def search_by_color():
     data = request.get_json()
     color = data.get('color')
     threshold = data.get('threshold', 50)
-    limit = data.get('limit', 50)
 
     if not color or len(color) != 3:
         return jsonify({'error': 'Invalid RGB color'}), 400
 
-    conn = get_db_connection()
+    streaming = wants_ndjson()
     try:
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cursor.execute("""
-            SELECT m.*, v.original_filename, v.compressed_filename, v.duration_seconds
-            FROM video_moments m
-            JOIN videos v ON m.video_id = v.video_id
-            WHERE m.average_color_rgb IS NOT NULL
-        """)
-        rows = cursor.fetchall()
+        limit, after = read_page_params(data, streaming=streaming)
+        include = read_include(data)
+        # One extra match tells whether there is a next page
+        matches, total = get_color_index().search(color, threshold=float(threshold), limit=limit + 1, after=after)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        results = []
-        for row in rows:
-            moment_color = parse_json_field(row['average_color_rgb'])
-            distance = color_distance(color, moment_color)
-            if distance <= threshold:
-                row['score'] = 1.0 - (distance / 100.0) # Convert distance to similarity
+    next_cursor = encode_cursor(matches[limit - 1][1], matches[limit - 1][0]) if len(matches) > limit else None
+    matches = matches[:limit]
+    if streaming:
+        sql, params = ranked_moments_query(
+            [moment_id for moment_id, _ in matches],
+            [1.0 - (distance / 100.0) for _, distance in matches],
+            include=include
+        )
+        return stream_rows(sql, params, headers={'X-Total-Count': total, 'X-Next-Cursor': next_cursor})
+    try:
+        with db_connection() as conn:
+            rows = fetch_moments_by_ids(conn, [moment_id for moment_id, _ in matches], include=include)
+            distances = dict(matches)
+            results = []
+            for row in rows:
+                row['score'] = 1.0 - (distances[row['moment_id']] / 100.0) # Convert distance to similarity
                 results.append(transform_result(row))
 
-        results.sort(key=lambda r: -r['score'])
-        return jsonify({'results': results[:limit], 'count': len(results)})
+            return jsonify({'results': results, 'count': total, 'next_cursor': next_cursor})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
+
+VECTOR_SEARCH_MODES = ('memory', 'pgvector', 'ivfpq')
+
+def check_vector_search_mode(mode):
+    """Raise ValueError for an unknown vector search mode."""
+    if mode not in VECTOR_SEARCH_MODES:
+        raise ValueError("mode must be 'memory', 'pgvector' or 'ivfpq'")
+
+def default_probes(mode):
+    """Lists probed per query when the request does not set 'probes'."""
+    return IVFPQ_NPROBE if mode == 'ivfpq' else IVFFLAT_PROBES
+
+def search_resident_index(embedding, threshold, limit, mode, probes, after=None):
+    """Rank on the exact embedding matrix ('memory') or the IVF-PQ index ('ivfpq')."""
+    if mode == 'ivfpq':
+        return get_ivfpq_index().search(embedding, threshold=threshold, limit=limit, nprobe=probes, after=after)
+    return get_embedding_index().search(embedding, threshold=threshold, limit=limit, after=after)
+
+def run_vector_search(embedding, threshold, limit, mode, probes, ef_search, after=None, include=()):
+    """
+    Rank moments by cosine similarity to an embedding.
+
+    Args:
+        after: Optional keyset cursor (similarity in memory and ivfpq mode, distance in pgvector mode, moment_id)
+        include: Optional heavy fields to select (see db_utils.OPTIONAL_MOMENT_COLUMNS)
+
+    Returns:
+        (list of transformed results, total number of matches, cursor of the next page or None)
+    """
+    check_vector_search_mode(mode)
+
+    if mode == 'pgvector':
+        with db_connection() as conn:
+            rows = search_moments_by_embedding(
+                conn, embedding, threshold, limit + 1, probes, ef_search, after=after, include=include
+            )
+        rows, next_cursor = split_page(rows, limit, lambda row: row['distance'])
+        results = [transform_result(row) for row in rows]
+        return results, len(results), next_cursor
+
+    matches, total = search_resident_index(embedding, threshold, limit + 1, mode, probes, after=after)
+    next_cursor = encode_cursor(matches[limit - 1][1], matches[limit - 1][0]) if len(matches) > limit else None
+    matches = matches[:limit]
+    with db_connection() as conn:
+        rows = fetch_moments_by_ids(conn, [moment_id for moment_id, _ in matches], include=include)
+    scores = dict(matches)
+    results = []
+    for row in rows:
+        row['similarity_score'] = scores[row['moment_id']]
+        results.append(transform_result(row))
+    return results, total, next_cursor
+
+def stream_vector_search(embedding, threshold, limit, mode, probes, ef_search, after=None, include=()):
+    """NDJSON variant of run_vector_search."""
+    check_vector_search_mode(mode)
+
+    if mode == 'pgvector':
+        def setup(conn):
+            cursor = conn.cursor()
+            set_ivfflat_probes(cursor, probes)
+            set_hnsw_ef_search(cursor, max(ef_search, limit))
+        sql, params = embedding_search_query(embedding, threshold, limit, after=after, include=include)
+        return stream_rows(sql, params, setup=setup, headers={'X-Search-Mode': mode})
+
+    matches, total = search_resident_index(embedding, threshold, limit + 1, mode, probes, after=after)
+    next_cursor = encode_cursor(matches[limit - 1][1], matches[limit - 1][0]) if len(matches) > limit else None
+    matches = matches[:limit]
+    sql, params = ranked_moments_query(
+        [moment_id for moment_id, _ in matches], [score for _, score in matches], include=include
+    )
+    return stream_rows(sql, params, headers={
+        'X-Search-Mode': mode, 'X-Total-Count': total, 'X-Next-Cursor': next_cursor
+    })
+
+def read_video_ranking(data):
+    """
+    Video ranking options of a vector / CLIP-text request.
+
+    Returns:
+        None for the default flat moment list (rank_by='moment'), else the
+        keyword arguments of video_ranking.rank_videos
+
+    Raises:
+        ValueError: for an unknown rank_by or pooling method, or out-of-range options
+    """
+    rank_by = data.get('rank_by', 'moment')
+    if rank_by == 'moment':
+        return None
+    if rank_by != 'video':
+        raise ValueError("rank_by must be 'moment' or 'video'")
+    ranking = {
+        'pooling': data.get('pooling', 'max'),
+        'top_m': int(data.get('top_m', 3)),
+        'temperature': float(data.get('temperature', 0.05)),
+        'moments_per_video': int(data.get('moments_per_video', 3)),
+    }
+    if ranking['pooling'] not in POOLING_METHODS:
+        raise ValueError(f"pooling must be one of {', '.join(POOLING_METHODS)}")
+    if ranking['top_m'] < 1 or ranking['moments_per_video'] < 1 or ranking['temperature'] <= 0:
+        raise ValueError("top_m and moments_per_video must be >= 1 and temperature > 0")
+    return ranking
+
+def score_videos(embedding, threshold, limit, mode, ranking, after=None):
+    """
+    Rank videos by their pooled moment similarities on the resident embedding matrix.
+
+    Returns:
+        (list of (video_id, video score, moment count, [(moment_id, similarity)]),
+         number of matching videos, cursor of the next page or None)
+    """
+    if mode != 'memory':
+        raise ValueError("rank_by='video' needs mode 'memory'")
+    timeline = get_moment_timeline()
+    ranked, total = rank_videos(
+        timeline, get_embedding_index().scores(embedding), threshold, limit + 1, after=after, **ranking
+    )
+    next_cursor = encode_cursor(ranked[limit - 1][1], ranked[limit - 1][0]) if len(ranked) > limit else None
+    return ranked[:limit], total, next_cursor
+
+def video_results(ranked, rows):
+    """Per-video response entries from the ranked videos and their fetched moment rows."""
+    rows_by_id = {row['moment_id']: row for row in rows}
+    return [
+        {
+            'video_id': video_id,
+            'score': score,
+            'moment_count': moment_count,
+            'moments': [
+                transform_result(dict(rows_by_id[moment_id], similarity_score=similarity))
+                for moment_id, similarity in moments if moment_id in rows_by_id
+            ],
+        }
+        for video_id, score, moment_count, moments in ranked
+    ]
+
+def run_video_search(embedding, threshold, limit, mode, ranking, after=None, include=()):
+    """
+    Video-level variant of run_vector_search.
+
+    Args:
+        after: Optional keyset cursor (video score, video_id)
+
+    Returns:
+        (list of videos with their best moments, number of matching videos, cursor of the next page or None)
+    """
+    ranked, total, next_cursor = score_videos(embedding, threshold, limit, mode, ranking, after=after)
+    moment_ids = [moment_id for _, _, _, moments in ranked for moment_id, _ in moments]
+    with db_connection() as conn:
+        rows = fetch_moments_by_ids(conn, moment_ids, include=include)
+    return video_results(ranked, rows), total, next_cursor
 
 @app.route('/api/search/vector', methods=['POST'])
+@cached_search('vector')
 def search_by_vector():
     data = request.get_json()
     embedding = data.get('embedding')
     threshold = data.get('threshold', 0.7)
-    limit = data.get('limit', 50)
+    mode = data.get('mode', VECTOR_SEARCH_MODE)
+    probes = data.get('probes', default_probes(mode))
+    ef_search = data.get('ef_search', HNSW_EF_SEARCH)
 
     if not embedding:
         return jsonify({'error': 'Missing embedding'}), 400
 
-    conn = get_db_connection()
     try:
-        rows = fetch_all_moments_with_colors_and_embeddings(conn)
-        results = []
+        streaming = wants_ndjson()
+        limit, after = read_page_params(data, streaming=streaming)
+        include = read_include(data)
+        ranking = read_video_ranking(data)
+        if ranking is not None:
+            if streaming:
+                raise ValueError("rank_by='video' responses cannot be streamed")
+            results, total, next_cursor = run_video_search(
+                embedding, float(threshold), limit, mode, ranking, after=after, include=include
+            )
+            return jsonify({'results': results, 'count': total, 'mode': mode, 'rank_by': 'video',
+                            'next_cursor': next_cursor})
+        if streaming:
+            return stream_vector_search(
+                embedding, float(threshold), limit, mode, int(probes), int(ef_search), after=after, include=include
+            )
+        results, total, next_cursor = run_vector_search(
+            embedding, float(threshold), limit, mode, int(probes), int(ef_search), after=after, include=include
+        )
+        return jsonify({'results': results, 'count': total, 'mode': mode, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        for row in rows:
-            moment_embedding = parse_json_field(row['clip_embedding'])
-            score = cosine_similarity_score(embedding, moment_embedding)
-            if score >= threshold:
-                row['similarity_score'] = score
-                results.append(transform_result(row))
+@app.route('/api/search/clip-text', methods=['POST'])
+@cached_search('clip-text', echo=lambda data: {'query': data.get('query')})
+def search_by_clip_text():
+    """Encode a text query with CLIP on the server and rank moments by similarity."""
+    if not CLIP_TEXT_AVAILABLE:
+        return jsonify({
+            'error': 'CLIP text encoder not available',
+            'message': 'torch and clip must be installed for text-to-CLIP search'
+        }), 503
+
+    data = request.get_json()
+    query = data.get('query')
+    threshold = data.get('threshold', DEFAULT_CLIP_TEXT_THRESHOLD)
+    mode = data.get('mode', VECTOR_SEARCH_MODE)
+    probes = data.get('probes', default_probes(mode))
+    ef_search = data.get('ef_search', HNSW_EF_SEARCH)
+
+    if not query:
+        return jsonify({'error': 'Missing query'}), 400
+    try:
+        limit, after = read_page_params(data)
+        include = read_include(data)
+        ranking = read_video_ranking(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        embedding = get_text_encoder().encode(query)
+    except Exception as e:
+        return jsonify({'error': 'Text encoding failed', 'message': str(e)}), 503
+
+    try:
+        if ranking is not None:
+            results, total, next_cursor = run_video_search(
+                embedding, float(threshold), limit, mode, ranking, after=after, include=include
+            )
+            return jsonify({'results': results, 'count': total, 'query': query, 'mode': mode,
+                            'rank_by': 'video', 'next_cursor': next_cursor})
+        results, total, next_cursor = run_vector_search(
+            embedding, float(threshold), limit, mode, int(probes), int(ef_search), after=after, include=include
+        )
+        return jsonify({'results': results, 'count': total, 'query': query, 'mode': mode, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def read_batch_queries(data):
+    """
+    Validate the queries of a /api/search/batch request.
+
+    Top-level threshold, limit, video_id, start_time and end_time are defaults
+    for every query.
+
+    Returns:
+        List of dicts with 'embedding' or 'text', 'threshold', 'limit' and 'filters'
+
+    Raises:
+        ValueError: for a missing, oversized or malformed query list
+    """
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not queries:
+        raise ValueError("queries must be a non-empty list")
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise ValueError(f"At most {BATCH_MAX_QUERIES} queries per batch")
+
+    specs = []
+    for position, query in enumerate(queries):
+        if not isinstance(query, dict) or not (query.get('embedding') or query.get('query')):
+            raise ValueError(f"Query {position} needs an 'embedding' or a text 'query'")
+        settings = dict(data, **query)
+        default_threshold = 0.7 if query.get('embedding') else DEFAULT_CLIP_TEXT_THRESHOLD
+        specs.append({
+            'embedding': query.get('embedding'),
+            'text': None if query.get('embedding') else query['query'],
+            'threshold': float(settings.get('threshold', default_threshold)),
+            'limit': resolve_page_size(settings.get('limit')),
+            'filters': {name: settings.get(name) for name in ('video_id', 'start_time', 'end_time')},
+        })
+    return specs
+
+def score_batch(specs):
+    """
+    Score the (encoded) queries of a batch in one pass over the embedding matrix.
+
+    Returns:
+        One (list of (moment_id, similarity), total number of matches) per query
+    """
+    index = get_embedding_index()
+    masks = None
+    if any(value is not None for spec in specs for value in spec['filters'].values()):
+        timeline = get_moment_timeline()
+        masks = [timeline.filter_mask(**spec['filters']) for spec in specs]
+    return index.search_batch(
+        [spec['embedding'] for spec in specs], [spec['threshold'] for spec in specs],
+        [spec['limit'] for spec in specs], masks=masks
+    )
+
+def batch_results(matches, rows):
+    """Per-query response entries of a batch from its matches and the fetched moment rows."""
+    rows_by_id = {row['moment_id']: row for row in rows}
+    entries = []
+    for position, (query_matches, total) in enumerate(matches):
+        results = [
+            transform_result(dict(rows_by_id[moment_id], similarity_score=score))
+            for moment_id, score in query_matches if moment_id in rows_by_id
+        ]
+        entries.append({'index': position, 'results': results, 'count': total})
+    return entries
+
+@app.route('/api/search/batch', methods=['POST'])
+@cached_search('batch')
+def search_batch():
+    """Run several embedding / CLIP-text queries in one blocked scoring pass over the embedding matrix."""
+    data = request.get_json()
+    try:
+        specs = read_batch_queries(data)
+        include = read_include(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    texts = [spec['text'] for spec in specs if spec['text'] is not None]
+    if texts:
+        if not CLIP_TEXT_AVAILABLE:
+            return jsonify({
+                'error': 'CLIP text encoder not available',
+                'message': 'torch and clip must be installed for text queries'
+            }), 503
+        try:
+            encoded = iter(get_text_encoder().encode_many(texts))
+        except Exception as e:
+            return jsonify({'error': 'Text encoding failed', 'message': str(e)}), 503
+        for spec in specs:
+            if spec['text'] is not None:
+                spec['embedding'] = next(encoded)
+
+    try:
+        matches = score_batch(specs)
+        moment_ids = list(dict.fromkeys(moment_id for query_matches, _ in matches for moment_id, _ in query_matches))
+        with db_connection() as conn:
+            rows = fetch_moments_by_ids(conn, moment_ids, include=include)
+        return jsonify({'results': batch_results(matches, rows), 'count': len(specs)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def read_sequence_steps(data):
+    """
+    Validate the steps of a /api/search/sequence request.
+
+    Each step has one of 'embedding', 'query' (CLIP text), 'text' (OCR /
+    full-text keywords), 'objects' or 'color'; steps after the first may set
+    'max_gap' / 'min_gap' in seconds (top-level values are defaults).
+
+    Raises:
+        ValueError: for a missing, oversized or malformed step list
+    """
+    steps = data.get('steps')
+    if not isinstance(steps, list) or len(steps) < 2:
+        raise ValueError("steps must be a list of at least two sub-queries")
+    if len(steps) > MAX_SEQUENCE_STEPS:
+        raise ValueError(f"At most {MAX_SEQUENCE_STEPS} steps per sequence")
+
+    specs = []
+    for position, step in enumerate(steps):
+        if not isinstance(step, dict):
+            raise ValueError(f"Step {position} must be an object")
+        settings = dict(data, **step)
+        spec = {'max_gap': float(settings.get('max_gap', DEFAULT_MAX_GAP_SECONDS)),
+                'min_gap': float(settings.get('min_gap', 0.0))}
+        if step.get('embedding'):
+            spec.update(embedding=step['embedding'], threshold=float(step.get('threshold', 0.7)))
+        elif step.get('query'):
+            spec.update(clip_text=step['query'], threshold=float(step.get('threshold', DEFAULT_CLIP_TEXT_THRESHOLD)))
+        elif step.get('text'):
+            keywords = extract_keywords_from_sentence(step['text'])
+            if not keywords:
+                raise ValueError(f"Step {position} has no searchable keywords")
+            spec['tsquery'] = build_prefix_tsquery(keywords)
+        elif step.get('objects'):
+            spec['objects'] = list(step['objects'])
+        elif step.get('color') is not None:
+            spec.update(color=step['color'], color_threshold=float(step.get('color_threshold', 50)))
+        else:
+            raise ValueError(f"Step {position} needs an 'embedding', 'query', 'text', 'objects' or 'color'")
+        specs.append(spec)
+    return specs
+
+@app.route('/api/search/sequence', methods=['POST'])
+@cached_search('sequence')
+def search_by_sequence():
+    """Find videos in which the steps occur in order, each within its gap of the previous one."""
+    data = request.get_json()
+    video_id = data.get('video_id')
+    try:
+        specs = read_sequence_steps(data)
+        limit = resolve_page_size(data.get('limit'), default=20)
+        include = read_include(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        results.sort(key=lambda r: -r['score'])
-        return jsonify({'results': results[:limit], 'count': len(results)})
+    texts = [spec['clip_text'] for spec in specs if 'clip_text' in spec]
+    if texts:
+        if not CLIP_TEXT_AVAILABLE:
+            return jsonify({
+                'error': 'CLIP text encoder not available',
+                'message': 'torch and clip must be installed for text queries'
+            }), 503
+        try:
+            encoded = iter(get_text_encoder().encode_many(texts))
+        except Exception as e:
+            return jsonify({'error': 'Text encoding failed', 'message': str(e)}), 503
+        for spec in specs:
+            if 'clip_text' in spec:
+                spec['embedding'] = next(encoded)
+
+    try:
+        with db_connection() as conn:
+            chains, total = search_sequence(conn, get_moment_timeline(), specs, video_id=video_id, limit=limit)
+            moment_ids = [moment_id for chain in chains for moment_id, _ in chain['moments']]
+            rows = {row['moment_id']: row for row in fetch_moments_by_ids(conn, moment_ids, include=include)}
+        results = []
+        for chain in chains:
+            moments = []
+            for step, (moment_id, score) in enumerate(chain['moments']):
+                if moment_id in rows:
+                    moments.append(dict(transform_result(dict(rows[moment_id], score=score)), step=step))
+            results.append({'video_id': chain['video_id'], 'score': chain['score'], 'moments': moments})
+        return jsonify({'results': results, 'count': total})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/search/multimodal', methods=['POST'])
+@cached_search('multimodal', echo=multimodal_echo)
 def multimodal_search():
     data = request.get_json()
     text = data.get('text')
@@ -306,186 +914,128 @@ def multimodal_search():
     start_time = data.get('start_time')
     end_time = data.get('end_time')
     embedding = data.get('embedding')
-    limit = int(data.get('limit', 50))
     color_threshold = int(data.get('color_threshold', 50))
     sim_threshold = float(data.get('similarity_threshold', 0.7))
+    mode = data.get('mode', VECTOR_SEARCH_MODE)
+    # The planner scores the embedding only on a pre-filtered candidate set, which the
+    # exact resident matrix does faster than IVF-PQ: 'ivfpq' runs as 'memory'
+    if mode == 'ivfpq':
+        mode = 'memory'
+    probes = int(data.get('probes', IVFFLAT_PROBES))
+    ef_search = int(data.get('ef_search', HNSW_EF_SEARCH))
+    fuzzy = data.get('fuzzy', False)
+    fuzzy_threshold = float(data.get('fuzzy_threshold', OCR_FUZZY_SIMILARITY))
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        where_clauses = []
-        params = []
-        keywords = []
-
-        if text:
-            # Extract keywords from the text input
-            keywords = extract_keywords_from_sentence(text)
-            if keywords:
-                # Build keyword search clauses
-                keyword_clauses = []
-                for keyword in keywords:
-                    keyword_clauses.append("""
-                        (array_to_string(m.extracted_search_words, ' ') ILIKE %s
-                         OR array_to_string(m.detected_object_names, ' ') ILIKE %s
-                         OR v.original_filename ILIKE %s)
-                    """)
-                    params.extend([f'%{keyword}%', f'%{keyword}%', f'%{keyword}%'])
-                
-                # Use OR to match any of the keywords
-                where_clauses.append(f"({' OR '.join(keyword_clauses)})")
-        
-        if objects:
-            for obj in objects:
-                where_clauses.append("m.detected_object_names @> ARRAY[%s]")
-                params.append(obj)
-        if words:
-            where_clauses.append("m.extracted_search_words @> ARRAY[%s]")
-            params.append(words)
-        if start_time is not None and end_time is not None:
-            where_clauses.append("m.timestamp_seconds BETWEEN %s AND %s")
-            params.extend([start_time, end_time])
-
-        sql = """
-            SELECT m.*, v.original_filename, v.compressed_filename, v.duration_seconds
-            FROM video_moments m
-            JOIN videos v ON m.video_id = v.video_id
-        """
-        if where_clauses:
-            sql += " WHERE " + " AND ".join(where_clauses)
-        sql += " LIMIT %s"
-        params.append(limit)
-
-        cursor.execute(sql, params)
-        rows = cursor.fetchall()
-
-        # Now filter in Python for color and embedding if needed
-        results = []
-        for row in rows:
-            ok = True
-            # Score for text-based search
-            if keywords:
-                match_count = 0
-                total_keywords = len(keywords)
-                for kw in keywords:
-                    if 'extracted_search_words' in row and row['extracted_search_words'] and kw in row['extracted_search_words']:
-                        match_count += 1
-                    elif 'detected_object_names' in row and row['detected_object_names'] and kw in row['detected_object_names']:
-                        match_count += 1
-                    elif 'original_filename' in row and row['original_filename'] and kw in row['original_filename'].lower():
-                        match_count += 1
-                row['score'] = match_count / total_keywords if total_keywords else 0
-            if color and row.get('average_color_rgb'):
-                dist = color_distance(color, parse_json_field(row['average_color_rgb']))
-                if dist > color_threshold:
-                    ok = False
-                else:
-                    row['score'] = 1.0 - (dist / 100.0)
-            if embedding and row.get('clip_embedding'):
-                sim = cosine_similarity_score(embedding, parse_json_field(row['clip_embedding']))
-                if sim < sim_threshold:
-                    ok = False
-                else:
-                    # If both color and vector are present, average their scores? For now, just use vector sim
-                    row['similarity_score'] = sim
-            if ok:
+        limit, after = read_page_params(data)
+        include = read_include(data)
+        weights = read_fusion_weights(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        with db_connection() as conn:
+            keywords = []
+            tsquery = None
+            expansions = None
+
+            if text:
+                # Extract keywords from the text input
+                keywords = extract_keywords_from_sentence(text)
+                if keywords:
+                    # Match any of the keywords through the full-text index
+                    expansions = expand_keywords_fuzzy(conn, keywords, fuzzy_threshold) if fuzzy else None
+                    tsquery = build_prefix_tsquery(keywords, expansions=expansions)
+
+            # The planner pushes selective predicates into SQL, scores color and
+            # embedding on the resident matrices and fuses scores before the limit
+            query = MultimodalQuery(
+                conn, tsquery=tsquery, objects=objects, words=words, start_time=start_time, end_time=end_time,
+                color=color, color_threshold=color_threshold, embedding=embedding, sim_threshold=sim_threshold,
+                mode=mode, probes=probes, ef_search=max(ef_search, limit), weights=weights
+            )
+            plan = query.plan()
+            matches, total, next_cursor = query.execute(limit, after=after)
+
+            rows = fetch_moments_by_ids(conn, [moment_id for moment_id, _ in matches], include=include)
+            scores = dict(matches)
+            results = []
+            for row in rows:
+                row['score'] = scores[row['moment_id']]
                 results.append(transform_result(row))
-        
-        # Sort by score if available
-        if results and results[0].get('score', 0.0) > 0.0:
-            results.sort(key=lambda r: -r['score'])
 
-        response_data = {'results': results, 'count': len(results)}
-        
-        # Add extracted keywords to response if text search was used
-        if text:
-            response_data['extracted_keywords'] = keywords
-            response_data['original_text'] = text
+            response_data = {'results': results, 'count': total, 'next_cursor': next_cursor, 'plan': plan}
+
+            # Add extracted keywords to response if text search was used
+            if text:
+                response_data['extracted_keywords'] = keywords
+                response_data['original_text'] = text
+                if fuzzy and keywords:
+                    response_data['expanded_keywords'] = expansions
 
-        return jsonify(response_data)
+            return jsonify(response_data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         app.logger.error(f"Error in multimodal_search: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/search/temporal', methods=['POST'])
+@cached_search('temporal')
 def search_by_time():
     data = request.get_json()
     start = data.get('start_time', 0)
     end = data.get('end_time')
     video_id = data.get('video_id')
-    limit = data.get('limit', 50)
 
     if end is None:
         return jsonify({'error': 'end_time is required'}), 400
-
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        sql = """
-            SELECT m.*, v.original_filename, v.compressed_filename, v.duration_seconds
-            FROM video_moments m
-            JOIN videos v ON m.video_id = v.video_id
-            WHERE m.timestamp_seconds BETWEEN %s AND %s
-        """
-        params = [start, end]
-        if video_id:
-            sql += " AND m.video_id = %s"
-            params.append(video_id)
-
-        sql += " ORDER BY m.timestamp_seconds LIMIT %s"
-        params.append(limit)
+        limit, after = read_page_params(data)
+        include = read_include(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        cursor.execute(sql, params)
-        results = cursor.fetchall()
-        formatted = [transform_result(row) for row in results]
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            cursor.execute(*time_range_query(start, end, limit + 1, video_id=video_id, after=after, include=include))
+            results, next_cursor = split_page(cursor.fetchall(), limit, lambda row: row['timestamp_seconds'])
+            formatted = [transform_result(row) for row in results]
 
-        return jsonify({'results': formatted, 'count': len(formatted)})
+            return jsonify({'results': formatted, 'count': len(formatted), 'next_cursor': next_cursor})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/search/objects', methods=['POST'])
+@cached_search('objects')
 def search_by_objects():
     data = request.get_json()
     objects = data.get('objects', [])
     match_all = data.get('match_all', False)
-    limit = data.get('limit', 50)
 
     if not objects:
         return jsonify({'error': 'objects array is required'}), 400
-
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        where_clauses = []
-        params = []
-
-        for obj in objects:
-            where_clauses.append("array_to_string(m.detected_object_names, ' ') ILIKE %s")
-            params.append(f'%{obj}%')
+        limit, after = read_page_params(data)
+        include = read_include(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        clause = " AND ".join(where_clauses) if match_all else " OR ".join(where_clauses)
-        sql = f"""
-            SELECT m.*, v.original_filename, v.compressed_filename, v.duration_seconds
-            FROM video_moments m
-            JOIN videos v ON m.video_id = v.video_id
-            WHERE {clause}
-            ORDER BY m.timestamp_seconds
-            LIMIT %s
-        """
-        params.append(limit)
-        cursor.execute(sql, params)
-        results = cursor.fetchall()
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            cursor.execute(*object_search_query(objects, limit + 1, match_all=match_all, after=after, include=include))
+            results, next_cursor = split_page(cursor.fetchall(), limit, lambda row: row['timestamp_seconds'])
 
-        formatted = [transform_result(row) for row in results]
+            formatted = [transform_result(row) for row in results]
 
-        return jsonify({'results': formatted, 'count': len(formatted)})
+            return jsonify({'results': formatted, 'count': len(formatted), 'next_cursor': next_cursor})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/search/segment', methods=['POST'])
+@cached_search('segment')
 def search_video_segment():
     data = request.get_json()
     video_id = data.get('video_id')
@@ -494,29 +1044,31 @@ def search_video_segment():
 
     if not video_id or timestamp is None:
         return jsonify({'error': 'video_id and timestamp are required'}), 400
-
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cursor.execute("""
-            SELECT m.*, v.original_filename, v.compressed_filename, v.duration_seconds,
-            ABS(m.timestamp_seconds - %s) as time_diff
-            FROM video_moments m
-            JOIN videos v ON m.video_id = v.video_id
-            WHERE m.video_id = %s
-            AND ABS(m.timestamp_seconds - %s) <= %s
-            ORDER BY time_diff
-            LIMIT 10
-        """, [timestamp, video_id, timestamp, tolerance])
-
-        results = cursor.fetchall()
-        formatted = [transform_result(row) for row in results]
+        include = read_include(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        return jsonify({'results': formatted, 'count': len(formatted)})
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            cursor.execute(f"""
+                SELECT {moment_columns_sql(include)},
+                ABS(m.timestamp_seconds - %s) as time_diff
+                FROM video_moments m
+                JOIN videos v ON m.video_id = v.video_id
+                WHERE m.video_id = %s
+                AND ABS(m.timestamp_seconds - %s) <= %s
+                ORDER BY time_diff
+                LIMIT 10
+            """, [timestamp, video_id, timestamp, tolerance])
+
+            results = cursor.fetchall()
+            formatted = [transform_result(row) for row in results]
+
+            return jsonify({'results': formatted, 'count': len(formatted)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 # ============================================================================
 # DRES (VBS Competition) Endpoints
@@ -825,6 +1377,11 @@ def explore_video(video_id):
         in: path
         type: string
         required: true
+      - name: include
+        in: query
+        type: string
+        required: false
+        description: Comma-separated heavy fields to add (clip_embedding, detailed_features, relevance_scores, extraction_success, created_at)
     responses:
       200:
         description: List of frames
@@ -840,16 +1397,34 @@ def explore_video(video_id):
       500:
         description: Error
     """
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cursor.execute("SELECT * FROM video_moments WHERE video_id = %s ORDER BY timestamp_seconds", (video_id,))
-        frames = cursor.fetchall()
-        return jsonify({'frames': frames, 'count': len(frames)})
+        include = read_include({})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    sql, params = video_frames_query(video_id, include)
+    if wants_ndjson():
+        return stream_rows(sql, params, transform=dict)
+
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            cursor.execute(sql, params)
+            frames = cursor.fetchall()
+            return jsonify({'frames': frames, 'count': len(frames)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
 
 if __name__ == '__main__':
+    # Load the embedding and color matrices before serving so the first queries are fast
+    try:
+        get_embedding_index()
+        get_color_index()
+        if VECTOR_SEARCH_MODE == 'ivfpq':
+            get_ivfpq_index()
+    except Exception as e:
+        print(f"Warning: Could not preload search indexes: {e}")
+    # Start loading the CLIP text encoder in the background so it is warm for the first query
+    if CLIP_TEXT_AVAILABLE:
+        get_text_encoder()
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,831 @@
+"""
+ASGI serving mode of the query server.
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+
+Same routes and JSON contracts as app.py, on an asyncio event loop. The
+search, explore, stats and DRES endpoints run natively: Postgres through an
+async connection pool (async_db.py), DRES through an async HTTP client
+(dres_client_async.py), and CPU-heavy scoring (color / embedding index
+searches, CLIP text encoding) in a bounded pool of ASGI_CPU_WORKERS threads.
+Waiting on the database or on DRES therefore holds no thread, so one process
+serves many concurrent operators. The remaining routes (multimodal,
+sequence and segment search, video and frame files, Swagger) are served by
+the Flask app through a WSGI adapter.
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from config import (
+    VECTOR_SEARCH_MODE, HNSW_EF_SEARCH, DEFAULT_CLIP_TEXT_THRESHOLD, OCR_FUZZY_SIMILARITY,
+    OCR_FUZZY_MAX_TERMS, RESULT_CACHE_ENABLED, DATA_GENERATION_CHECK_SECONDS, ASGI_CPU_WORKERS
+)
+from db_utils import (
+    parse_include, embedding_search_query, ranked_moments_query, text_search_query, time_range_query,
+    object_search_query, video_frames_query
+)
+from async_db import (
+    open_async_pool, close_async_pool, async_pool_stats, async_db_connection, fetch_all,
+    fetch_moments_by_ids_async, expand_keywords_fuzzy_async, set_vector_index_settings,
+    search_moments_by_embedding_async, stream_query_async, fetch_data_generation_async
+)
+from utils_server import extract_keywords_from_sentence, build_prefix_tsquery, encode_cursor
+from embedding_index import get_embedding_index
+from ivfpq_index import get_ivfpq_index
+from color_index import get_color_index
+from result_cache import get_result_cache, make_cache_key
+from data_generation import get_generation_watcher
+from app import (
+    app as flask_app, transform_result, text_query_echo, read_page_params, split_page,
+    check_vector_search_mode, default_probes, search_resident_index, read_batch_queries, score_batch, batch_results,
+    read_video_ranking, score_videos, video_results,
+    NDJSON_MIMETYPE, CLIP_TEXT_AVAILABLE
+)
+
+if CLIP_TEXT_AVAILABLE:
+    from text_encoder import get_text_encoder
+
+try:
+    from dres_client_async import get_async_dres_client
+    import dres_client_async
+    DRES_AVAILABLE = True
+except ImportError:
+    DRES_AVAILABLE = False
+    print("Warning: async DRES client not available (httpx missing). VBS competition features will be disabled.")
+
+logger = logging.getLogger(__name__)
+
+# Worker threads for CPU-heavy scoring, so the event loop never blocks on NumPy or torch
+cpu_executor = ThreadPoolExecutor(max_workers=ASGI_CPU_WORKERS, thread_name_prefix='scoring')
+
+async def run_cpu(fn, *args, **kwargs):
+    """Run a blocking or CPU-heavy function in the scoring worker pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_executor, functools.partial(fn, *args, **kwargs))
+
+class JSONPayloadResponse(Response):
+    """JSON response serialized exactly like Flask's jsonify; keeps the payload for the result cache."""
+    media_type = 'application/json'
+
+    def __init__(self, payload, status_code: int = 200, headers=None):
+        self.payload = payload
+        super().__init__(flask_app.json.dumps(payload, separators=(',', ':')) + "\n", status_code, headers)
+
+def jsonify(payload, status_code: int = 200, headers=None):
+    return JSONPayloadResponse(payload, status_code, headers)
+
+async def read_json(request):
+    """Decoded JSON body of a request, or None if it is missing or invalid."""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+def wants_ndjson(request):
+    """Whether the client asked for a streamed NDJSON response (Accept: application/x-ndjson)."""
+    accept = parse_accept_header(request.headers.get('accept'), MIMEAccept)
+    return accept.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def read_include(request, data):
+    """
+    Optional heavy fields requested with include= (JSON body or query string).
+
+    Raises:
+        ValueError: for unknown field names
+    """
+    return parse_include(data.get('include') or request.query_params.get('include'))
+
+def stream_rows(sql, params, transform=transform_result, headers=None, setup=None):
+    """
+    Stream query results as NDJSON from a server-side cursor (see app.stream_rows).
+
+    Args:
+        setup: Optional coroutine function called with the connection before the query runs
+    """
+    async def generate():
+        async with async_db_connection() as conn:
+            if setup:
+                await setup(conn)
+            async for row in stream_query_async(conn, sql, params):
+                yield flask_app.json.dumps(transform(row)) + "\n"
+
+    headers = {key: str(value) for key, value in (headers or {}).items() if value is not None}
+    return StreamingResponse(generate(), media_type=NDJSON_MIMETYPE, headers=headers)
+
+def cached_search(endpoint, echo=None):
+    """
+    Serve a POST search endpoint from the result cache (see app.cached_search).
+
+    The wrapped handler is called as handler(request, data) with the decoded
+    JSON body. The data generation is kept current by watch_data_generation.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(request):
+            data = await read_json(request)
+            if not isinstance(data, dict):
+                return jsonify({'error': 'Request body must be a JSON object'}, 400)
+            # Streamed responses are never cached
+            if not RESULT_CACHE_ENABLED or wants_ndjson(request):
+                return await handler(request, data)
+            cache = get_result_cache()
+            # include= may also come from the query string (read_include); it changes the response
+            key = make_cache_key(endpoint, dict(data, include=data.get('include') or request.query_params.get('include')))
+            cached = cache.get(key)
+            if cached is not None:
+                payload = dict(cached, **echo(data)) if echo else cached
+                return jsonify(payload, headers={'X-Cache': 'HIT'})
+
+            generation = cache.generation
+            response = await handler(request, data)
+            if isinstance(response, JSONPayloadResponse) and response.status_code == 200:
+                cache.put(key, response.payload, len(response.body), generation)
+                response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+async def watch_data_generation():
+    """
+    Poll the data generation counter and notify the watcher's listeners (result
+    cache, index reloads) when the importers bump it.
+    """
+    watcher = get_generation_watcher()
+    # The Flask routes mounted below must not poll synchronously as well
+    watcher.polling = False
+    while True:
+        try:
+            async with async_db_connection() as conn:
+                watcher.apply(await fetch_data_generation_async(conn))
+        except Exception as e:
+            logger.warning(f"Could not read data generation: {e}")
+        await asyncio.sleep(DATA_GENERATION_CHECK_SECONDS)
+
+def preload_indexes():
+    """Load the embedding and color matrices so the first queries are fast."""
+    try:
+        get_embedding_index()
+        get_color_index()
+        if VECTOR_SEARCH_MODE == 'ivfpq':
+            get_ivfpq_index()
+    except Exception as e:
+        print(f"Warning: Could not preload search indexes: {e}")
+
+# ============================================================================
+# General Endpoints
+# ============================================================================
+
+async def health(request):
+    return jsonify({
+        'status': 'ok',
+        'timestamp': datetime.now().isoformat(),
+        'service': 'IR Video Retrieval API',
+        'dres_available': DRES_AVAILABLE,
+        'clip_text_available': CLIP_TEXT_AVAILABLE
+    })
+
+async def result_cache_stats(request):
+    """Result cache hit/miss counters and size."""
+    if not RESULT_CACHE_ENABLED:
+        return jsonify({'enabled': False})
+    return jsonify(dict(get_result_cache().stats(), enabled=True))
+
+async def get_system_stats(request):
+    try:
+        async with async_db_connection() as conn:
+            cursor = conn.cursor()
+            await cursor.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM videos) AS videos,
+                    (SELECT COUNT(*) FROM video_moments) AS moments,
+                    (SELECT COUNT(*) FROM video_moments WHERE average_color_rgb IS NOT NULL) AS moments_with_color,
+                    (SELECT COUNT(*) FROM video_moments WHERE clip_embedding IS NOT NULL) AS moments_with_embedding,
+                    (SELECT SUM(duration_seconds) FROM videos) AS total,
+                    (SELECT AVG(duration_seconds) FROM videos) AS avg
+            """)
+            row = await cursor.fetchone()
+
+        return jsonify({
+            'videos': row['videos'],
+            'moments': row['moments'],
+            'moments_with_color': row['moments_with_color'],
+            'moments_with_embedding': row['moments_with_embedding'],
+            'total_duration_seconds': float(row['total'] or 0),
+            'average_duration_seconds': float(row['avg'] or 0),
+            'last_updated': datetime.now().isoformat(),
+            'connection_pool': async_pool_stats()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}, 500)
+
+# ============================================================================
+# Search Endpoints
+# ============================================================================
+
+@cached_search('keywords')
+async def search_by_keywords(request, data):
+    keywords = data.get('keywords', [])
+    match_all = data.get('match_all', False)
+    fuzzy = data.get('fuzzy', False)
+    fuzzy_threshold = float(data.get('fuzzy_threshold', OCR_FUZZY_SIMILARITY))
+
+    if not keywords:
+        return jsonify({'error': 'keywords array is required'}, 400)
+    try:
+        limit, after = read_page_params(data)
+        include = read_include(request, data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}, 400)
+
+    try:
+        async with async_db_connection() as conn:
+            expansions = (
+                await expand_keywords_fuzzy_async(conn, keywords, fuzzy_threshold, OCR_FUZZY_MAX_TERMS)
+                if fuzzy else None
+            )
+            tsquery = build_prefix_tsquery(keywords, match_all=match_all, weights='A', expansions=expansions)
+            if not tsquery:
+                return jsonify({'error': 'No searchable keywords provided'}, 400)
+            rows = await fetch_all(conn, *text_search_query(tsquery, limit + 1, after=after, include=include))
+
+        results, next_cursor = split_page(rows, limit, lambda row: row['score'])
+        formatted = [transform_result(row) for row in results]
+        response_data = {'results': formatted, 'count': len(formatted), 'next_cursor': next_cursor}
+        if fuzzy:
+            response_data['expanded_keywords'] = expansions
+        return jsonify(response_data)
+    except Exception as e:
+        return jsonify({'error': str(e)}, 500)
+
+@cached_search('text', echo=text_query_echo)
+async def search_by_text(request, data):
+    query = data.get('query')
+    fuzzy = data.get('fuzzy', False)
+    fuzzy_threshold = float(data.get('fuzzy_threshold', OCR_FUZZY_SIMILARITY))
+
+    if not query:
+        return jsonify({'error': 'Missing query'}, 400)
+    try:
+        limit, after = read_page_params(data)
+        include = read_include(request, data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}, 400)
+
+    keywords = extract_keywords_from_sentence(query)
+    if not keywords:
+        return jsonify({'error': 'No meaningful keywords found in query'}, 400)
+
+    try:
+        async with async_db_connection() as conn:
+            expansions = (
+                await expand_keywords_fuzzy_async(conn, keywords, fuzzy_threshold, OCR_FUZZY_MAX_TERMS)
+                if fuzzy else None
+            )
+            tsquery = build_prefix_tsquery(keywords, expansions=expansions)
+            rows = await fetch_all(conn, *text_search_query(tsquery, limit + 1, after=after, include=include))
+
+        results, next_cursor = split_page(rows, limit, lambda row: row['score'])
+        formatted = [transform_result(row) for row in results]
+        response_data = {
+            'results': formatted,
+            'count': len(formatted),
+            'next_cursor': next_cursor,
+            'extracted_keywords': keywords,
+            'query': query,
+            'score_type': 'ts_rank'
+        }
+        if fuzzy:
+            response_data['expanded_keywords'] = expansions
+        return jsonify(response_data)
+    except Exception as e:
+        return jsonify({'error': str(e)}, 500)
+
+@cached_search('color')
+async def search_by_color(request, data):
+    color = data.get('color')
+    threshold = data.get('threshold', 50)
+
+    if not color or len(color) != 3:
+        return jsonify({'error': 'Invalid RGB color'}, 400)
+
+    streaming = wants_ndjson(request)
+    try:
+        limit, after = read_page_params(data, streaming=streaming)
+        include = read_include(request, data)
+        # One extra match tells whether there is a next page
+        matches, total = await run_cpu(
+            lambda: get_color_index().search(color, threshold=float(threshold), limit=limit + 1, after=after)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}, 400)
+    except Exception as e:
+        return jsonify({'error': str(e)}, 500)
+
+    next_cursor = encode_cursor(matches[limit - 1][1], matches[limit - 1][0]) if len(matches) > limit else None
+    matches = matches[:limit]
+    if streaming:
+        sql, params = ranked_moments_query(
+            [moment_id for moment_id, _ in matches],
+            [1.0 - (distance / 100.0) for _, distance in matches],
+            include=include
+        )
+        return stream_rows(sql, params, headers={'X-Total-Count': total, 'X-Next-Cursor': next_cursor})
+    try:
+        async with async_db_connection() as conn:
+            rows = await fetch_moments_by_ids_async(conn, [moment_id for moment_id, _ in matches], include=include)
+        distances = dict(matches)
+        results = []
+        for row in rows:
+            row['score'] = 1.0 - (distances[row['moment_id']] / 100.0)
+            results.append(transform_result(row))
+        return jsonify({'results': results, 'count': total, 'next_cursor': next_cursor})
+    except Exception as e:
+        return jsonify({'error': str(e)}, 500)
+
+async def run_vector_search(embedding, threshold, limit, mode, probes, ef_search, after=None, include=()):
+    """Async app.run_vector_search: (results, total number of matches, cursor of the next page or None)."""
+    check_vector_search_mode(mode)
+
+    if mode == 'pgvector':
+        async with async_db_connection() as conn:
+            rows = await search_moments_by_embedding_async(
+                conn, embedding, threshold, limit + 1, probes, ef_search, after=after, include=include
+            )
+        rows, next_cursor = split_page(rows, limit, lambda row: row['distance'])
+        results = [transform_result(row) for row in rows]
+        return results, len(results), next_cursor
+
+    matches, total = await run_cpu(
+        lambda: search_resident_index(embedding, threshold, limit + 1, mode, probes, after=after)
+    )
+    next_cursor = encode_cursor(matches[limit - 1][1], matches[limit - 1][0]) if len(matches) > limit else None
+    matches = matches[:limit]
+    async with async_db_connection() as conn:
+        rows = await fetch_moments_by_ids_async(conn, [moment_id for moment_id, _ in matches], include=include)
+    scores = dict(matches)
+    results = []
+    for row in rows:
+        row['similarity_score'] = scores[row['moment_id']]
+        results.append(transform_result(row))
+    return results, total, next_cursor
+
+async def run_video_search(embedding, threshold, limit, mode, ranking, after=None, include=()):
+    """Async app.run_video_search: (videos, number of matching videos, cursor of the next page or None)."""
+    ranked, total, next_cursor = await run_cpu(
+        lambda: score_videos(embedding, threshold, limit, mode, ranking, after=after)
+    )
+    moment_ids = [moment_id for _, _, _, moments in ranked for moment_id, _ in moments]
+    async with async_db_connection() as conn:
+        rows = await fetch_moments_by_ids_async(conn, moment_ids, include=include)
+    return video_results(ranked, rows), total, next_cursor
+
+async def stream_vector_search(embedding, threshold, limit, mode, probes, ef_search, after=None, include=()):
+    """NDJSON variant of run_vector_search."""
+    check_vector_search_mode(mode)
+
+    if mode == 'pgvector':
+        async def setup(conn):
+            await set_vector_index_settings(conn, probes, max(ef_search, limit))
+        sql, params = embedding_search_query(embedding, threshold, limit, after=after, include=include)
+        return stream_rows(sql, params, setup=setup, headers={'X-Search-Mode': mode})
+
+    matches, total = await run_cpu(
+        lambda: search_resident_index(embedding, threshold, limit + 1, mode, probes, after=after)
+    )
+    next_cursor = encode_cursor(matches[limit - 1][1], matches[limit - 1][0]) if len(matches) > limit else None
+    matches = matches[:limit]
+    sql, params = ranked_moments_query(
+        [moment_id for moment_id, _ in matches], [score for _, score in matches], include=include
+    )
+    return stream_rows(sql, params, headers={
+        'X-Search-Mode': mode, 'X-Total-Count': total, 'X-Next-Cursor': next_cursor
+    })
+
+@cached_search('vector')
+async def search_by_vector(request, data):
+    embedding = data.get('embedding')
+    threshold = data.get('threshold', 0.7)
+    mode = data.get('mode', VECTOR_SEARCH_MODE)
+    probes = data.get('probes', default_probes(mode))
+    ef_search = data.get('ef_search', HNSW_EF_SEARCH)
+
+    if not embedding:
+        return jsonify({'error': 'Missing embedding'}, 400)
+
+    try:
+        streaming = wants_ndjson(request)
+        limit, after = read_page_params(data, streaming=streaming)
+        include = read_include(request, data)
+        ranking = read_video_ranking(data)
+        if ranking is not None:
+            if streaming:
+                raise ValueError("rank_by='video' responses cannot be streamed")
+            results, total, next_cursor = await run_video_search(
+                embedding, float(threshold), limit, mode, ranking, after=after, include=include
+            )
+            return jsonify({'results': results, 'count': total, 'mode': mode, 'rank_by': 'video',
+                            'next_cursor': next_cursor})
+        if streaming:
+            return await stream_vector_search(
+                embedding, float(threshold), limit, mode, int(probes), int(ef_search), after=after, include=include
+            )
+        results, total, next_cursor = await run_vector_search(
+            embedding, float(threshold), limit, mode, int(probes), int(ef_search), after=after, include=include
+        )
+        return jsonify({'results': results, 'count': total, 'mode': mode, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'error': str(e)}, 400)
+    except Exception as e:
+        return jsonify({'error': str(e)}, 500)
+
+@cached_search('clip-text', echo=lambda data: {'query': data.get('query')})
+async def search_by_clip_text(request, data):
+    """Encode a text query with CLIP on the server and rank moments by similarity."""
+    if not CLIP_TEXT_AVAILABLE:
+        return jsonify({
+            'error': 'CLIP text encoder not available',
+            'message': 'torch and clip must be installed for text-to-CLIP search'
+        }, 503)
+
+    query = data.get('query')
+    threshold = data.get('threshold', DEFAULT_CLIP_TEXT_THRESHOLD)
+    mode = data.get('mode', VECTOR_SEARCH_MODE)
+    probes = data.get('probes', default_probes(mode))
+    ef_search = data.get('ef_search', HNSW_EF_SEARCH)
+
+    if not query:
+        return jsonify({'error': 'Missing query'}, 400)
+    try:
+        limit, after = read_page_params(data)
+        include = read_include(request, data)
+        ranking = read_video_ranking(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}, 400)
+
+    try:
+        # Waits for the batching encoder worker, so it runs in the worker pool
+        embedding = await run_cpu(lambda: get_text_encoder().encode(query))
+    except Exception as e:
+        return jsonify({'error': 'Text encoding failed', 'message': str(e)}, 503)
+
+    try:
+        if ranking is not None:
+            results, total, next_cursor = await run_video_search(
+                embedding, float(threshold), limit, mode, ranking, after=after, include=include
+            )
+            return jsonify({'results': results, 'count': total, 'query': query, 'mode': mode,
+                            'rank_by': 'video', 'next_cursor': next_cursor})
+        results, total, next_cursor = await run_vector_search(
+            embedding, float(threshold), limit, mode, int(probes), int(ef_search), after=after, include=include
+        )
+        return jsonify({'results': results, 'count': total, 'query': query, 'mode': mode, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'error': str(e)}, 400)
+    except Exception as e:
+        return jsonify({'error': str(e)}, 500)
+
+@cached_search('batch')
+async def search_batch(request, data):
+    """Run several embedding / CLIP-text queries in one blocked scoring pass over the embedding matrix."""
+    try:
+        specs = read_batch_queries(data)
+        include = read_include(request, data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}, 400)
+
+    texts = [spec['text'] for spec in specs if spec['text'] is not None]
+    if texts:
+        if not CLIP_TEXT_AVAILABLE:
+            return jsonify({
+                'error': 'CLIP text encoder not available',
+                'message': 'torch and clip must be installed for text queries'
+            }, 503)
+        try:
+            encoded = iter(await run_cpu(lambda: get_text_encoder().encode_many(texts)))
+        except Exception as e:
+            return jsonify({'error': 'Text encoding failed', 'message': str(e)}, 503)
+        for spec in specs:
+            if spec['text'] is not None:
+                spec['embedding'] = next(encoded)
+
+    try:
+        matches = await run_cpu(lambda: score_batch(specs))
+        moment_ids = list(dict.fromkeys(moment_id for query_matches, _ in matches for moment_id, _ in query_matches))
+        async with async_db_connection() as conn:
+            rows = await fetch_moments_by_ids_async(conn, moment_ids, include=include)
+        return jsonify({'results': batch_results(matches, rows), 'count': len(specs)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}, 400)
+    except Exception as e:
+        return jsonify({'error': str(e)}, 500)
+
+@cached_search('temporal')
+async def search_by_time(request, data):
+    start = data.get('start_time', 0)
+    end = data.get('end_time')
+    video_id = data.get('video_id')
+
+    if end is None:
+        return jsonify({'error': 'end_time is required'}, 400)
+    try:
+        limit, after = read_page_params(data)
+        include = read_include(request, data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}, 400)
+
+    try:
+        async with async_db_connection() as conn:
+            rows = await fetch_all(
+                conn, *time_range_query(start, end, limit + 1, video_id=video_id, after=after, include=include)
+            )
+        results, next_cursor = split_page(rows, limit, lambda row: row['timestamp_seconds'])
+        formatted = [transform_result(row) for row in results]
+        return jsonify({'results': formatted, 'count': len(formatted), 'next_cursor': next_cursor})
+    except Exception as e:
+        return jsonify({'error': str(e)}, 500)
+
+@cached_search('objects')
+async def search_by_objects(request, data):
+    objects = data.get('objects', [])
+    match_all = data.get('match_all', False)
+
+    if not objects:
+        return jsonify({'error': 'objects array is required'}, 400)
+    try:
+        limit, after = read_page_params(data)
+        include = read_include(request, data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}, 400)
+
+    try:
+        async with async_db_connection() as conn:
+            rows = await fetch_all(
+                conn, *object_search_query(objects, limit + 1, match_all=match_all, after=after, include=include)
+            )
+        results, next_cursor = split_page(rows, limit, lambda row: row['timestamp_seconds'])
+        formatted = [transform_result(row) for row in results]
+        return jsonify({'results': formatted, 'count': len(formatted), 'next_cursor': next_cursor})
+    except Exception as e:
+        return jsonify({'error': str(e)}, 500)
+
+async def explore_video(request):
+    """Return all frames for a video."""
+    video_id = request.path_params['video_id']
+    try:
+        include = read_include(request, {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}, 400)
+
+    sql, params = video_frames_query(video_id, include)
+    if wants_ndjson(request):
+        return stream_rows(sql, params, transform=dict)
+
+    try:
+        async with async_db_connection() as conn:
+            frames = await fetch_all(conn, sql, params)
+        return jsonify({'frames': frames, 'count': len(frames)})
+    except Exception as e:
+        return jsonify({'error': str(e)}, 500)
+
+# ============================================================================
+# DRES (VBS Competition) Endpoints
+# ============================================================================
+
+def dres_unavailable():
+    return jsonify({
+        'error': 'DRES client not available',
+        'message': 'DRES integration is not configured'
+    }, 503)
+
+def validate_submission(submission, i):
+    """Error message for an invalid batch submission, or None."""
+    for field in ('query_id', 'video_id', 'timestamp'):
+        if field not in submission:
+            return f'Missing required field {field} in submission {i}'
+    try:
+        if float(submission['timestamp']) < 0:
+            return f'Invalid timestamp in submission {i}'
+    except (ValueError, TypeError):
+        return f'Invalid timestamp format in submission {i}'
+    try:
+        if not 0.0 <= float(submission.get('confidence', 1.0)) <= 1.0:
+            return f'Invalid confidence in submission {i}'
+    except (ValueError, TypeError):
+        return f'Invalid confidence format in submission {i}'
+    return None
+
+async def dres_status(request):
+    """Get DRES connection status and competition information."""
+    if not DRES_AVAILABLE:
+        return dres_unavailable()
+
+    try:
+        client = get_async_dres_client()
+        connection_status = await client.test_connection()
+        status_info = {
+            'connected': connection_status,
+            'timestamp': datetime.now().isoformat()
+        }
+        if connection_status:
+            competition_status, active_queries = await asyncio.gather(
+                client.get_competition_status(), client.get_active_queries()
+            )
+            if competition_status:
+                status_info['competition'] = competition_status
+            status_info['active_queries_count'] = len(active_queries)
+        return jsonify(status_info)
+    except Exception as e:
+        return jsonify({'error': 'DRES status check failed', 'message': str(e)}, 500)
+
+async def dres_submit(request):
+    """Submit a Known-Item Search (KIS) result to DRES."""
+    if not DRES_AVAILABLE:
+        return dres_unavailable()
+
+    try:
+        data = await read_json(request)
+        if not isinstance(data, dict):
+            raise ValueError('Request body must be a JSON object')
+
+        for field in ('query_id', 'video_id', 'timestamp'):
+            if field not in data:
+                return jsonify({'error': f'Missing required field: {field}'}, 400)
+
+        query_id = data['query_id']
+        video_id = data['video_id']
+        timestamp = float(data['timestamp'])
+        confidence = float(data.get('confidence', 1.0))
+
+        if timestamp < 0:
+            return jsonify({'error': 'Timestamp must be non-negative'}, 400)
+        if not 0.0 <= confidence <= 1.0:
+            return jsonify({'error': 'Confidence must be between 0.0 and 1.0'}, 400)
+
+        success = await get_async_dres_client().submit_result(
+            query_id=query_id,
+            video_id=video_id,
+            timestamp=timestamp,
+            confidence=confidence,
+            segment_start=data.get('segment_start'),
+            segment_end=data.get('segment_end')
+        )
+        if success:
+            return jsonify({
+                'success': True,
+                'message': f'Successfully submitted result for query {query_id}',
+                'submission': {
+                    'query_id': query_id,
+                    'video_id': video_id,
+                    'timestamp': timestamp,
+                    'confidence': confidence
+                }
+            })
+        return jsonify({
+            'error': 'DRES submission failed',
+            'message': 'Failed to submit result to DRES server'
+        }, 500)
+    except ValueError as e:
+        return jsonify({'error': 'Invalid data format', 'message': str(e)}, 400)
+    except Exception as e:
+        return jsonify({'error': 'Submission failed', 'message': str(e)}, 500)
+
+async def dres_queries(request):
+    """Get active queries from DRES."""
+    if not DRES_AVAILABLE:
+        return dres_unavailable()
+
+    try:
+        queries = await get_async_dres_client().get_active_queries()
+        return jsonify({'queries': queries, 'count': len(queries)})
+    except Exception as e:
+        return jsonify({'error': 'Failed to get queries', 'message': str(e)}, 500)
+
+async def dres_query_info(request):
+    """Get information about a specific query from DRES."""
+    if not DRES_AVAILABLE:
+        return dres_unavailable()
+
+    query_id = request.path_params['query_id']
+    try:
+        query_info = await get_async_dres_client().get_query_info(query_id)
+        if query_info:
+            return jsonify(query_info)
+        return jsonify({
+            'error': 'Query not found',
+            'message': f'Query {query_id} not found or not accessible'
+        }, 404)
+    except Exception as e:
+        return jsonify({'error': 'Failed to get query info', 'message': str(e)}, 500)
+
+async def dres_submission_history(request):
+    """Get submission history from DRES."""
+    if not DRES_AVAILABLE:
+        return dres_unavailable()
+
+    try:
+        history = await get_async_dres_client().get_submission_history(request.query_params.get('query_id'))
+        return jsonify({'history': history, 'count': len(history)})
+    except Exception as e:
+        return jsonify({'error': 'Failed to get submission history', 'message': str(e)}, 500)
+
+async def dres_submit_batch(request):
+    """Submit multiple results to DRES at once; the submissions are sent concurrently."""
+    if not DRES_AVAILABLE:
+        return dres_unavailable()
+
+    try:
+        data = await read_json(request)
+        if not isinstance(data, list):
+            return jsonify({
+                'error': 'Invalid data format',
+                'message': 'Expected a list of submission objects'
+            }, 400)
+
+        for i, submission in enumerate(data):
+            error = validate_submission(submission, i)
+            if error:
+                return jsonify({'error': error}, 400)
+
+        results = await get_async_dres_client().submit_multiple_results(data)
+        successful = sum(1 for success in results.values() if success)
+        failed = len(results) - successful
+        return jsonify({
+            'success': True,
+            'message': f'Batch submission completed: {successful} successful, {failed} failed',
+            'results': results,
+            'summary': {
+                'total': len(results),
+                'successful': successful,
+                'failed': failed
+            }
+        })
+    except Exception as e:
+        return jsonify({'error': 'Batch submission failed', 'message': str(e)}, 500)
+
+# ============================================================================
+# Application
+# ============================================================================
+
+@asynccontextmanager
+async def lifespan(app):
+    await open_async_pool()
+    await run_cpu(preload_indexes)
+    # Start loading the CLIP text encoder in the background so it is warm for the first query
+    if CLIP_TEXT_AVAILABLE:
+        get_text_encoder()
+    generation_task = asyncio.create_task(watch_data_generation())
+    try:
+        yield
+    finally:
+        generation_task.cancel()
+        if DRES_AVAILABLE and dres_client_async.async_dres_client is not None:
+            await dres_client_async.async_dres_client.close()
+        await close_async_pool()
+        cpu_executor.shutdown(wait=False)
+
+routes = [
+    Route('/health', health),
+    Route('/api/cache/stats', result_cache_stats),
+    Route('/api/stats', get_system_stats),
+    Route('/api/search/keywords', search_by_keywords, methods=['POST']),
+    Route('/api/search/text', search_by_text, methods=['POST']),
+    Route('/api/search/color', search_by_color, methods=['POST']),
+    Route('/api/search/vector', search_by_vector, methods=['POST']),
+    Route('/api/search/clip-text', search_by_clip_text, methods=['POST']),
+    Route('/api/search/batch', search_batch, methods=['POST']),
+    Route('/api/search/temporal', search_by_time, methods=['POST']),
+    Route('/api/search/objects', search_by_objects, methods=['POST']),
+    Route('/api/explore/{video_id}', explore_video),
+    Route('/api/dres/status', dres_status),
+    Route('/api/dres/submit', dres_submit, methods=['POST']),
+    Route('/api/dres/queries', dres_queries),
+    Route('/api/dres/query/{query_id}', dres_query_info),
+    Route('/api/dres/history', dres_submission_history),
+    Route('/api/dres/submit-batch', dres_submit_batch, methods=['POST']),
+    # Everything else is served by the Flask app (in a2wsgi's thread pool)
+    Mount('/', app=WSGIMiddleware(flask_app)),
+]
+
+app = Starlette(
+    routes=routes,
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=5000)
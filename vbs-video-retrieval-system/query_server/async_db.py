@@ -0,0 +1,148 @@
+"""
+Asyncio database access for the ASGI serving mode (asgi_app.py).
+
+Uses a psycopg 3 AsyncConnectionPool so a request waiting on Postgres only
+suspends its coroutine instead of holding a thread. The SQL is shared with
+the synchronous code in db_utils: the query builders there return (SQL,
+parameters) pairs that run unchanged on either driver.
+"""
+
+import uuid
+from contextlib import asynccontextmanager
+
+import psycopg
+import psycopg.errors
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from config import DB_CONFIG, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT, STREAM_ITERSIZE
+from db_utils import (
+    SET_IVFFLAT_PROBES_SQL, SET_HNSW_EF_SEARCH_SQL, SET_TRGM_SIMILARITY_SQL, FUZZY_EXPANSION_SQL,
+    embedding_search_query, moments_by_ids_query, order_rows_by_ids, group_fuzzy_expansions
+)
+
+def async_conninfo() -> str:
+    """libpq connection string for DB_CONFIG."""
+    params = dict(DB_CONFIG)
+    params['dbname'] = params.pop('database')
+    return make_conninfo(**params)
+
+# Global async pool, opened and closed by the ASGI app's lifespan
+async_pool = None
+
+async def open_async_pool(min_size: int = DB_POOL_MIN_SIZE, max_size: int = DB_POOL_MAX_SIZE,
+                          timeout: float = DB_POOL_TIMEOUT) -> AsyncConnectionPool:
+    """
+    Open the global async connection pool (must run inside the event loop).
+
+    Connections return dict rows, like RealDictCursor in the synchronous code.
+    """
+    global async_pool
+    if async_pool is None:
+        pool = AsyncConnectionPool(
+            async_conninfo(),
+            kwargs={'row_factory': dict_row},
+            min_size=min(min_size, max_size),
+            max_size=max_size,
+            timeout=timeout,
+            check=AsyncConnectionPool.check_connection,
+            open=False
+        )
+        await pool.open()
+        async_pool = pool
+    return async_pool
+
+async def close_async_pool():
+    """Close the global async connection pool."""
+    global async_pool
+    if async_pool is not None:
+        await async_pool.close()
+        async_pool = None
+
+def async_pool_stats() -> dict:
+    """Size and usage counters of the async pool."""
+    if async_pool is None:
+        return {'open': False}
+    stats = async_pool.get_stats()
+    return {
+        'open': True,
+        'min_size': async_pool.min_size,
+        'max_size': async_pool.max_size,
+        'size': stats.get('pool_size', 0),
+        'available': stats.get('pool_available', 0),
+        'waiting': stats.get('requests_waiting', 0),
+        'timeouts': stats.get('requests_errors', 0),
+    }
+
+@asynccontextmanager
+async def async_db_connection():
+    """
+    Check out a pooled async connection for the duration of an async with-block.
+
+    The connection is rolled back and returned to the pool when the block
+    exits, so SET LOCAL settings never leak into the next request.
+    """
+    conn = await async_pool.getconn()
+    try:
+        yield conn
+    finally:
+        if not conn.closed:
+            await conn.rollback()
+        await async_pool.putconn(conn)
+
+async def fetch_all(conn, sql, params=None):
+    """Execute a query and return all rows as dicts."""
+    cursor = conn.cursor()
+    await cursor.execute(sql, params)
+    return await cursor.fetchall()
+
+async def fetch_moments_by_ids_async(conn, moment_ids, include=()):
+    """Async fetch_moments_by_ids: moments with their video info, in the order of moment_ids."""
+    if not moment_ids:
+        return []
+    rows = await fetch_all(conn, *moments_by_ids_query(moment_ids, include))
+    return order_rows_by_ids(rows, moment_ids)
+
+async def expand_keywords_fuzzy_async(conn, keywords, similarity, max_terms):
+    """Async expand_keywords_fuzzy: similar OCR vocabulary words for each keyword."""
+    if not keywords:
+        return {}
+    cursor = conn.cursor()
+    await cursor.execute(SET_TRGM_SIMILARITY_SQL, (str(float(similarity)),))
+    await cursor.execute(FUZZY_EXPANSION_SQL, ([str(keyword).lower() for keyword in keywords], int(max_terms)))
+    return group_fuzzy_expansions(keywords, await cursor.fetchall())
+
+async def set_vector_index_settings(conn, probes, ef_search):
+    """Set ivfflat.probes and hnsw.ef_search for the current transaction only."""
+    cursor = conn.cursor()
+    await cursor.execute(SET_IVFFLAT_PROBES_SQL, (str(int(probes)),))
+    await cursor.execute(SET_HNSW_EF_SEARCH_SQL, (str(int(ef_search)),))
+
+async def search_moments_by_embedding_async(conn, embedding, threshold, limit, probes, ef_search,
+                                            after=None, include=()):
+    """Async search_moments_by_embedding (pgvector index, ties ordered by moment_id)."""
+    await set_vector_index_settings(conn, probes, max(int(ef_search), int(limit)))
+    return await fetch_all(conn, *embedding_search_query(embedding, threshold, limit, after=after, include=include))
+
+async def stream_query_async(conn, sql, params, itersize=STREAM_ITERSIZE):
+    """Iterate over the rows of a query through a server-side cursor, itersize rows per fetch."""
+    cursor = conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+    cursor.itersize = itersize
+    try:
+        await cursor.execute(sql, params)
+        async for row in cursor:
+            yield row
+    finally:
+        await cursor.close()
+
+async def fetch_data_generation_async(conn) -> int:
+    """Async fetch_data_generation (0 if the data_generation table does not exist yet)."""
+    cursor = conn.cursor()
+    try:
+        await cursor.execute("SELECT generation FROM data_generation WHERE id = 1")
+    except psycopg.errors.UndefinedTable:
+        await conn.rollback()
+        return 0
+    row = await cursor.fetchone()
+    return int(row['generation']) if row else 0
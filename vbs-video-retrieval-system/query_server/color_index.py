@@ -0,0 +1,144 @@
+"""
+Resident average-color index for the query server.
+
+Average colors are kept in a contiguous (N, 3) float64 matrix and the
+perceptually weighted RGB distance of `utils_server.color_distance` is
+evaluated for every moment in one vectorized pass, followed by an
+argpartition top-k. The arithmetic mirrors `color_distance` term by term,
+so distances agree with the per-row version to within the last bit
+and existing thresholds select the same moments.
+"""
+
+import logging
+import threading
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from config import SHARED_INDEX_DIR
+from db_utils import db_connection, fetch_moment_colors
+from embedding_index import keyset_top_k, shared_snapshot_is_current
+from index_snapshot import load_matrix
+from utils_server import parse_json_field
+
+logger = logging.getLogger(__name__)
+
+# Same channel weights as utils_server.color_distance
+COLOR_WEIGHTS = np.array([0.3, 0.59, 0.11], dtype=np.float64)
+
+
+class ColorIndex:
+    """
+    In-memory (N, 3) matrix of average colors keyed by moment_id.
+    """
+
+    def __init__(self, moment_ids: List[str], colors: np.ndarray):
+        """
+        Args:
+            moment_ids: Moment IDs, one per color row
+            colors: (N, 3) array of raw RGB average colors
+        """
+        self.moment_ids = list(moment_ids)
+        # A float64 (N, 3) memory map passes through without a copy
+        self.colors = np.ascontiguousarray(colors, dtype=np.float64).reshape(-1, 3)
+        self.id_to_row = {moment_id: row for row, moment_id in enumerate(self.moment_ids)}
+        self.loaded_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.moment_ids)
+
+    @classmethod
+    def from_rows(cls, rows) -> 'ColorIndex':
+        """Build the index from (moment_id, average_color_rgb) database rows."""
+        moment_ids, colors = [], []
+        for row in rows:
+            color = parse_json_field(row['average_color_rgb'])
+            if not color or len(color) != 3:
+                continue
+            moment_ids.append(row['moment_id'])
+            colors.append(color)
+        return cls(moment_ids, np.array(colors, dtype=np.float64).reshape(-1, 3))
+
+    @classmethod
+    def load(cls) -> 'ColorIndex':
+        """Load every stored average color from the database."""
+        start = time.time()
+        with db_connection() as conn:
+            rows = fetch_moment_colors(conn)
+        index = cls.from_rows(rows)
+        logger.info(f"Loaded {len(index)} average colors into memory in {time.time() - start:.2f}s")
+        return index
+
+    @classmethod
+    def attach(cls, directory: str) -> 'ColorIndex':
+        """Memory-map the color matrix of a shared index snapshot (index_snapshot.py)."""
+        start = time.time()
+        moment_ids, colors = load_matrix(directory, 'colors')
+        index = cls(moment_ids, colors)
+        logger.info(f"Attached {len(index)} shared average colors from {directory} in {time.time() - start:.2f}s")
+        return index
+
+    def distances(self, color) -> np.ndarray:
+        """Weighted RGB distance (as in color_distance) from the query color to every moment."""
+        if color is None or len(color) != 3:
+            raise ValueError("Color must be an [R, G, B] list")
+        # Weight the channel differences exactly like color_distance does
+        diff = (self.colors - np.asarray(color, dtype=np.float64)) * COLOR_WEIGHTS
+        return np.sqrt(diff[:, 0] ** 2 + diff[:, 1] ** 2 + diff[:, 2] ** 2)
+
+    def search(self, color, threshold: float = 50, limit: int = 50,
+               after=None) -> Tuple[List[Tuple[str, float]], int]:
+        """
+        Find the moments whose average color is closest to the query color.
+
+        Args:
+            color: Query [R, G, B]
+            threshold: Maximum weighted distance
+            limit: Maximum number of results
+            after: Optional (distance, moment_id) cursor; only rows ranked after it are returned
+
+        Returns:
+            (list of (moment_id, distance), total number of moments within threshold)
+        """
+        distances = self.distances(color)
+        matching = distances <= threshold
+        best = keyset_top_k(distances, self.moment_ids, limit, after=after, mask=matching, descending=False)
+        return [(self.moment_ids[i], float(distances[i])) for i in best], int(np.count_nonzero(matching))
+
+
+def load_color_index() -> ColorIndex:
+    """Attach to the shared index snapshot in SHARED_INDEX_DIR if set and current, else load from the database."""
+    if SHARED_INDEX_DIR and shared_snapshot_is_current(SHARED_INDEX_DIR):
+        try:
+            return ColorIndex.attach(SHARED_INDEX_DIR)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not attach shared color index, loading from the database: {e}")
+    return ColorIndex.load()
+
+
+# Global color index instance
+color_index = None
+_color_index_lock = threading.Lock()
+
+def get_color_index() -> ColorIndex:
+    """
+    Get or load the global color index.
+
+    Returns:
+        ColorIndex instance
+    """
+    global color_index
+    if color_index is None:
+        with _color_index_lock:
+            if color_index is None:
+                color_index = load_color_index()
+    return color_index
+
+def reload_color_index() -> ColorIndex:
+    """Rebuild the global color index (or re-attach the shared snapshot), e.g. after an import."""
+    global color_index
+    index = load_color_index()
+    with _color_index_lock:
+        color_index = index
+    return index
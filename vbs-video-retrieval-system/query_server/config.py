@@ -6,4 +6,99 @@ DB_CONFIG = {
     'user': os.environ.get('DB_USER', 'postgres'),
     'password': os.environ.get('DB_PASSWORD', 'admin123'),
     'database': os.environ.get('DB_NAME', 'videodb_creative_v2')
-}
\ No newline at end of file
+}
+
+# Vector search backend: 'memory' scores against the resident embedding matrix,
+# 'pgvector' pushes the search down to the ivfflat index in Postgres, 'ivfpq' searches
+# the in-process IVF-PQ index (ivfpq_index.py) and re-ranks its shortlist exactly
+VECTOR_SEARCH_MODE = os.environ.get('VECTOR_SEARCH_MODE', 'memory')
+
+# Number of ivfflat lists probed per pgvector query (higher = better recall, slower)
+IVFFLAT_PROBES = int(os.environ.get('IVFFLAT_PROBES', 10))
+
+# Size of the HNSW candidate list per pgvector query when an HNSW index is used
+# (raised to the requested limit if smaller, since HNSW never returns more rows than this)
+HNSW_EF_SEARCH = int(os.environ.get('HNSW_EF_SEARCH', 40))
+
+# CLIP text encoder used by /api/search/clip-text (must match the model used for image embeddings)
+CLIP_MODEL_NAME = os.environ.get('CLIP_MODEL_NAME', 'ViT-L/14')
+# Concurrent text queries are batched into one encode_text call: up to this many texts...
+CLIP_TEXT_MAX_BATCH_SIZE = int(os.environ.get('CLIP_TEXT_MAX_BATCH_SIZE', 16))
+# ...collected for at most this many milliseconds after the first one arrives
+CLIP_TEXT_MAX_WAIT_MS = float(os.environ.get('CLIP_TEXT_MAX_WAIT_MS', 10))
+# Torch intra-op threads for the encoder (0 = torch default)
+CLIP_TORCH_THREADS = int(os.environ.get('CLIP_TORCH_THREADS', 0))
+# Default similarity threshold for text queries (text-image CLIP similarities are much lower than image-image)
+DEFAULT_CLIP_TEXT_THRESHOLD = float(os.environ.get('DEFAULT_CLIP_TEXT_THRESHOLD', 0.2))
+
+# Fuzzy OCR matching: minimum pg_trgm similarity for a vocabulary word to be used
+# as an expansion of a query keyword, and the maximum expansions per keyword
+OCR_FUZZY_SIMILARITY = float(os.environ.get('OCR_FUZZY_SIMILARITY', 0.5))
+OCR_FUZZY_MAX_TERMS = int(os.environ.get('OCR_FUZZY_MAX_TERMS', 10))
+
+# Process-wide database connection pool (db_utils.db_connection): connections kept
+# open and the most that may be checked out at once
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 2))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 20))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+# Connections idle for longer than this many seconds are checked with SELECT 1 on checkout (0 = always)
+DB_POOL_HEALTH_CHECK_SECONDS = float(os.environ.get('DB_POOL_HEALTH_CHECK_SECONDS', 30))
+
+# Search result cache (result_cache.py): set RESULT_CACHE_ENABLED=false to disable
+RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Upper bound on the serialized size of all cached responses, in megabytes
+RESULT_CACHE_MAX_MB = float(os.environ.get('RESULT_CACHE_MAX_MB', 128))
+# Seconds a cached response stays valid
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get('RESULT_CACHE_TTL_SECONDS', 600))
+# How often (seconds) the data_generation counter is re-read from the database (data_generation.py);
+# RESULT_CACHE_GENERATION_CHECK_SECONDS is still read for existing deployments
+DATA_GENERATION_CHECK_SECONDS = float(os.environ.get(
+    'DATA_GENERATION_CHECK_SECONDS', os.environ.get('RESULT_CACHE_GENERATION_CHECK_SECONDS', 5)
+))
+# Query colors are rounded to a multiple of this many RGB units in cache keys
+RESULT_CACHE_COLOR_QUANTUM = int(os.environ.get('RESULT_CACHE_COLOR_QUANTUM', 1))
+# Query embeddings are rounded to this many decimals before hashing
+RESULT_CACHE_EMBEDDING_DECIMALS = int(os.environ.get('RESULT_CACHE_EMBEDDING_DECIMALS', 4))
+
+# Page size of the paginated search endpoints (same defaults as backend/config/settings.py)
+DEFAULT_ITEMS_PER_PAGE = int(os.environ.get('DEFAULT_ITEMS_PER_PAGE', 50))
+MAX_ITEMS_PER_PAGE = int(os.environ.get('MAX_ITEMS_PER_PAGE', 200))
+
+# Most queries one /api/search/batch request may carry
+BATCH_MAX_QUERIES = int(os.environ.get('BATCH_MAX_QUERIES', 32))
+
+# Streaming (Accept: application/x-ndjson) responses: rows fetched per round trip
+# from the server-side cursor, and the most results one stream may return
+STREAM_ITERSIZE = int(os.environ.get('STREAM_ITERSIZE', 500))
+STREAM_MAX_RESULTS = int(os.environ.get('STREAM_MAX_RESULTS', 100000))
+
+# ASGI serving mode (asgi_app.py): worker threads for CPU-heavy scoring (index searches,
+# text encoding) so the event loop never blocks; NumPy releases the GIL while scoring
+ASGI_CPU_WORKERS = int(os.environ.get('ASGI_CPU_WORKERS', os.cpu_count() or 4))
+# Seconds before a request to the DRES server made by the async DRES client times out
+DRES_TIMEOUT_SECONDS = float(os.environ.get('DRES_TIMEOUT_SECONDS', 10))
+
+# Shared index snapshot (index_snapshot.py, built by serve.py): when set, the embedding and
+# color matrices are memory-mapped read-only from this directory instead of loaded from Postgres
+SHARED_INDEX_DIR = os.environ.get('SHARED_INDEX_DIR', '')
+
+# Binary embedding store written by the importers (scripts/export_embedding_store.py):
+# when it is current, the embedding index memory-maps it instead of loading from Postgres.
+# EMBEDDING_STORE_DTYPE selects the float32 or the half-size float16 variant
+EMBEDDING_STORE_DIR = os.environ.get(
+    'EMBEDDING_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Dataset', 'embedding_store')
+)
+EMBEDDING_STORE_DTYPE = os.environ.get('EMBEDDING_STORE_DTYPE', 'float32')
+
+# In-process IVF-PQ index (ivfpq_index.py, trained offline with scripts/train_ivfpq_index.py)
+# used by vector searches in 'ivfpq' mode: index directory, inverted lists probed per query
+# (a request's 'probes' overrides it), and approximate candidates re-ranked with exact
+# similarities from the embedding matrix (0 = return the approximate scores as is)
+IVFPQ_INDEX_DIR = os.environ.get(
+    'IVFPQ_INDEX_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Dataset', 'ivfpq_index')
+)
+IVFPQ_NPROBE = int(os.environ.get('IVFPQ_NPROBE', 16))
+IVFPQ_RERANK = int(os.environ.get('IVFPQ_RERANK', 1000))
@@ -0,0 +1,103 @@
+"""
+Data generation watcher for the query server.
+
+The importers bump the `data_generation` counter after every import. The
+watcher re-reads it at most every DATA_GENERATION_CHECK_SECONDS and calls
+its listeners when it changes: the result cache drops its entries and the
+resident indexes are reloaded. It runs whether or not the result cache is
+enabled.
+"""
+
+import logging
+import threading
+import time
+
+from config import DATA_GENERATION_CHECK_SECONDS
+from db_utils import db_connection, fetch_data_generation
+
+logger = logging.getLogger(__name__)
+
+
+def load_data_generation() -> int:
+    """Read the current data generation from the database."""
+    with db_connection() as conn:
+        return fetch_data_generation(conn)
+
+
+class DataGenerationWatcher:
+    """
+    Thread-safe record of the current data generation with change listeners.
+    """
+
+    def __init__(self, check_seconds: float = DATA_GENERATION_CHECK_SECONDS, loader=None):
+        """
+        Args:
+            check_seconds: Minimum interval between data generation lookups in check()
+            loader: Callable returning the current data generation
+        """
+        self.check_seconds = check_seconds
+        self.loader = loader or load_data_generation
+        self.generation = None
+        # False while another task feeds apply() (the ASGI server polls asynchronously)
+        self.polling = True
+
+        self._listeners = []
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        """
+        Call callback(generation, previous) whenever a different generation is
+        read; previous is None on the first read.
+        """
+        self._listeners.append(callback)
+
+    def check(self):
+        """Re-read the data generation if the last lookup is older than check_seconds."""
+        if not self.polling:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_seconds:
+                return
+            self._checked_at = now
+        try:
+            generation = self.loader()
+        except Exception as e:
+            logger.warning(f"Could not read data generation: {e}")
+            return
+        self.apply(generation)
+
+    def apply(self, generation):
+        """Record the current data generation and notify the listeners if it changed."""
+        with self._lock:
+            previous = self.generation
+            if generation == previous:
+                return
+            self.generation = generation
+        if previous is not None:
+            logger.info(f"Data generation changed from {previous} to {generation}")
+        for callback in self._listeners:
+            try:
+                callback(generation, previous)
+            except Exception as e:
+                logger.warning(f"Data generation listener failed: {e}")
+
+
+# Global data generation watcher instance
+generation_watcher = None
+_generation_watcher_lock = threading.Lock()
+
+def get_generation_watcher() -> DataGenerationWatcher:
+    """
+    Get or create the global data generation watcher.
+
+    Returns:
+        DataGenerationWatcher instance
+    """
+    global generation_watcher
+    if generation_watcher is None:
+        with _generation_watcher_lock:
+            if generation_watcher is None:
+                generation_watcher = DataGenerationWatcher()
+    return generation_watcher
@@ -1,6 +1,98 @@
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
 import psycopg2
+import psycopg2.errors
 from psycopg2.extras import RealDictCursor
-from config import DB_CONFIG
+from config import (
+    DB_CONFIG, IVFFLAT_PROBES, HNSW_EF_SEARCH, OCR_FUZZY_SIMILARITY, OCR_FUZZY_MAX_TERMS,
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT, DB_POOL_HEALTH_CHECK_SECONDS, STREAM_ITERSIZE
+)
+
+# ts_rank over search_document with label weights {D, C, B, A}: filename (C) 0.1,
+# object labels (B) 0.3, OCR words (A) 0.6; normalization 32 maps the rank into [0, 1).
+# ts_rank returns float4: it is selected as float8 so the score a client gets back in a
+# cursor compares equal to the keyset expression of the next page
+TEXT_RANK_SQL = "ts_rank('{0.0, 0.1, 0.3, 0.6}', m.search_document, to_tsquery('simple', %s), 32)::float8"
+TEXT_MATCH_SQL = "m.search_document @@ to_tsquery('simple', %s)"
+
+# Columns selected for search results: everything transform_result reads, nothing heavy
+MOMENT_RESULT_COLUMNS = [
+    'm.moment_id',
+    'm.video_id',
+    'm.frame_identifier',
+    'm.timestamp_seconds',
+    'm.keyframe_image_path',
+    'm.detected_object_names',
+    'm.extracted_search_words',
+    'm.average_color_rgb',
+]
+VIDEO_RESULT_COLUMNS = ['v.original_filename', 'v.compressed_filename', 'v.duration_seconds']
+
+# Heavy or rarely needed moment columns, only selected when requested with include=
+OPTIONAL_MOMENT_COLUMNS = {
+    'clip_embedding': ['m.clip_embedding'],
+    'detailed_features': ['m.detailed_features'],
+    'relevance_scores': [
+        'm.text_relevance_score', 'm.object_relevance_score',
+        'm.color_relevance_score', 'm.overall_relevance_score'
+    ],
+    'extraction_success': ['m.extraction_success'],
+    'created_at': ['m.created_at'],
+}
+
+def parse_include(value):
+    """
+    Parse an include= value (list or comma-separated string) into optional field names.
+
+    Raises:
+        ValueError: for unknown field names
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    fields = [str(field).strip() for field in value if str(field).strip()]
+    unknown = [field for field in fields if field not in OPTIONAL_MOMENT_COLUMNS]
+    if unknown:
+        raise ValueError(
+            f"Unknown include field(s): {', '.join(unknown)}. "
+            f"Available: {', '.join(OPTIONAL_MOMENT_COLUMNS)}"
+        )
+    return list(dict.fromkeys(fields))
+
+def moment_columns_sql(include=(), with_video=True) -> str:
+    """SELECT list of the lean result projection plus the requested optional fields."""
+    columns = list(MOMENT_RESULT_COLUMNS)
+    if with_video:
+        columns += VIDEO_RESULT_COLUMNS
+    for field in include:
+        columns += OPTIONAL_MOMENT_COLUMNS[field]
+    return ",\n            ".join(columns)
+
+def keyset_predicate(sort_sql, sort_params, after, descending=True):
+    """
+    Build the keyset pagination predicate for results ordered by
+    (sort expression, moment_id).
+
+    Args:
+        sort_sql: SQL expression the results are ordered by
+        sort_params: Parameters of sort_sql
+        after: (sort value, moment_id) of the last row of the previous page, or None
+        descending: Whether the sort expression is ordered DESC
+
+    Returns:
+        (SQL fragment starting with " AND ", parameters); ("", []) without a cursor
+    """
+    if after is None:
+        return "", []
+    op = '<' if descending else '>'
+    value, moment_id = after
+    sql = f" AND (({sort_sql})::float8 {op} %s::float8 OR (({sort_sql})::float8 = %s::float8 AND m.moment_id > %s))"
+    return sql, list(sort_params) + [float(value)] + list(sort_params) + [float(value), moment_id]
 
 def get_db_connection():
     """Establish and return a database connection."""
@@ -10,6 +102,166 @@ def get_db_connection():
     except Exception as e:
         raise Exception(f"Database connection failed: {e}")
 
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the checkout timeout."""
+
+class ConnectionPool:
+    """
+    Thread-safe pool of database connections.
+
+    Keeps at least min_size connections open and never more than max_size.
+    Checkout waits up to `timeout` seconds for a free connection, connections
+    that were idle for a while are checked with SELECT 1 before being handed
+    out, and returned connections are rolled back so no transaction state or
+    SET LOCAL setting leaks into the next request.
+    """
+
+    def __init__(self, min_size: int = DB_POOL_MIN_SIZE, max_size: int = DB_POOL_MAX_SIZE,
+                 timeout: float = DB_POOL_TIMEOUT, health_check_seconds: float = DB_POOL_HEALTH_CHECK_SECONDS):
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_seconds = health_check_seconds
+        self._idle = deque()  # (connection, time it was returned)
+        self._size = 0  # open connections, idle or checked out
+        self._condition = threading.Condition()
+        self._closed = False
+        for _ in range(self.min_size):
+            self._size += 1
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        return get_db_connection()
+
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_seconds:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def getconn(self, timeout: float = None):
+        """
+        Check out a healthy connection.
+
+        Raises:
+            PoolTimeoutError: if none becomes available within the timeout
+        """
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise Exception("Connection pool is closed")
+                    if self._idle:
+                        # Most recently returned first: it is the least likely to be stale
+                        conn, idle_since = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        conn = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"No database connection available within {self.timeout:.1f}s "
+                            f"(pool size {self.max_size})"
+                        )
+                    self._condition.wait(remaining)
+
+            if conn is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+            if self._is_healthy(conn, idle_since):
+                return conn
+            self._discard(conn)
+
+    def putconn(self, conn):
+        """Return a connection to the pool, discarding it if it is broken."""
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+        if conn.closed or self._closed:
+            self._discard(conn)
+            return
+        with self._condition:
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def closeall(self):
+        """Close every idle connection; checked-out ones are closed when returned."""
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        """Current pool usage."""
+        with self._condition:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+            }
+
+# Global connection pool
+connection_pool = None
+_connection_pool_lock = threading.Lock()
+
+def get_connection_pool() -> ConnectionPool:
+    """
+    Get or create the global connection pool.
+
+    Returns:
+        ConnectionPool instance
+    """
+    global connection_pool
+    if connection_pool is None:
+        with _connection_pool_lock:
+            if connection_pool is None:
+                connection_pool = ConnectionPool()
+    return connection_pool
+
+@contextmanager
+def db_connection():
+    """
+    Check out a pooled connection for the duration of a with-block.
+
+    The connection is always returned to the pool (rolled back) when the
+    block exits, including on errors. Commit explicitly inside the block.
+    """
+    pool = get_connection_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
 def fetch_all_moments_with_colors_and_embeddings(conn):
     """Retrieve all moments with non-null color and embedding data."""
     cursor = conn.cursor(cursor_factory=RealDictCursor)
@@ -32,3 +284,324 @@ def fetch_all_moments_with_colors_and_embeddings(conn):
         ORDER BY m.video_id, m.timestamp_seconds
     """)
     return cursor.fetchall()
+
+def fetch_moment_embeddings(conn):
+    """Retrieve the moment_id and CLIP embedding of every moment that has one."""
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute("""
+        SELECT m.moment_id, m.clip_embedding
+        FROM video_moments m
+        WHERE m.clip_embedding IS NOT NULL
+        ORDER BY m.video_id, m.timestamp_seconds
+    """)
+    return cursor.fetchall()
+
+def fetch_moment_positions(conn):
+    """
+    Retrieve (moment_id, video_id, timestamp_seconds) of every moment that has
+    an embedding, as tuples, in the row order of fetch_moment_embeddings.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT m.moment_id, m.video_id, m.timestamp_seconds
+        FROM video_moments m
+        WHERE m.clip_embedding IS NOT NULL
+        ORDER BY m.video_id, m.timestamp_seconds
+    """)
+    return cursor.fetchall()
+
+def moments_by_ids_query(moment_ids, include=()):
+    """
+    Build the query fetching moments with their video info by moment_id.
+
+    Returns:
+        (SQL, parameters)
+    """
+    sql = f"""
+        SELECT 
+            {moment_columns_sql(include)}
+        FROM video_moments m
+        JOIN videos v ON m.video_id = v.video_id
+        WHERE m.moment_id = ANY(%s)
+    """
+    return sql, [list(moment_ids)]
+
+def order_rows_by_ids(rows, moment_ids):
+    """Return rows in the order of moment_ids, dropping ids without a row."""
+    rows_by_id = {row['moment_id']: row for row in rows}
+    return [rows_by_id[moment_id] for moment_id in moment_ids if moment_id in rows_by_id]
+
+def fetch_moments_by_ids(conn, moment_ids, include=()):
+    """Retrieve moments with their video info, returned in the order of moment_ids."""
+    if not moment_ids:
+        return []
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute(*moments_by_ids_query(moment_ids, include))
+    return order_rows_by_ids(cursor.fetchall(), moment_ids)
+
+def text_search_query(tsquery, limit, after=None, include=()):
+    """
+    Build the full-text query of /api/search/text and /api/search/keywords,
+    ranked by ts_rank with keyset pagination on (score, moment_id).
+
+    Returns:
+        (SQL, parameters)
+    """
+    keyset_sql, keyset_params = keyset_predicate(TEXT_RANK_SQL, [tsquery], after)
+    sql = f"""
+        SELECT {moment_columns_sql(include)},
+               {TEXT_RANK_SQL} AS score
+        FROM video_moments m
+        JOIN videos v ON m.video_id = v.video_id
+        WHERE {TEXT_MATCH_SQL}{keyset_sql}
+        ORDER BY score DESC, m.moment_id
+        LIMIT %s
+    """
+    return sql, [tsquery, tsquery] + keyset_params + [int(limit)]
+
+def time_range_query(start, end, limit, video_id=None, after=None, include=()):
+    """
+    Build the query of /api/search/temporal, ordered by (timestamp_seconds, moment_id).
+
+    Returns:
+        (SQL, parameters)
+    """
+    sql = f"""
+        SELECT {moment_columns_sql(include)}
+        FROM video_moments m
+        JOIN videos v ON m.video_id = v.video_id
+        WHERE m.timestamp_seconds BETWEEN %s AND %s
+    """
+    params = [start, end]
+    if video_id:
+        sql += " AND m.video_id = %s"
+        params.append(video_id)
+
+    keyset_sql, keyset_params = keyset_predicate("m.timestamp_seconds", [], after, descending=False)
+    sql += keyset_sql + " ORDER BY m.timestamp_seconds, m.moment_id LIMIT %s"
+    return sql, params + keyset_params + [int(limit)]
+
+def object_search_query(objects, limit, match_all=False, after=None, include=()):
+    """
+    Build the query of /api/search/objects, ordered by (timestamp_seconds, moment_id).
+
+    Returns:
+        (SQL, parameters)
+    """
+    where_clauses = []
+    params = []
+    for obj in objects:
+        where_clauses.append("array_to_string(m.detected_object_names, ' ') ILIKE %s")
+        params.append(f'%{obj}%')
+
+    clause = " AND ".join(where_clauses) if match_all else " OR ".join(where_clauses)
+    keyset_sql, keyset_params = keyset_predicate("m.timestamp_seconds", [], after, descending=False)
+    sql = f"""
+        SELECT {moment_columns_sql(include)}
+        FROM video_moments m
+        JOIN videos v ON m.video_id = v.video_id
+        WHERE ({clause}){keyset_sql}
+        ORDER BY m.timestamp_seconds, m.moment_id
+        LIMIT %s
+    """
+    return sql, params + keyset_params + [int(limit)]
+
+def video_frames_query(video_id, include=()):
+    """
+    Build the query of /api/explore/<video_id>: every frame of a video in time order.
+
+    Returns:
+        (SQL, parameters)
+    """
+    sql = f"""
+        SELECT {moment_columns_sql(include, with_video=False)}
+        FROM video_moments m
+        WHERE m.video_id = %s
+        ORDER BY m.timestamp_seconds
+    """
+    return sql, [video_id]
+
+def to_pgvector_literal(embedding):
+    """Format an embedding as a pgvector text literal, e.g. '[0.1,0.2,...]'."""
+    return '[' + ','.join(repr(float(x)) for x in embedding) + ']'
+
+# Transaction-local index settings (set_config instead of SET so the value can be a parameter)
+SET_IVFFLAT_PROBES_SQL = "SELECT set_config('ivfflat.probes', %s, true)"
+SET_HNSW_EF_SEARCH_SQL = "SELECT set_config('hnsw.ef_search', %s, true)"
+SET_TRGM_SIMILARITY_SQL = "SELECT set_config('pg_trgm.similarity_threshold', %s, true)"
+
+def set_ivfflat_probes(cursor, probes):
+    """Set ivfflat.probes for the current transaction only."""
+    cursor.execute(SET_IVFFLAT_PROBES_SQL, (str(int(probes)),))
+
+def set_hnsw_ef_search(cursor, ef_search):
+    """Set hnsw.ef_search for the current transaction only."""
+    cursor.execute(SET_HNSW_EF_SEARCH_SQL, (str(int(ef_search)),))
+
+def embedding_search_query(embedding, threshold, limit, after=None, include=()):
+    """
+    Build the pgvector similarity query used by search_moments_by_embedding.
+
+    Returns:
+        (SQL, parameters)
+    """
+    vector = to_pgvector_literal(embedding)
+    keyset_sql = ""
+    params = [vector, vector, vector, 1.0 - float(threshold)]
+    if after is not None:
+        keyset_sql = """
+        AND ((m.clip_embedding <=> %s::vector) > %s
+             OR ((m.clip_embedding <=> %s::vector) = %s AND m.moment_id > %s))"""
+        params.extend([vector, float(after[0]), vector, float(after[0]), after[1]])
+    params.extend([vector, int(limit)])
+    sql = f"""
+        SELECT 
+            {moment_columns_sql(include)},
+            1 - (m.clip_embedding <=> %s::vector) AS similarity_score,
+            m.clip_embedding <=> %s::vector AS distance
+        FROM video_moments m
+        JOIN videos v ON m.video_id = v.video_id
+        WHERE m.clip_embedding IS NOT NULL
+        AND (m.clip_embedding <=> %s::vector) <= %s{keyset_sql}
+        ORDER BY m.clip_embedding <=> %s::vector, m.moment_id
+        LIMIT %s
+    """
+    return sql, params
+
+def search_moments_by_embedding(conn, embedding, threshold, limit, probes=IVFFLAT_PROBES, ef_search=HNSW_EF_SEARCH,
+                                after=None, include=()):
+    """
+    Run a cosine similarity search inside Postgres using the pgvector index.
+
+    Only the top `limit` moments with similarity >= threshold are returned,
+    ordered by `clip_embedding <=> query`. Works with either an ivfflat or an
+    HNSW index on clip_embedding (see database/migrate_vector_index.py).
+
+    `after` is an optional (distance, moment_id) keyset cursor: only moments
+    ranked after it are returned. Moments with exactly the same distance are
+    ordered by moment_id in the ORDER BY (an incremental sort on top of the
+    index scan), so the LIMIT never splits tied moments the cursor cannot reach.
+    """
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    set_ivfflat_probes(cursor, probes)
+    set_hnsw_ef_search(cursor, max(int(ef_search), int(limit)))
+    cursor.execute(*embedding_search_query(embedding, threshold, limit, after=after, include=include))
+    return cursor.fetchall()
+
+def ranked_moments_query(moment_ids, scores, include=()):
+    """
+    Build a query returning the given moments in the given order, each with its score.
+
+    Used to stream an in-memory ranking: the ranking is passed as arrays and
+    joined back WITH ORDINALITY, so the rows come out of a server-side cursor
+    in rank order without materializing them in Python.
+
+    Returns:
+        (SQL, parameters)
+    """
+    sql = f"""
+        SELECT 
+            {moment_columns_sql(include)},
+            r.score
+        FROM unnest(%s::text[], %s::float8[]) WITH ORDINALITY AS r(moment_id, score, rank)
+        JOIN video_moments m ON m.moment_id = r.moment_id
+        JOIN videos v ON m.video_id = v.video_id
+        ORDER BY r.rank
+    """
+    return sql, [list(moment_ids), [float(score) for score in scores]]
+
+def stream_query(conn, sql, params, itersize=STREAM_ITERSIZE):
+    """
+    Iterate over the rows of a query through a named (server-side) cursor.
+
+    Only `itersize` rows are held in memory at a time. The cursor lives in
+    the connection's transaction, so the caller must keep the connection
+    checked out until iteration finishes.
+    """
+    cursor = conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=RealDictCursor)
+    cursor.itersize = itersize
+    try:
+        cursor.execute(sql, params)
+        for row in cursor:
+            yield row
+    finally:
+        cursor.close()
+
+def fetch_moment_colors(conn):
+    """Retrieve the moment_id and average color of every moment that has one."""
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute("""
+        SELECT m.moment_id, m.average_color_rgb
+        FROM video_moments m
+        WHERE m.average_color_rgb IS NOT NULL
+        ORDER BY m.video_id, m.timestamp_seconds
+    """)
+    return cursor.fetchall()
+
+def fetch_text_scores(conn, tsquery):
+    """(moment_id, ts_rank) of every moment matching a to_tsquery() string."""
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT m.moment_id, {TEXT_RANK_SQL} FROM video_moments m WHERE {TEXT_MATCH_SQL}", (tsquery, tsquery)
+    )
+    return cursor.fetchall()
+
+def fetch_object_moments(conn, objects):
+    """moment_id of every moment in which all of the given objects were detected."""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT m.moment_id FROM video_moments m WHERE m.detected_object_names @> %s::text[]", (list(objects),)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+# Similar OCR vocabulary words per query keyword, most similar first
+# (parameters: keywords as text[], maximum words per keyword)
+FUZZY_EXPANSION_SQL = """
+    SELECT q.keyword, t.word
+    FROM unnest(%s::text[]) AS q(keyword)
+    CROSS JOIN LATERAL (
+        SELECT o.word
+        FROM ocr_vocabulary o
+        WHERE o.word %% q.keyword
+        ORDER BY o.word <-> q.keyword, o.moment_count DESC
+        LIMIT %s
+    ) t
+"""
+
+def expand_keywords_fuzzy(conn, keywords, similarity=OCR_FUZZY_SIMILARITY, max_terms=OCR_FUZZY_MAX_TERMS):
+    """
+    Expand each keyword to similar OCR vocabulary words using the pg_trgm index.
+
+    Returns:
+        dict mapping each keyword to a list of similar vocabulary words, most similar first
+    """
+    if not keywords:
+        return {}
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    # The % operator uses pg_trgm.similarity_threshold and is served by idx_ocr_vocabulary_trgm
+    cursor.execute(SET_TRGM_SIMILARITY_SQL, (str(float(similarity)),))
+    cursor.execute(FUZZY_EXPANSION_SQL, ([str(keyword).lower() for keyword in keywords], int(max_terms)))
+    return group_fuzzy_expansions(keywords, cursor.fetchall())
+
+def group_fuzzy_expansions(keywords, rows):
+    """Group (keyword, word) rows of FUZZY_EXPANSION_SQL into keyword -> similar words."""
+    expansions = {str(keyword).lower(): [] for keyword in keywords}
+    for row in rows:
+        expansions[row['keyword']].append(row['word'])
+    return expansions
+
+def fetch_data_generation(conn) -> int:
+    """
+    Read the data generation counter bumped by the importers.
+
+    Returns 0 if the data_generation table does not exist yet
+    (run database/migrate_data_generation.py).
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT generation FROM data_generation WHERE id = 1")
+    except psycopg2.errors.UndefinedTable:
+        conn.rollback()
+        return 0
+    row = cursor.fetchone()
+    return int(row[0]) if row else 0
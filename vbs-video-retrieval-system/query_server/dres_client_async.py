@@ -0,0 +1,196 @@
+"""
+Asyncio DRES client for the ASGI serving mode (asgi_app.py).
+
+Same endpoints, payloads and return values as DRESClient, but requests go
+through an httpx.AsyncClient, so a slow DRES round-trip suspends only the
+request that is waiting on it. Batch submissions are sent concurrently.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Any
+
+import httpx
+
+from config import DRES_TIMEOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+class AsyncDRESClient:
+    """
+    Async client for the DRES (Distributed Retrieval Evaluation Server).
+    """
+
+    def __init__(self, base_url: str = None, username: str = None, password: str = None,
+                 timeout: float = DRES_TIMEOUT_SECONDS):
+        """
+        Args:
+            base_url: DRES server base URL (defaults to environment variable)
+            username: DRES username (defaults to environment variable)
+            password: DRES password (defaults to environment variable)
+            timeout: Timeout of each request in seconds
+        """
+        self.base_url = base_url or os.environ.get('DRES_BASE_URL', 'http://localhost:8080')
+        self.username = username or os.environ.get('DRES_USERNAME', 'vbs_user')
+        self.password = password or os.environ.get('DRES_PASSWORD', 'vbs_password')
+
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={'Content-Type': 'application/json', 'Accept': 'application/json'},
+            timeout=timeout
+        )
+        self.auth_token = None
+        # Concurrent requests share one login
+        self._auth_lock = asyncio.Lock()
+
+        logger.info(f"Async DRES client initialized for {self.base_url}")
+
+    async def close(self):
+        """Close the underlying HTTP connections."""
+        await self.client.aclose()
+
+    async def authenticate(self) -> bool:
+        """
+        Authenticate with the DRES server.
+
+        Returns:
+            bool: True if authentication successful, False otherwise
+        """
+        try:
+            response = await self.client.post(
+                "/api/auth/login", json={"username": self.username, "password": self.password}
+            )
+            if response.status_code != 200:
+                logger.error(f"DRES authentication failed: {response.status_code} - {response.text}")
+                return False
+
+            self.auth_token = response.json().get('token')
+            if not self.auth_token:
+                logger.error("No token received from DRES")
+                return False
+            self.client.headers['Authorization'] = f'Bearer {self.auth_token}'
+            logger.info("DRES authentication successful")
+            return True
+        except Exception as e:
+            logger.error(f"DRES authentication error: {e}")
+            return False
+
+    async def ensure_authenticated(self) -> bool:
+        """Log in unless a token is already held."""
+        if self.auth_token:
+            return True
+        async with self._auth_lock:
+            return bool(self.auth_token) or await self.authenticate()
+
+    async def _get_json(self, path: str, params: dict = None, what: str = 'data'):
+        """GET a DRES endpoint; returns the decoded JSON or None on failure."""
+        try:
+            if not await self.ensure_authenticated():
+                return None
+            response = await self.client.get(path, params=params)
+            if response.status_code == 200:
+                return response.json()
+            logger.error(f"Failed to get {what}: {response.status_code}")
+            return None
+        except Exception as e:
+            logger.error(f"Error getting {what}: {e}")
+            return None
+
+    async def submit_result(self, query_id: str, video_id: str, timestamp: float, confidence: float = 1.0,
+                            segment_start: float = None, segment_end: float = None) -> bool:
+        """
+        Submit a Known-Item Search (KIS) result to DRES.
+
+        Returns:
+            bool: True if submission successful, False otherwise
+        """
+        try:
+            if not await self.ensure_authenticated():
+                logger.error("Cannot submit result: not authenticated with DRES")
+                return False
+
+            submission_data = {
+                "queryId": query_id,
+                "videoId": video_id,
+                "timestamp": timestamp,
+                "confidence": confidence
+            }
+            if segment_start is not None and segment_end is not None:
+                submission_data.update({"segmentStart": segment_start, "segmentEnd": segment_end})
+
+            response = await self.client.post("/api/submission/submit", json=submission_data)
+            if response.status_code == 200:
+                logger.info(f"Successfully submitted result for query {query_id}: video {video_id} at {timestamp}s")
+                return True
+            logger.error(f"DRES submission failed: {response.status_code} - {response.text}")
+            return False
+        except Exception as e:
+            logger.error(f"DRES submission error: {e}")
+            return False
+
+    async def get_query_info(self, query_id: str) -> Optional[Dict[str, Any]]:
+        """Information about a specific query, or None if failed."""
+        return await self._get_json(f"/api/query/{query_id}", what='query info')
+
+    async def get_active_queries(self) -> List[Dict[str, Any]]:
+        """List of active queries ([] if failed)."""
+        return await self._get_json("/api/query/active", what='active queries') or []
+
+    async def get_competition_status(self) -> Optional[Dict[str, Any]]:
+        """Current competition status, or None if failed."""
+        return await self._get_json("/api/competition/status", what='competition status')
+
+    async def get_submission_history(self, query_id: str = None) -> List[Dict[str, Any]]:
+        """Submission history, optionally for one query ([] if failed)."""
+        params = {'queryId': query_id} if query_id else None
+        return await self._get_json("/api/submission/history", params=params, what='submission history') or []
+
+    async def submit_multiple_results(self, results: List[Dict[str, Any]]) -> Dict[str, bool]:
+        """
+        Submit multiple results concurrently.
+
+        Returns:
+            Dict mapping query_id to success status
+        """
+        results = [result for result in results if result.get('query_id')]
+        outcomes = await asyncio.gather(*[
+            self.submit_result(
+                query_id=result['query_id'],
+                video_id=result.get('video_id'),
+                timestamp=result.get('timestamp'),
+                confidence=result.get('confidence', 1.0),
+                segment_start=result.get('segment_start'),
+                segment_end=result.get('segment_end')
+            )
+            for result in results
+        ])
+        return {result['query_id']: success for result, success in zip(results, outcomes)}
+
+    async def test_connection(self) -> bool:
+        """
+        Test the connection to the DRES server by logging in.
+
+        Returns:
+            bool: True if connection successful, False otherwise
+        """
+        if await self.authenticate():
+            logger.info("DRES connection test successful")
+            return True
+        logger.error("DRES connection test failed: authentication failed")
+        return False
+
+# Global async DRES client instance
+async_dres_client = None
+
+def get_async_dres_client() -> AsyncDRESClient:
+    """
+    Get or create the global async DRES client instance.
+
+    Returns:
+        AsyncDRESClient instance
+    """
+    global async_dres_client
+    if async_dres_client is None:
+        async_dres_client = AsyncDRESClient()
+    return async_dres_client
@@ -0,0 +1,329 @@
+"""
+Resident CLIP embedding index for the query server.
+
+All moment embeddings are loaded once into a contiguous, L2-normalized
+float32 matrix so that a vector query is a single matrix-vector product
+followed by an argpartition top-k, instead of a full table transfer and a
+per-row cosine computation in Python.
+"""
+
+import logging
+import threading
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from config import SHARED_INDEX_DIR, EMBEDDING_STORE_DIR, EMBEDDING_STORE_DTYPE
+from db_utils import db_connection, fetch_moment_embeddings, fetch_data_generation
+from index_snapshot import load_matrix, read_manifest, read_store_manifest, store_matrix_name
+from utils_server import parse_json_field
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 768
+
+# Rows per block when scoring a float16 matrix (converted to float32 block by block)
+SCORE_BLOCK_ROWS = 16384
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row in place; all-zero rows are left as zeros."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms < 1e-12] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return the indices of the k highest scores, best first."""
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.size:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.size)
+    # Stable sort keeps the original (video_id, timestamp) order for ties
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def keyset_top_k(keys: np.ndarray, moment_ids, k: int, after=None, mask: np.ndarray = None,
+                 descending: bool = True) -> np.ndarray:
+    """
+    Return the indices of the k best rows ordered by (key, moment_id).
+
+    Rows are ranked by key (highest first when descending) with moment_id as
+    the tie-breaker, so the order is total and a page can resume right after
+    the last row of the previous page.
+
+    Args:
+        keys: Sort key per row
+        moment_ids: moment_id per row (list or array aligned with keys)
+        k: Number of rows to return
+        after: Optional (key, moment_id) of the last row already returned
+        mask: Optional boolean array of eligible rows
+        descending: Rank high keys first
+    """
+    sort_keys = -keys if descending else keys
+    eligible = np.ones(len(keys), dtype=bool) if mask is None else mask.copy()
+    if after is not None:
+        after_key = -after[0] if descending else after[0]
+        ties = np.flatnonzero(eligible & (sort_keys == after_key))
+        eligible &= sort_keys > after_key
+        eligible[[row for row in ties if moment_ids[row] > after[1]]] = True
+    rows = np.flatnonzero(eligible)
+    if k <= 0 or rows.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if rows.size > k:
+        # Keep everything tied with the k-th key so the moment_id tie-break is exact
+        kth = np.partition(sort_keys[rows], k - 1)[k - 1]
+        rows = rows[sort_keys[rows] <= kth]
+    order = sorted(range(rows.size), key=lambda i: (sort_keys[rows[i]], moment_ids[rows[i]]))
+    return rows[order[:k]]
+
+
+class EmbeddingIndex:
+    """
+    In-memory matrix of all moment CLIP embeddings keyed by moment_id.
+    """
+
+    def __init__(self, moment_ids: List[str], embeddings: np.ndarray, normalized: bool = False):
+        """
+        Args:
+            moment_ids: Moment IDs, one per embedding row
+            embeddings: (N, EMBEDDING_DIM) array of raw embeddings
+            normalized: Rows are already L2-normalized; the array is used as is
+                (e.g. a read-only float32 or float16 memory map)
+        """
+        self.moment_ids = list(moment_ids)
+        if normalized:
+            self.embeddings = embeddings
+        else:
+            self.embeddings = normalize_rows(np.ascontiguousarray(embeddings, dtype=np.float32))
+        self.id_to_row = {moment_id: row for row, moment_id in enumerate(self.moment_ids)}
+        self.loaded_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.moment_ids)
+
+    @classmethod
+    def from_rows(cls, rows) -> 'EmbeddingIndex':
+        """Build the index from (moment_id, clip_embedding) database rows."""
+        moment_ids = []
+        embeddings = np.zeros((len(rows), EMBEDDING_DIM), dtype=np.float32)
+        for row in rows:
+            vector = parse_json_field(row['clip_embedding'])
+            if vector is None or len(vector) != EMBEDDING_DIM:
+                continue
+            embeddings[len(moment_ids)] = np.asarray(vector, dtype=np.float32)
+            moment_ids.append(row['moment_id'])
+        return cls(moment_ids, embeddings[:len(moment_ids)])
+
+    @classmethod
+    def load(cls) -> 'EmbeddingIndex':
+        """Load every stored embedding from the database."""
+        start = time.time()
+        with db_connection() as conn:
+            rows = fetch_moment_embeddings(conn)
+        index = cls.from_rows(rows)
+        logger.info(f"Loaded {len(index)} embeddings into memory in {time.time() - start:.2f}s")
+        return index
+
+    @classmethod
+    def attach(cls, directory: str, name: str = 'embeddings') -> 'EmbeddingIndex':
+        """
+        Memory-map a normalized embedding matrix of a shared index snapshot or
+        embedding store (index_snapshot.py).
+
+        Args:
+            name: Matrix to map, e.g. 'embeddings_float16' for the float16 store variant
+        """
+        start = time.time()
+        moment_ids, embeddings = load_matrix(directory, name, ids_name='embeddings')
+        index = cls(moment_ids, embeddings, normalized=True)
+        logger.info(
+            f"Attached {len(index)} {embeddings.dtype} embeddings from {directory} in {time.time() - start:.2f}s"
+        )
+        return index
+
+    def prepare_query(self, embedding) -> np.ndarray:
+        """Validate and L2-normalize a query embedding."""
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if query.shape[0] != self.embeddings.shape[1]:
+            raise ValueError(f"Embedding must have {self.embeddings.shape[1]} dimensions, got {query.shape[0]}")
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 1e-12 else query
+
+    def scores(self, embedding) -> np.ndarray:
+        """Cosine similarity of the query against every indexed moment."""
+        query = self.prepare_query(embedding)
+        if self.embeddings.dtype == np.float32:
+            return self.embeddings @ query
+        # There is no BLAS kernel for float16: widen one block at a time
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), SCORE_BLOCK_ROWS):
+            block = self.embeddings[start:start + SCORE_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        return scores
+
+    def search(self, embedding, threshold: float = 0.0, limit: int = 50,
+               after=None) -> Tuple[List[Tuple[str, float]], int]:
+        """
+        Find the moments most similar to the query embedding.
+
+        Args:
+            embedding: Query embedding
+            threshold: Minimum cosine similarity
+            limit: Maximum number of results
+            after: Optional (similarity, moment_id) cursor; only rows ranked after it are returned
+
+        Returns:
+            (list of (moment_id, similarity), total number of moments above threshold)
+        """
+        scores = self.scores(embedding)
+        matching = scores >= threshold
+        best = keyset_top_k(scores, self.moment_ids, limit, after=after, mask=matching)
+        return [(self.moment_ids[i], float(scores[i])) for i in best], int(np.count_nonzero(matching))
+
+    def search_batch(self, embeddings, thresholds, limits, masks=None) -> List[Tuple[List[Tuple[str, float]], int]]:
+        """
+        Run several queries in one pass over the matrix.
+
+        The matrix is read once, block by block; every block is scored against
+        all queries with one matrix-matrix product and only the per-query top
+        rows of each block (and every row tied with a query's k-th score) are
+        kept, so the moment_id tie-break stays exact across block boundaries.
+
+        Args:
+            embeddings: Query embeddings
+            thresholds: Minimum cosine similarity per query
+            limits: Maximum number of results per query
+            masks: Optional boolean row mask (or None) per query
+
+        Returns:
+            One (list of (moment_id, similarity), total number of matches) per query
+        """
+        queries = np.stack([self.prepare_query(embedding) for embedding in embeddings])
+        thresholds = np.asarray(thresholds, dtype=np.float32)
+        masks = masks or [None] * len(queries)
+        k = max(1, max(limits))
+        counts = np.zeros(len(queries), dtype=np.int64)
+        candidate_rows, candidate_scores = [], []
+        for start in range(0, len(self), SCORE_BLOCK_ROWS):
+            block = np.asarray(self.embeddings[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            scores = block @ queries.T
+            eligible = scores >= thresholds
+            for column, mask in enumerate(masks):
+                if mask is not None:
+                    eligible[:, column] &= mask[start:start + len(block)]
+            counts += np.count_nonzero(eligible, axis=0)
+            scores[~eligible] = -np.inf
+            if len(block) > k:
+                kth = -np.partition(-scores, k - 1, axis=0)[k - 1]
+                scores[scores < kth] = -np.inf
+            top = np.flatnonzero(np.isfinite(scores).any(axis=1))
+            candidate_rows.append(top + start)
+            candidate_scores.append(scores[top])
+
+        results = []
+        rows = np.concatenate(candidate_rows) if candidate_rows else np.empty(0, dtype=np.int64)
+        scores = np.concatenate(candidate_scores) if candidate_scores else np.empty((0, len(queries)), dtype=np.float32)
+        for column, limit in enumerate(limits):
+            matching = np.isfinite(scores[:, column])
+            query_rows, query_scores = rows[matching], scores[matching, column]
+            moment_ids = [self.moment_ids[row] for row in query_rows]
+            best = keyset_top_k(query_scores, moment_ids, limit)
+            results.append(([(moment_ids[i], float(query_scores[i])) for i in best], int(counts[column])))
+        return results
+
+
+def embedding_store_is_current(directory: str) -> bool:
+    """
+    Whether the embedding store in directory exists and was exported at the
+    current data generation. If the generation cannot be read, an existing
+    store is used.
+    """
+    manifest = read_store_manifest(directory)
+    if manifest is None:
+        return False
+    try:
+        with db_connection() as conn:
+            generation = fetch_data_generation(conn)
+    except Exception:
+        return True
+    if manifest.get('data_generation') != generation:
+        logger.warning(
+            f"Embedding store in {directory} is stale (generation {manifest.get('data_generation')}, "
+            f"database at {generation}); run scripts/export_embedding_store.py"
+        )
+        return False
+    return True
+
+def shared_snapshot_is_current(directory: str) -> bool:
+    """
+    Whether the shared index snapshot in directory (see serve.py) exists and was
+    built at the current data generation. If the generation cannot be read, an
+    existing snapshot is used.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return False
+    try:
+        with db_connection() as conn:
+            generation = fetch_data_generation(conn)
+    except Exception:
+        return True
+    if manifest.get('data_generation') != generation:
+        logger.warning(
+            f"Shared index snapshot in {directory} is stale (generation {manifest.get('data_generation')}, "
+            f"database at {generation}); loading without it until serve.py rebuilds it"
+        )
+        return False
+    return True
+
+def load_embedding_index(shared: bool = True) -> EmbeddingIndex:
+    """
+    Load the embedding index from the fastest available source.
+
+    In order: the shared index snapshot in SHARED_INDEX_DIR if it is current
+    (unless shared is False), the embedding store in EMBEDDING_STORE_DIR if it
+    is current, and the database.
+    """
+    if shared and SHARED_INDEX_DIR and shared_snapshot_is_current(SHARED_INDEX_DIR):
+        try:
+            return EmbeddingIndex.attach(SHARED_INDEX_DIR)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not attach shared embedding index: {e}")
+    if EMBEDDING_STORE_DIR and embedding_store_is_current(EMBEDDING_STORE_DIR):
+        try:
+            return EmbeddingIndex.attach(EMBEDDING_STORE_DIR, store_matrix_name(EMBEDDING_STORE_DTYPE))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not attach embedding store: {e}")
+    return EmbeddingIndex.load()
+
+
+# Global embedding index instance
+embedding_index = None
+_embedding_index_lock = threading.Lock()
+
+def get_embedding_index() -> EmbeddingIndex:
+    """
+    Get or load the global embedding index.
+
+    Returns:
+        EmbeddingIndex instance
+    """
+    global embedding_index
+    if embedding_index is None:
+        with _embedding_index_lock:
+            if embedding_index is None:
+                embedding_index = load_embedding_index()
+    return embedding_index
+
+def reload_embedding_index() -> EmbeddingIndex:
+    """Rebuild the global embedding index (or re-attach the shared snapshot), e.g. after an import."""
+    global embedding_index
+    index = load_embedding_index()
+    with _embedding_index_lock:
+        embedding_index = index
+    return index
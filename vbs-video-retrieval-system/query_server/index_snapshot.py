@@ -0,0 +1,207 @@
+"""
+Shared index snapshot for multi-worker serving, and the on-disk embedding store.
+
+The embedding and color matrices are written once to a directory as .npy
+files (ideally on /dev/shm) and every worker process memory-maps them
+read-only. The matrices then exist once in the OS page cache no matter how
+many workers attach, and a worker becomes ready without querying Postgres.
+
+Layout:
+    manifest.json        counts, dimensions, data generation, creation time
+    embeddings.npy       (N, 768) float32, rows L2-normalized
+    embeddings_ids.npy   moment_id of each embedding row
+    colors.npy           (M, 3) float64 average colors
+    colors_ids.npy       moment_id of each color row
+
+The embedding store written by the importers (write_embedding_store) uses
+the same files for its float32 matrix, plus embeddings_float16.npy (same
+rows, half the size) and embedding_store.json instead of manifest.json.
+The IVF-PQ index (ivfpq_index.py) is saved with the same helpers under
+ivfpq.json and ivfpq_*.npy.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+SNAPSHOT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+STORE_MANIFEST_FILE = 'embedding_store.json'
+
+# Embedding store matrix per dtype; all share embeddings_ids.npy
+STORE_MATRIX_NAMES = {'float32': 'embeddings', 'float16': 'embeddings_float16'}
+
+
+def snapshot_paths(directory: str, name: str):
+    """Paths of the matrix file and the moment_id file of one snapshot matrix."""
+    return os.path.join(directory, f'{name}.npy'), os.path.join(directory, f'{name}_ids.npy')
+
+
+def _atomic_save(path: str, array: np.ndarray):
+    """Write an .npy file under a temporary name and rename it into place."""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array, allow_pickle=False)
+    # Workers that still map the old file keep reading the old inode
+    os.replace(tmp_path, path)
+
+
+def save_matrix(directory: str, name: str, moment_ids, matrix: np.ndarray):
+    """Store a matrix and its row-aligned moment_ids."""
+    matrix_path, ids_path = snapshot_paths(directory, name)
+    _atomic_save(ids_path, np.asarray(list(moment_ids), dtype=str))
+    _atomic_save(matrix_path, np.ascontiguousarray(matrix))
+
+
+def save_array(directory: str, name: str, array: np.ndarray):
+    """Store a plain array (no moment_ids) as name.npy."""
+    _atomic_save(snapshot_paths(directory, name)[0], np.ascontiguousarray(array))
+
+
+def load_array(directory: str, name: str, mmap: bool = False) -> np.ndarray:
+    """Load an array stored with save_array, optionally memory-mapped read-only."""
+    return np.load(snapshot_paths(directory, name)[0], mmap_mode='r' if mmap else None, allow_pickle=False)
+
+
+def store_matrix_name(dtype: str) -> str:
+    """Matrix name of the embedding store variant with the given dtype."""
+    if dtype not in STORE_MATRIX_NAMES:
+        raise ValueError(f"Unsupported embedding store dtype: {dtype} (use {', '.join(STORE_MATRIX_NAMES)})")
+    return STORE_MATRIX_NAMES[dtype]
+
+
+def load_matrix(directory: str, name: str, ids_name: str = None):
+    """
+    Memory-map a snapshot matrix read-only.
+
+    Args:
+        ids_name: Matrix whose moment_id file applies (default: name itself)
+
+    Returns:
+        (list of moment_ids, read-only np.memmap of the matrix)
+
+    Raises:
+        FileNotFoundError: if the snapshot has no such matrix
+    """
+    matrix_path, ids_path = snapshot_paths(directory, name)
+    if ids_name:
+        ids_path = snapshot_paths(directory, ids_name)[1]
+    matrix = np.load(matrix_path, mmap_mode='r')
+    moment_ids = np.load(ids_path, allow_pickle=False).tolist()
+    if len(moment_ids) != matrix.shape[0]:
+        raise ValueError(f"Snapshot {name} is inconsistent: {len(moment_ids)} ids for {matrix.shape[0]} rows")
+    return moment_ids, matrix
+
+
+def read_manifest(directory: str, filename: str = MANIFEST_FILE):
+    """Manifest of the snapshot in directory, or None if there is none."""
+    try:
+        with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == SNAPSHOT_VERSION else None
+
+
+def read_store_manifest(directory: str):
+    """Manifest of the embedding store in directory, or None if there is none."""
+    return read_manifest(directory, STORE_MANIFEST_FILE)
+
+
+def write_manifest(directory: str, filename: str, manifest: dict):
+    """Write a manifest file atomically."""
+    tmp_path = os.path.join(directory, f'{filename}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, filename))
+
+
+def write_index_snapshot(directory: str, embedding_index, color_index, generation=None) -> dict:
+    """
+    Write the embedding and color indexes to a snapshot directory.
+
+    The manifest is written last, so a snapshot without a manifest is incomplete.
+
+    Args:
+        embedding_index: EmbeddingIndex (rows already normalized)
+        color_index: ColorIndex
+        generation: Data generation the indexes were loaded at
+
+    Returns:
+        The manifest
+    """
+    os.makedirs(directory, exist_ok=True)
+    save_matrix(directory, 'embeddings', embedding_index.moment_ids, embedding_index.embeddings)
+    save_matrix(directory, 'colors', color_index.moment_ids, color_index.colors)
+
+    manifest = {
+        'version': SNAPSHOT_VERSION,
+        'data_generation': generation,
+        'created_at': time.time(),
+        'embeddings': {'rows': len(embedding_index), 'dim': int(embedding_index.embeddings.shape[1]),
+                       'dtype': str(embedding_index.embeddings.dtype)},
+        'colors': {'rows': len(color_index)},
+    }
+    write_manifest(directory, MANIFEST_FILE, manifest)
+    return manifest
+
+
+def write_embedding_store(directory: str, chunks, count: int, dim: int, generation=None,
+                          dtypes=('float32', 'float16')) -> dict:
+    """
+    Write the row-aligned embedding store from chunks of embeddings.
+
+    Rows are L2-normalized and written straight into memory-mapped output
+    files, so the full matrix never has to fit in memory.
+
+    Args:
+        chunks: Iterable of (moment_ids, (n, dim) array of raw embeddings)
+        count: Total number of rows the chunks yield
+        dim: Embedding dimension
+        generation: Data generation the embeddings were read at
+        dtypes: Matrix variants to write ('float32', 'float16')
+
+    Returns:
+        The store manifest
+    """
+    os.makedirs(directory, exist_ok=True)
+    names = {dtype: store_matrix_name(dtype) for dtype in dtypes}
+    tmp_paths = {dtype: f'{snapshot_paths(directory, name)[0]}.tmp' for dtype, name in names.items()}
+    matrices = {
+        dtype: np.lib.format.open_memmap(tmp_paths[dtype], mode='w+', dtype=dtype, shape=(count, dim))
+        for dtype in dtypes
+    }
+
+    moment_ids = []
+    for chunk_ids, chunk in chunks:
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1, dim)
+        norms = np.linalg.norm(chunk, axis=1, keepdims=True)
+        norms[norms < 1e-12] = 1.0
+        chunk = chunk / norms
+        start, stop = len(moment_ids), len(moment_ids) + len(chunk)
+        if stop > count:
+            raise ValueError(f"Embedding store received more than the expected {count} rows")
+        for matrix in matrices.values():
+            matrix[start:stop] = chunk
+        moment_ids.extend(chunk_ids)
+    if len(moment_ids) != count:
+        raise ValueError(f"Embedding store received {len(moment_ids)} rows, expected {count}")
+
+    for dtype, matrix in matrices.items():
+        matrix.flush()
+        os.replace(tmp_paths[dtype], snapshot_paths(directory, names[dtype])[0])
+    matrices.clear()
+    _atomic_save(snapshot_paths(directory, 'embeddings')[1], np.asarray(moment_ids, dtype=str))
+
+    manifest = {
+        'version': SNAPSHOT_VERSION,
+        'data_generation': generation,
+        'created_at': time.time(),
+        'rows': count,
+        'dim': dim,
+        'dtypes': list(dtypes),
+    }
+    write_manifest(directory, STORE_MANIFEST_FILE, manifest)
+    return manifest
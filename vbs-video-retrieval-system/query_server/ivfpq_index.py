@@ -0,0 +1,377 @@
+"""
+In-process IVF-PQ index for vector search at full V3C scale.
+
+The embeddings are clustered by a coarse k-means quantizer into nlist
+inverted lists, and the residual of every embedding to its list centroid is
+product-quantized: split into m sub-vectors, each replaced by the 8-bit id
+of the nearest of 256 sub-codewords. A 768-d float32 embedding (3 KB)
+becomes m bytes.
+
+A query probes the nprobe lists whose centroids score highest and scores
+their codes by asymmetric distance computation (ADC): for unit vectors,
+q.x ~= q.c + sum_j q_j.codebook_j[code_j], so one (m, 256) lookup table per
+query turns every candidate into m table lookups. The best `rerank`
+candidates are then re-scored exactly against the embedding matrix (which
+may be the float16 embedding store, memory-mapped), so the returned
+similarities are exact.
+
+The index is trained offline (scripts/train_ivfpq_index.py) and saved with
+the index_snapshot helpers:
+
+    ivfpq.json             parameters, row count, data generation
+    ivfpq_centroids.npy    (nlist, 768) float32 coarse centroids
+    ivfpq_codebooks.npy    (m, 256, 768 / m) float32 PQ codebooks
+    ivfpq_offsets.npy      (nlist + 1,) start of every inverted list
+    ivfpq_codes.npy        (N, m) uint8 codes, grouped by inverted list
+    ivfpq_codes_ids.npy    moment_id of each code row
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from config import IVFPQ_INDEX_DIR, IVFPQ_NPROBE, IVFPQ_RERANK
+from db_utils import db_connection, fetch_data_generation
+from embedding_index import SCORE_BLOCK_ROWS, get_embedding_index, keyset_top_k, top_k_indices
+from index_snapshot import (
+    SNAPSHOT_VERSION, save_array, load_array, save_matrix, load_matrix, read_manifest, write_manifest
+)
+
+logger = logging.getLogger(__name__)
+
+IVFPQ_MANIFEST_FILE = 'ivfpq.json'
+
+# 8-bit codes: 256 codewords per sub-quantizer
+PQ_CODEBOOK_SIZE = 256
+
+
+def default_nlist(rows: int) -> int:
+    """Number of inverted lists for an index of the given size (about 4 * sqrt(N))."""
+    return max(1, min(rows, int(4 * math.sqrt(rows))))
+
+
+def nearest_centroids(data: np.ndarray, centroids: np.ndarray, block_rows: int = SCORE_BLOCK_ROWS) -> np.ndarray:
+    """Index of the nearest centroid (squared L2) of every row, computed block by block."""
+    # argmin |x - c|^2 == argmax x.c - |c|^2 / 2
+    half_norms = 0.5 * np.einsum('ij,ij->i', centroids, centroids)
+    labels = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), block_rows):
+        block = np.asarray(data[start:start + block_rows], dtype=np.float32)
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T - half_norms, axis=1)
+    return labels
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Lloyd's k-means on the rows of data.
+
+    Returns:
+        (min(k, len(data)), dim) float32 centroids
+    """
+    data = np.ascontiguousarray(data, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = nearest_centroids(data, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=data[:, j], minlength=k) for j in range(data.shape[1])], axis=1)
+        filled = counts > 0
+        centroids[filled] = (sums[filled] / counts[filled, None]).astype(np.float32)
+        # Re-seed empty clusters with random points
+        empty = np.flatnonzero(~filled)
+        if empty.size:
+            centroids[empty] = data[rng.choice(len(data), size=empty.size, replace=False)]
+    return centroids
+
+
+class IVFPQIndex:
+    """
+    Inverted-file index with product-quantized residuals over the moment embeddings.
+    """
+
+    def __init__(self, centroids: np.ndarray, codebooks: np.ndarray, offsets: np.ndarray,
+                 codes: np.ndarray, moment_ids: List[str], manifest: dict = None):
+        """
+        Args:
+            centroids: (nlist, dim) coarse centroids
+            codebooks: (m, 256, dim / m) PQ codebooks of the residuals
+            offsets: (nlist + 1,) start row of every inverted list in codes
+            codes: (N, m) uint8 PQ codes, grouped by inverted list
+            moment_ids: moment_id of each code row
+            manifest: Parameters and data generation of the saved index
+        """
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.codebooks = np.ascontiguousarray(codebooks, dtype=np.float32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.codes = codes
+        self.moment_ids = list(moment_ids)
+        self.manifest = manifest or {}
+        self.m = self.codebooks.shape[0]
+        self.dim = self.centroids.shape[1]
+        # Offset of each sub-quantizer's table in the flattened (m * 256) lookup table
+        self._lut_offsets = (np.arange(self.m) * self.codebooks.shape[1]).astype(np.intp)
+        # Exact re-ranking source, see attach_reranker
+        self.embeddings = None
+        self.rerank_rows = None
+        self.loaded_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.moment_ids)
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    # --- Training -------------------------------------------------------------------
+
+    @classmethod
+    def build(cls, moment_ids, embeddings: np.ndarray, nlist: int = None, m: int = 64,
+              train_size: int = 100000, iterations: int = 20, seed: int = 0,
+              generation=None) -> 'IVFPQIndex':
+        """
+        Train the quantizers on a sample of the embeddings and encode all of them.
+
+        Args:
+            moment_ids: moment_id of every embedding row
+            embeddings: (N, dim) L2-normalized embeddings (may be a memory map)
+            nlist: Number of inverted lists (default: default_nlist(N))
+            m: Number of PQ sub-quantizers (must divide dim); bytes per encoded vector
+            train_size: Rows sampled to train the quantizers
+            iterations: k-means iterations
+            seed: Random seed of the sample and the k-means initialization
+            generation: Data generation the embeddings were read at
+        """
+        rows, dim = embeddings.shape
+        if rows == 0:
+            raise ValueError("Cannot train an IVF-PQ index without embeddings")
+        if dim % m:
+            raise ValueError(f"m must divide the embedding dimension {dim}, got {m}")
+        nlist = min(nlist or default_nlist(rows), rows)
+        start = time.time()
+
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(rows, size=min(train_size, rows), replace=False))
+        training = np.asarray(embeddings[sample], dtype=np.float32)
+
+        centroids = kmeans(training, nlist, iterations=iterations, seed=seed)
+        nlist = len(centroids)
+        residuals = training - centroids[nearest_centroids(training, centroids)]
+        dsub = dim // m
+        codebooks = np.zeros((m, PQ_CODEBOOK_SIZE, dsub), dtype=np.float32)
+        for j in range(m):
+            trained = kmeans(residuals[:, j * dsub:(j + 1) * dsub], PQ_CODEBOOK_SIZE, iterations, seed + j + 1)
+            codebooks[j, :len(trained)] = trained
+        logger.info(f"Trained IVF-PQ quantizers (nlist={nlist}, m={m}) on {len(training)} rows "
+                    f"in {time.time() - start:.2f}s")
+
+        labels, codes = cls._encode(embeddings, centroids, codebooks)
+        order = np.argsort(labels, kind='stable')
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=nlist), out=offsets[1:])
+        moment_ids = list(moment_ids)
+        manifest = {
+            'version': SNAPSHOT_VERSION,
+            'data_generation': generation,
+            'created_at': time.time(),
+            'rows': rows,
+            'dim': dim,
+            'nlist': nlist,
+            'm': m,
+            'train_rows': len(training),
+        }
+        logger.info(f"Encoded {rows} embeddings into {nlist} inverted lists in {time.time() - start:.2f}s")
+        return cls(centroids, codebooks, offsets, codes[order], [moment_ids[i] for i in order], manifest)
+
+    @staticmethod
+    def _encode(embeddings: np.ndarray, centroids: np.ndarray, codebooks: np.ndarray,
+                block_rows: int = SCORE_BLOCK_ROWS):
+        """Inverted list and PQ code of every embedding row."""
+        m, _, dsub = codebooks.shape
+        labels = np.empty(len(embeddings), dtype=np.int64)
+        codes = np.empty((len(embeddings), m), dtype=np.uint8)
+        for start in range(0, len(embeddings), block_rows):
+            block = np.asarray(embeddings[start:start + block_rows], dtype=np.float32)
+            stop = start + len(block)
+            labels[start:stop] = nearest_centroids(block, centroids)
+            residuals = block - centroids[labels[start:stop]]
+            for j in range(m):
+                codes[start:stop, j] = nearest_centroids(residuals[:, j * dsub:(j + 1) * dsub], codebooks[j])
+        return labels, codes
+
+    # --- Persistence ----------------------------------------------------------------
+
+    def save(self, directory: str) -> dict:
+        """Write the index to directory; the manifest is written last."""
+        os.makedirs(directory, exist_ok=True)
+        save_array(directory, 'ivfpq_centroids', self.centroids)
+        save_array(directory, 'ivfpq_codebooks', self.codebooks)
+        save_array(directory, 'ivfpq_offsets', self.offsets)
+        save_matrix(directory, 'ivfpq_codes', self.moment_ids, self.codes)
+        write_manifest(directory, IVFPQ_MANIFEST_FILE, self.manifest)
+        return self.manifest
+
+    @classmethod
+    def load(cls, directory: str) -> 'IVFPQIndex':
+        """
+        Load a saved index; the codes are memory-mapped read-only.
+
+        Raises:
+            FileNotFoundError: if directory holds no complete index
+        """
+        start = time.time()
+        manifest = read_manifest(directory, IVFPQ_MANIFEST_FILE)
+        if manifest is None:
+            raise FileNotFoundError(f"No IVF-PQ index in {directory} (run scripts/train_ivfpq_index.py)")
+        moment_ids, codes = load_matrix(directory, 'ivfpq_codes')
+        index = cls(
+            load_array(directory, 'ivfpq_centroids'), load_array(directory, 'ivfpq_codebooks'),
+            load_array(directory, 'ivfpq_offsets'), codes, moment_ids, manifest
+        )
+        logger.info(f"Loaded IVF-PQ index ({len(index)} rows, nlist={index.nlist}, m={index.m}) "
+                    f"from {directory} in {time.time() - start:.2f}s")
+        return index
+
+    def attach_reranker(self, embedding_index):
+        """
+        Re-rank shortlists exactly against an EmbeddingIndex.
+
+        Moments missing from it (e.g. the index is older than the embeddings)
+        keep their approximate score.
+        """
+        if embedding_index.moment_ids == self.moment_ids:
+            rows = np.arange(len(self), dtype=np.int64)
+        else:
+            rows = np.fromiter((embedding_index.id_to_row.get(moment_id, -1) for moment_id in self.moment_ids),
+                               dtype=np.int64, count=len(self))
+        self.embeddings = embedding_index.embeddings
+        self.rerank_rows = rows
+
+    # --- Search ---------------------------------------------------------------------
+
+    def prepare_query(self, embedding) -> np.ndarray:
+        """Validate and L2-normalize a query embedding."""
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if query.shape[0] != self.dim:
+            raise ValueError(f"Embedding must have {self.dim} dimensions, got {query.shape[0]}")
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 1e-12 else query
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        ADC scores of every code in the nprobe best inverted lists.
+
+        Returns:
+            (code rows, approximate similarities)
+        """
+        coarse = self.centroids @ query
+        lists = top_k_indices(coarse, max(1, min(int(nprobe), self.nlist)))
+        # One lookup table per query: lut[j, c] = q_j . codebook_j[c]
+        lut = np.einsum('jcd,jd->jc', self.codebooks, query.reshape(self.m, -1)).reshape(-1)
+        rows = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists])
+        if rows.size == 0:
+            return rows, np.empty(0, dtype=np.float32)
+        bias = np.repeat(coarse[lists], np.diff(self.offsets)[lists])
+        codes = np.asarray(self.codes[rows], dtype=np.intp)
+        return rows, bias + lut[codes + self._lut_offsets].sum(axis=1)
+
+    def rerank(self, query: np.ndarray, rows: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        """Replace approximate scores of code rows by exact similarities where possible."""
+        if self.embeddings is None or rows.size == 0:
+            return scores
+        source = self.rerank_rows[rows]
+        known = np.flatnonzero(source >= 0)
+        # Read the matrix (often a memory map) in row order
+        order = known[np.argsort(source[known])]
+        exact = scores.copy()
+        exact[order] = np.asarray(self.embeddings[source[order]], dtype=np.float32) @ query
+        return exact
+
+    def search(self, embedding, threshold: float = 0.0, limit: int = 50, nprobe: int = IVFPQ_NPROBE,
+               rerank: int = IVFPQ_RERANK, after=None) -> Tuple[List[Tuple[str, float]], int]:
+        """
+        Find the moments most similar to the query embedding.
+
+        The `rerank` best ADC candidates of the probed lists (at least `limit`)
+        are re-scored exactly; threshold, ranking and the keyset cursor apply
+        to that shortlist, so pages past it come back empty.
+
+        Args:
+            embedding: Query embedding
+            threshold: Minimum cosine similarity
+            limit: Maximum number of results
+            nprobe: Number of inverted lists scanned
+            rerank: Shortlist size re-ranked exactly (0 = approximate scores only)
+            after: Optional (similarity, moment_id) cursor; only rows ranked after it are returned
+
+        Returns:
+            (list of (moment_id, similarity), number of shortlisted moments above threshold)
+        """
+        query = self.prepare_query(embedding)
+        rows, scores = self.candidates(query, nprobe)
+        if rerank > 0:
+            shortlist = top_k_indices(scores, max(rerank, limit))
+            rows = rows[shortlist]
+            scores = self.rerank(query, rows, scores[shortlist])
+        moment_ids = [self.moment_ids[row] for row in rows]
+        matching = scores >= threshold
+        best = keyset_top_k(scores, moment_ids, limit, after=after, mask=matching)
+        return [(moment_ids[i], float(scores[i])) for i in best], int(np.count_nonzero(matching))
+
+
+def ivfpq_index_is_current(index: IVFPQIndex) -> bool:
+    """Whether the index was trained at the current data generation (True if it cannot be read)."""
+    try:
+        with db_connection() as conn:
+            generation = fetch_data_generation(conn)
+    except Exception:
+        return True
+    return index.manifest.get('data_generation') == generation
+
+def load_ivfpq_index(directory: str = IVFPQ_INDEX_DIR, rerank: bool = IVFPQ_RERANK > 0) -> IVFPQIndex:
+    """Load the IVF-PQ index and attach the embedding index for exact re-ranking."""
+    index = IVFPQIndex.load(directory)
+    if not ivfpq_index_is_current(index):
+        logger.warning(
+            f"IVF-PQ index in {directory} is stale (data generation {index.manifest.get('data_generation')}); "
+            f"new moments are not searchable until scripts/train_ivfpq_index.py is re-run"
+        )
+    if rerank:
+        index.attach_reranker(get_embedding_index())
+    return index
+
+
+# Global IVF-PQ index instance
+ivfpq_index = None
+_ivfpq_index_lock = threading.Lock()
+
+def get_ivfpq_index() -> IVFPQIndex:
+    """
+    Get or load the global IVF-PQ index.
+
+    Returns:
+        IVFPQIndex instance
+    """
+    global ivfpq_index
+    if ivfpq_index is None:
+        with _ivfpq_index_lock:
+            if ivfpq_index is None:
+                ivfpq_index = load_ivfpq_index()
+    return ivfpq_index
+
+def ivfpq_index_loaded() -> bool:
+    """Whether the global IVF-PQ index has been loaded (it is only loaded once ivfpq mode is used)."""
+    return ivfpq_index is not None
+
+def reload_ivfpq_index() -> IVFPQIndex:
+    """Reload the global IVF-PQ index, e.g. after it was retrained."""
+    global ivfpq_index
+    index = load_ivfpq_index()
+    with _ivfpq_index_lock:
+        ivfpq_index = index
+    return index
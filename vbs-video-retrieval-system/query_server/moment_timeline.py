@@ -0,0 +1,124 @@
+"""
+Resident video_id / timestamp arrays aligned with the embedding index rows.
+
+The embedding matrix holds vectors only. MomentTimeline adds the video and
+timestamp of every row as NumPy arrays, so per-request filters (video,
+time range) become boolean masks over the rows instead of SQL round trips.
+Rows are normally in (video_id, timestamp_seconds) order already; `order`
+lists the known rows in that order regardless, so every video is one
+contiguous segment of `order` with ascending timestamps.
+"""
+
+import logging
+import threading
+import time
+from typing import List
+
+import numpy as np
+
+from db_utils import db_connection, fetch_moment_positions
+from embedding_index import get_embedding_index
+
+logger = logging.getLogger(__name__)
+
+
+class MomentTimeline:
+    """
+    Video and timestamp of every row of the embedding index.
+    """
+
+    def __init__(self, moment_ids: List[str], video_ids: List[str], timestamps):
+        """
+        Args:
+            moment_ids: Moment IDs, one per embedding row
+            video_ids: video_id of each row (None if unknown)
+            timestamps: timestamp_seconds of each row (None if unknown)
+        """
+        self.moment_ids = moment_ids
+        known = np.array([video_id is not None for video_id in video_ids], dtype=bool)
+        self.videos, codes = np.unique(np.array([video_id or '' for video_id in video_ids], dtype=str),
+                                       return_inverse=True)
+        self.videos = self.videos.tolist()
+        # Row -> index into self.videos, -1 if the moment is unknown
+        self.video_codes = np.where(known, codes, -1).astype(np.int64)
+        self.timestamps = np.array([np.nan if ts is None else ts for ts in timestamps], dtype=np.float64)
+        self._video_to_code = {video_id: code for code, video_id in enumerate(self.videos)}
+
+        # Known rows sorted by (video, timestamp)
+        order = np.lexsort((self.timestamps, self.video_codes))
+        self.order = order[self.video_codes[order] >= 0]
+        self.sorted_codes = self.video_codes[self.order]
+        self.sorted_times = self.timestamps[self.order]
+        # Start of every video's segment in self.order
+        boundaries = np.flatnonzero(self.sorted_codes[1:] != self.sorted_codes[:-1]) + 1
+        self.segment_starts = np.r_[0, boundaries] if len(self.order) else np.empty(0, dtype=np.int64)
+        # Ascending over the sorted positions: video first, then time. A video's keys
+        # lie in [code * key_span, (code + 1) * key_span)
+        times = self.sorted_times - self.sorted_times.min(initial=0.0)
+        self.key_span = times.max(initial=0.0) + 1.0
+        self.sorted_keys = self.sorted_codes * self.key_span + times
+        self.loaded_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.moment_ids)
+
+    @classmethod
+    def load(cls, moment_ids: List[str]) -> 'MomentTimeline':
+        """Load the positions of the given embedding rows from the database."""
+        start = time.time()
+        with db_connection() as conn:
+            rows = fetch_moment_positions(conn)
+        if [row[0] for row in rows] == moment_ids:
+            video_ids = [row[1] for row in rows]
+            timestamps = [row[2] for row in rows]
+        else:
+            # The embedding index was attached from an older snapshot or store
+            positions = {row[0]: row[1:] for row in rows}
+            video_ids = [positions.get(moment_id, (None, None))[0] for moment_id in moment_ids]
+            timestamps = [positions.get(moment_id, (None, None))[1] for moment_id in moment_ids]
+        timeline = cls(moment_ids, video_ids, timestamps)
+        logger.info(f"Loaded the timeline of {len(timeline)} moments in {time.time() - start:.2f}s")
+        return timeline
+
+    def filter_mask(self, video_id=None, start_time=None, end_time=None):
+        """
+        Rows of one video and/or within [start_time, end_time].
+
+        Returns:
+            Boolean array over the rows, or None if no filter is set
+        """
+        mask = None
+        if video_id is not None:
+            mask = self.video_codes == self._video_to_code.get(video_id, -2)
+        if start_time is not None or end_time is not None:
+            # NaN timestamps (unknown rows) fail both comparisons
+            in_range = np.ones(len(self), dtype=bool)
+            if start_time is not None:
+                in_range &= self.timestamps >= float(start_time)
+            if end_time is not None:
+                in_range &= self.timestamps <= float(end_time)
+            mask = in_range if mask is None else mask & in_range
+        return mask
+
+
+# Global timeline instance and the embedding index it is aligned with
+moment_timeline = None
+_timeline_index = None
+_moment_timeline_lock = threading.Lock()
+
+def get_moment_timeline() -> MomentTimeline:
+    """
+    Get or load the timeline of the current embedding index; it is reloaded
+    whenever the embedding index is.
+
+    Returns:
+        MomentTimeline instance
+    """
+    global moment_timeline, _timeline_index
+    index = get_embedding_index()
+    if _timeline_index is not index:
+        with _moment_timeline_lock:
+            if _timeline_index is not index:
+                moment_timeline = MomentTimeline.load(index.moment_ids)
+                _timeline_index = index
+    return moment_timeline
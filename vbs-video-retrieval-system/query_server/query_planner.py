@@ -0,0 +1,309 @@
+"""
+Cost-based query planner for /api/search/multimodal.
+
+Predicates are split into two kinds:
+
+  * SQL predicates (text, objects, words, time range, and the embedding in
+    pgvector mode) are index-backed in Postgres. Their selectivity is taken
+    from the Postgres planner via EXPLAIN, without executing anything.
+  * Kernel predicates (color, and the embedding in memory mode) are scored
+    exactly over the resident color / embedding matrices in one vectorized
+    pass, so their selectivity is known exactly.
+
+The cheaper side drives: either Postgres returns the (ids of) all moments
+matching the SQL predicates and the kernels score just those, or the kernel
+candidates are pushed into SQL as `moment_id = ANY(...)`. Scores of all
+active components are fused before the limit is applied, so the top-k is
+correct no matter how restrictive the color or embedding threshold is.
+
+A moment with no stored color (or embedding) has no score for that
+component, so it does not match a color (or embedding) filter on either
+plan. (The SQL-LIMIT version before the planner let such moments through.)
+"""
+
+import numpy as np
+from psycopg2.extras import RealDictCursor
+
+from color_index import get_color_index
+from db_utils import (
+    TEXT_RANK_SQL, TEXT_MATCH_SQL, to_pgvector_literal, set_ivfflat_probes, set_hnsw_ef_search, keyset_predicate
+)
+from embedding_index import get_embedding_index, keyset_top_k
+from utils_server import encode_cursor
+
+# Default weights used to fuse component scores into one score
+DEFAULT_FUSION_WEIGHTS = {'text': 1.0, 'color': 1.0, 'embedding': 1.0}
+
+
+class MultimodalQuery:
+    """
+    Plans and executes one multimodal search request.
+    """
+
+    def __init__(self, conn, tsquery=None, objects=None, words=None, start_time=None, end_time=None,
+                 color=None, color_threshold=50, embedding=None, sim_threshold=0.7,
+                 mode='memory', probes=10, ef_search=40, weights=None):
+        """
+        Args:
+            conn: Database connection
+            tsquery: to_tsquery() string for the text predicate (None = no text predicate)
+            objects: Object names that must all be detected
+            words: OCR word(s) that must be present
+            start_time, end_time: Timestamp range (both required to filter)
+            color, color_threshold: Query [R, G, B] and maximum weighted distance
+            embedding, sim_threshold: Query CLIP embedding and minimum cosine similarity
+            mode: 'memory' scores the embedding on the resident matrix, 'pgvector' in Postgres;
+                with a color filter the embedding is always scored on the resident matrix, since
+                Postgres would evaluate the distance of every SQL match without its vector index
+            probes, ef_search: pgvector index settings for pgvector mode
+            weights: Optional fusion weights per component ('text', 'color', 'embedding')
+        """
+        if mode not in ('memory', 'pgvector'):
+            raise ValueError(f"Unknown vector search mode: {mode}")
+        self.conn = conn
+        self.tsquery = tsquery or None
+        self.color = color
+        self.color_threshold = float(color_threshold)
+        self.embedding = embedding
+        self.sim_threshold = float(sim_threshold)
+        # The vector index only helps ORDER BY distance LIMIT k, i.e. when no kernel needs fusing
+        self.mode = 'memory' if color else mode
+        self.probes = probes
+        self.ef_search = ef_search
+        self.weights = dict(DEFAULT_FUSION_WEIGHTS, **(weights or {}))
+
+        # SQL predicates: name -> (clause, params)
+        self.sql_predicates = {}
+        if self.tsquery:
+            self.sql_predicates['text'] = (TEXT_MATCH_SQL, [self.tsquery])
+        if objects:
+            clauses = ["m.detected_object_names @> ARRAY[%s]"] * len(objects)
+            self.sql_predicates['objects'] = (" AND ".join(clauses), list(objects))
+        if words:
+            self.sql_predicates['words'] = ("m.extracted_search_words @> ARRAY[%s]", [words])
+        if start_time is not None and end_time is not None:
+            self.sql_predicates['time'] = ("m.timestamp_seconds BETWEEN %s AND %s", [start_time, end_time])
+        self.vector = None
+        if embedding and mode == 'pgvector':
+            self.vector = to_pgvector_literal(embedding)
+            self.sql_predicates['embedding'] = (
+                "(m.clip_embedding <=> %s::vector) <= %s", [self.vector, 1.0 - self.sim_threshold]
+            )
+
+        self.plan_info = {}
+
+    # --- Selectivity estimation -------------------------------------------------
+
+    def _sql_where(self, names):
+        clauses, params = [], []
+        for name in names:
+            clause, clause_params = self.sql_predicates[name]
+            clauses.append(f"({clause})")
+            params.extend(clause_params)
+        return " AND ".join(clauses), params
+
+    def _estimate_rows(self, names) -> int:
+        """Row estimate of the Postgres planner for the given SQL predicates."""
+        where, params = self._sql_where(names)
+        cursor = self.conn.cursor()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM video_moments m WHERE {where}", params)
+        plan = cursor.fetchone()[0]
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def _table_rows(self) -> int:
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = 'video_moments'")
+        row = cursor.fetchone()
+        return max(int(row[0]) if row else 0, 1)
+
+    def _kernel_candidates(self):
+        """
+        Evaluate the kernel predicates on the resident matrices.
+
+        Returns:
+            dict name -> (candidate moment_ids array, scores array), or {} if none
+        """
+        kernels = {}
+        if self.color:
+            index = get_color_index()
+            distances = index.distances(self.color)
+            rows = np.flatnonzero(distances <= self.color_threshold)
+            ids = np.asarray(index.moment_ids, dtype=object)[rows]
+            kernels['color'] = (ids, 1.0 - distances[rows] / 100.0)
+        if self.embedding and self.mode != 'pgvector':
+            index = get_embedding_index()
+            similarities = index.scores(self.embedding)
+            rows = np.flatnonzero(similarities >= self.sim_threshold)
+            ids = np.asarray(index.moment_ids, dtype=object)[rows]
+            kernels['embedding'] = (ids, similarities[rows].astype(np.float64))
+        return kernels
+
+    def plan(self):
+        """Estimate every predicate and choose which side drives the search."""
+        total_rows = self._table_rows()
+        estimates = {}
+        for name in self.sql_predicates:
+            estimates[name] = self._estimate_rows([name])
+        sql_estimate = self._estimate_rows(list(self.sql_predicates)) if self.sql_predicates else None
+
+        self.kernels = self._kernel_candidates()
+        kernel_ids = None
+        for name, (ids, _) in self.kernels.items():
+            estimates[name] = len(ids)
+            kernel_ids = ids if kernel_ids is None else np.intersect1d(kernel_ids, ids)
+        self.kernel_ids = kernel_ids
+
+        if not self.sql_predicates:
+            driver = 'kernels'
+        elif kernel_ids is None or sql_estimate <= len(kernel_ids):
+            driver = 'sql'
+        else:
+            driver = 'kernels'
+
+        self.plan_info = {
+            'driver': driver,
+            'table_rows': total_rows,
+            'estimated_rows': estimates,
+            'selectivity': {name: round(rows / total_rows, 6) for name, rows in estimates.items()},
+            'sql_predicates': list(self.sql_predicates),
+            'kernel_predicates': list(self.kernels),
+        }
+        if sql_estimate is not None:
+            self.plan_info['estimated_sql_rows'] = sql_estimate
+        if self.embedding:
+            self.plan_info['embedding_mode'] = self.mode
+        return self.plan_info
+
+    # --- Execution ----------------------------------------------------------------
+
+    def _count_sql(self) -> int:
+        """Number of moments matching all SQL predicates (the total of a sql-ordered plan)."""
+        where, params = self._sql_where(list(self.sql_predicates))
+        sql = "SELECT COUNT(*) FROM video_moments m" + (f" WHERE {where}" if where else "")
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        return int(cursor.fetchone()[0])
+
+    def _run_sql(self, candidate_ids=None, order_limit=None, keyset=None):
+        """
+        Fetch moment_ids (plus SQL-side scores) matching all SQL predicates.
+
+        Args:
+            candidate_ids: Optional moment_ids to restrict to (kernel-driven plans)
+            order_limit: Optional (ORDER BY clause, ORDER BY params, limit) for plans that need no fusion
+            keyset: Optional (SQL fragment, params) from keyset_predicate
+        """
+        cursor = self.conn.cursor(cursor_factory=RealDictCursor)
+        columns, params = ["m.moment_id"], []
+        if self.tsquery:
+            columns.append(f"{TEXT_RANK_SQL} AS text_rank")
+            params.append(self.tsquery)
+        if self.vector:
+            set_ivfflat_probes(cursor, self.probes)
+            set_hnsw_ef_search(cursor, self.ef_search)
+            columns.append("1 - (m.clip_embedding <=> %s::vector) AS similarity")
+            columns.append("m.clip_embedding <=> %s::vector AS distance")
+            params.extend([self.vector, self.vector])
+
+        where, where_params = self._sql_where(list(self.sql_predicates))
+        clauses = [where] if where else []
+        params.extend(where_params)
+        if candidate_ids is not None:
+            clauses.append("m.moment_id = ANY(%s)")
+            params.append(list(candidate_ids))
+
+        sql = f"SELECT {', '.join(columns)} FROM video_moments m"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if keyset and keyset[0]:
+            sql += (" WHERE TRUE" if not clauses else "") + keyset[0]
+            params.extend(keyset[1])
+        if order_limit:
+            order_by, order_params, limit = order_limit
+            sql += f" ORDER BY {order_by} LIMIT %s"
+            params.extend(order_params)
+            params.append(limit)
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+    def execute(self, limit: int, after=None):
+        """
+        Run the plan and return one page of the fused ranking.
+
+        Args:
+            limit: Page size
+            after: Optional (sort key, moment_id) keyset cursor of the previous page
+
+        Returns:
+            (list of (moment_id, score), total number of matching moments, cursor of the next page or None)
+        """
+        if not self.plan_info:
+            self.plan()
+
+        scoring = [name for name in ('text', 'color', 'embedding')
+                   if (name == 'text' and self.tsquery) or (name == 'color' and self.color) or
+                   (name == 'embedding' and self.embedding)]
+
+        # Only one SQL-side score (or none): Postgres can order and limit by itself
+        if not self.kernels and len(scoring) <= 1:
+            self.plan_info['driver'] = 'sql-ordered'
+            if self.vector:
+                distance_sql = "m.clip_embedding <=> %s::vector"
+                keyset = keyset_predicate(distance_sql, [self.vector], after, descending=False)
+                # moment_id breaks distance ties, so the LIMIT cuts the same rows the keyset continues from
+                rows = self._run_sql(order_limit=(f"{distance_sql}, m.moment_id", [self.vector], limit + 1), keyset=keyset)
+                sort_key, score_key = 'distance', 'similarity'
+            elif self.tsquery:
+                keyset = keyset_predicate(TEXT_RANK_SQL, [self.tsquery], after)
+                rows = self._run_sql(order_limit=("text_rank DESC, m.moment_id", [], limit + 1), keyset=keyset)
+                sort_key, score_key = 'text_rank', 'text_rank'
+            else:
+                # Nothing to score: page through matches in moment_id order
+                keyset = keyset_predicate("0", [], after, descending=False)
+                rows = self._run_sql(order_limit=("m.moment_id", [], limit + 1), keyset=keyset)
+                sort_key, score_key = None, None
+            page = rows[:limit]
+            next_cursor = None
+            if len(rows) > limit and page:
+                last = page[-1]
+                next_cursor = encode_cursor(float(last[sort_key]) if sort_key else 0.0, last['moment_id'])
+            matches = [(row['moment_id'], float(row[score_key]) if score_key else 0.0) for row in page]
+            # All matches, not the page size: the same total as the fused plans report
+            return matches, self._count_sql(), next_cursor
+
+        if self.plan_info['driver'] == 'sql':
+            rows = self._run_sql()
+        elif self.sql_predicates:
+            rows = self._run_sql(candidate_ids=self.kernel_ids)
+        else:
+            rows = [{'moment_id': moment_id} for moment_id in self.kernel_ids]
+
+        ids = np.asarray([row['moment_id'] for row in rows], dtype=object)
+        keep = np.ones(len(ids), dtype=bool)
+        components = {}
+        if self.tsquery:
+            components['text'] = np.asarray([row['text_rank'] for row in rows], dtype=np.float64)
+        if self.vector:
+            components['embedding'] = np.asarray([row['similarity'] for row in rows], dtype=np.float64)
+        for name, (kernel_ids, kernel_scores) in self.kernels.items():
+            lookup = dict(zip(kernel_ids, kernel_scores))
+            scores = np.asarray([lookup.get(moment_id, np.nan) for moment_id in ids], dtype=np.float64)
+            keep &= ~np.isnan(scores)
+            components[name] = scores
+
+        ids = ids[keep]
+        fused = np.zeros(len(ids), dtype=np.float64)
+        weight_sum = 0.0
+        for name, scores in components.items():
+            weight = float(self.weights.get(name, 1.0))
+            fused += weight * scores[keep]
+            weight_sum += weight
+        if weight_sum > 0:
+            fused /= weight_sum
+
+        best = keyset_top_k(fused, ids, limit + 1, after=after)
+        next_cursor = None
+        if len(best) > limit:
+            best = best[:limit]
+            next_cursor = encode_cursor(float(fused[best[-1]]), ids[best[-1]])
+        return [(ids[i], float(fused[i])) for i in best], int(len(ids)), next_cursor
@@ -0,0 +1,203 @@
+"""
+Search result cache for the query server.
+
+Responses of the search endpoints are cached under a normalized form of the
+request payload, so re-running a query (paging back, teammates repeating a
+search, re-ordered keywords) is answered without touching the database or
+the indexes. Entries expire after a TTL, the least recently used entries
+are evicted once the serialized responses exceed the memory budget, and the
+whole cache is dropped when the importers bump the data generation counter.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import (
+    RESULT_CACHE_MAX_MB, RESULT_CACHE_TTL_SECONDS, RESULT_CACHE_COLOR_QUANTUM, RESULT_CACHE_EMBEDDING_DECIMALS
+)
+from utils_server import extract_keywords_from_sentence
+
+logger = logging.getLogger(__name__)
+
+# Free-text fields that are matched as a bag of extracted keywords, per endpoint
+KEYWORD_TEXT_FIELDS = {'text': 'query', 'multimodal': 'text'}
+
+
+def round_color(color, quantum: int = RESULT_CACHE_COLOR_QUANTUM):
+    """Round an [R, G, B] color to a multiple of quantum."""
+    quantum = max(int(quantum), 1)
+    return [int(round(float(c) / quantum)) * quantum for c in color]
+
+
+def hash_embedding(embedding, decimals: int = RESULT_CACHE_EMBEDDING_DECIMALS) -> str:
+    """Hash an embedding after rounding, so tiny float differences map to the same key."""
+    array = np.round(np.asarray(embedding, dtype=np.float32), decimals)
+    return hashlib.sha1(array.tobytes()).hexdigest()
+
+
+def normalize_payload(endpoint: str, payload: dict) -> dict:
+    """
+    Normalize a search request so equivalent requests compare equal.
+
+    Keywords and objects are sorted, free-text queries are reduced to their
+    sorted keywords, colors are rounded and embeddings are hashed.
+    """
+    normalized = {}
+    for field, value in payload.items():
+        if value is None:
+            continue
+        if field in ('queries', 'steps') and isinstance(value, list):
+            # /api/search/batch and /api/search/sequence: every sub-query is normalized like a single search
+            normalized[field] = [normalize_payload(endpoint, query) if isinstance(query, dict) else query
+                                 for query in value]
+        elif field == 'embedding' and isinstance(value, list):
+            normalized[field] = hash_embedding(value)
+        elif field == 'color' and isinstance(value, list):
+            normalized[field] = round_color(value)
+        elif field == 'keywords' and isinstance(value, list):
+            normalized[field] = sorted(str(keyword).lower() for keyword in value)
+        elif field == 'objects' and isinstance(value, list):
+            normalized[field] = sorted(str(obj) for obj in value)
+        elif KEYWORD_TEXT_FIELDS.get(endpoint) == field and isinstance(value, str):
+            normalized[field] = sorted(extract_keywords_from_sentence(value))
+        elif endpoint in ('clip-text', 'batch', 'sequence') and field == 'query' and isinstance(value, str):
+            # CLIP's tokenizer lower-cases and collapses whitespace itself
+            normalized[field] = " ".join(value.lower().split())
+        else:
+            normalized[field] = value
+    return normalized
+
+
+def make_cache_key(endpoint: str, payload: dict) -> str:
+    """Cache key for a search request."""
+    normalized = json.dumps(normalize_payload(endpoint, payload), sort_keys=True, default=str)
+    return f"{endpoint}:{hashlib.sha1(normalized.encode('utf-8')).hexdigest()}"
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of search responses with a TTL and a byte budget.
+    """
+
+    def __init__(self, max_bytes: int = int(RESULT_CACHE_MAX_MB * 1024 * 1024),
+                 ttl_seconds: float = RESULT_CACHE_TTL_SECONDS):
+        """
+        Args:
+            max_bytes: Upper bound on the summed serialized size of cached responses
+            ttl_seconds: Lifetime of a cached response
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # Fed by the data generation watcher (data_generation.py)
+        self.generation = None
+
+        self._entries = OrderedDict()  # key -> (payload, size in bytes, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def apply_generation(self, generation):
+        """Record the current data generation, dropping every entry if it changed."""
+        with self._lock:
+            if generation != self.generation:
+                if self.generation is not None:
+                    self._entries.clear()
+                    self._bytes = 0
+                    self.invalidations += 1
+                    logger.info(f"Data generation changed to {generation}, result cache cleared")
+                self.generation = generation
+
+    def get(self, key: str):
+        """Return the cached payload for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            payload, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key: str, payload, size: int, generation=None):
+        """
+        Store a payload of the given serialized size.
+
+        Args:
+            generation: Data generation the payload was computed under; results
+                computed before an invalidation are not stored
+        """
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (payload, size, time.monotonic() + self.ttl_seconds)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size, for sizing the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'generation': self.generation,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+# Global result cache instance
+result_cache = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache() -> ResultCache:
+    """
+    Get or create the global result cache.
+
+    Returns:
+        ResultCache instance
+    """
+    global result_cache
+    if result_cache is None:
+        with _result_cache_lock:
+            if result_cache is None:
+                result_cache = ResultCache()
+    return result_cache
@@ -0,0 +1,228 @@
+"""
+Temporal sequence search for /api/search/sequence: "A, then B within N seconds".
+
+Every step (CLIP embedding or text, OCR text, objects, color) is scored over
+all moments of the timeline (moment_timeline.py) in one vectorized pass and
+scaled to [0, 1]. Chains are then found by dynamic programming over the
+moments in (video, timestamp) order: the best chain ending at a moment for
+step k is its own score plus the best chain for step k - 1 within the
+allowed gap before it in the same video. The allowed windows come from
+searchsorted on the sorted timeline, and their maxima from a sparse table
+(a vectorized sliding max), so the whole collection is chained with a few
+array passes per step instead of nested Python loops.
+"""
+
+from typing import List
+
+import numpy as np
+
+from color_index import get_color_index
+from db_utils import fetch_text_scores, fetch_object_moments
+from embedding_index import get_embedding_index, top_k_indices
+
+# Default maximum number of seconds between two consecutive steps
+DEFAULT_MAX_GAP_SECONDS = 60.0
+# Most steps one sequence query may have
+MAX_SEQUENCE_STEPS = 8
+
+
+def scaled(scores: np.ndarray, matching: np.ndarray) -> np.ndarray:
+    """Scores scaled to [0, 1] by the best matching score; non-matching rows are -inf."""
+    result = np.full(len(scores), -np.inf)
+    if matching.any():
+        best = scores[matching].max()
+        result[matching] = np.clip(scores[matching] / best, 0.0, 1.0) if best > 0 else 1.0
+    return result
+
+
+def rows_of(index, moment_ids) -> np.ndarray:
+    """Embedding index row of every moment_id (-1 for moments without an embedding)."""
+    return np.fromiter((index.id_to_row.get(moment_id, -1) for moment_id in moment_ids),
+                       dtype=np.int64, count=len(moment_ids))
+
+
+# (color index, embedding index, embedding row of every color row)
+_color_alignment = (None, None, None)
+
+def color_rows(color_index, index) -> np.ndarray:
+    """Embedding index row of every color index row, computed once per pair of indexes."""
+    global _color_alignment
+    if _color_alignment[0] is not color_index or _color_alignment[1] is not index:
+        _color_alignment = (color_index, index, rows_of(index, color_index.moment_ids))
+    return _color_alignment[2]
+
+
+def step_scores(conn, step: dict) -> np.ndarray:
+    """
+    Score one step over every row of the embedding index.
+
+    Args:
+        step: Dict with one of 'embedding' (with 'threshold'), 'tsquery',
+            'objects' or 'color' (with 'color_threshold')
+
+    Returns:
+        Scores in [0, 1] per row, -inf where the step does not match
+    """
+    index = get_embedding_index()
+    if step.get('embedding') is not None:
+        similarities = index.scores(step['embedding'])
+        return scaled(similarities, similarities >= step['threshold'])
+
+    scores = np.zeros(len(index))
+    matching = np.zeros(len(index), dtype=bool)
+    if step.get('tsquery'):
+        ranks = fetch_text_scores(conn, step['tsquery'])
+        rows = rows_of(index, [moment_id for moment_id, _ in ranks])
+        known = rows >= 0
+        scores[rows[known]] = np.array([rank for _, rank in ranks], dtype=np.float64)[known]
+        matching[rows[known]] = True
+    elif step.get('objects'):
+        rows = rows_of(index, fetch_object_moments(conn, step['objects']))
+        matching[rows[rows >= 0]] = True
+        scores[matching] = 1.0
+    elif step.get('color') is not None:
+        color_index = get_color_index()
+        distances = color_index.distances(step['color'])
+        rows = color_rows(color_index, index)
+        within = (distances <= step['color_threshold']) & (rows >= 0)
+        scores[rows[within]] = 1.0 - distances[within] / 100.0
+        matching[rows[within]] = True
+    else:
+        raise ValueError("Each step needs an 'embedding', 'query', 'text', 'objects' or 'color'")
+    return scaled(scores, matching)
+
+
+def range_argmax(values: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """
+    Position of the maximum of values[lo[i]:hi[i]] for every i (-1 for empty windows).
+
+    Uses a sparse table: level l holds the argmax of every window of length
+    2**l, and any window is covered by two (overlapping) power-of-two windows.
+    """
+    lengths = hi - lo
+    result = np.full(len(lo), -1, dtype=np.int64)
+    nonempty = np.flatnonzero(lengths > 0)
+    if nonempty.size == 0:
+        return result
+
+    levels = np.floor(np.log2(lengths[nonempty])).astype(np.int64)
+    table = [np.arange(len(values), dtype=np.int64)]
+    for level in range(1, int(levels.max()) + 1):
+        half = 1 << (level - 1)
+        previous = table[-1]
+        left, right = previous[:len(values) - 2 * half + 1], previous[half:half + len(values) - 2 * half + 1]
+        table.append(np.where(values[right] > values[left], right, left))
+
+    for level in np.unique(levels):
+        selected = nonempty[levels == level]
+        left = table[level][lo[selected]]
+        right = table[level][hi[selected] - (1 << int(level))]
+        result[selected] = np.where(values[right] > values[left], right, left)
+    return result
+
+
+def chain_scores(timeline, scores: List[np.ndarray], max_gaps, min_gaps):
+    """
+    Best chain score ending at every moment that matches the last step.
+
+    Only positions where a step matches take part in that step, so each step
+    costs two searchsorted calls and a range maximum over its matches.
+
+    Args:
+        timeline: MomentTimeline
+        scores: Per-step scores over the timeline rows (-inf = no match)
+        max_gaps, min_gaps: Seconds allowed between step k - 1 and step k (k >= 1)
+
+    Returns:
+        (sorted positions of the chain ends, their summed chain scores,
+         per step k >= 1 the positions of step k - 1 and the index into them
+         of the predecessor of every step k position)
+    """
+    keys, codes = timeline.sorted_keys, timeline.sorted_codes
+    first = scores[0][timeline.order]
+    positions = np.flatnonzero(np.isfinite(first))
+    best = first[positions]
+    back_pointers = []
+    for step in range(1, len(scores)):
+        current_scores = scores[step][timeline.order]
+        current = np.flatnonzero(np.isfinite(current_scores))
+        previous_keys = keys[positions]
+        # Predecessors lie within [t - max_gap, t - min_gap] and in the same video
+        lower = np.maximum(keys[current] - max_gaps[step - 1], codes[current] * timeline.key_span)
+        lo = np.searchsorted(previous_keys, lower, side='left')
+        min_gap = min_gaps[step - 1]
+        hi = np.searchsorted(previous_keys, keys[current] - min_gap, side='right' if min_gap > 0 else 'left')
+        previous = range_argmax(best, lo, np.maximum(hi, lo))
+        reachable = previous >= 0
+        current, previous = current[reachable], previous[reachable]
+        best = current_scores[current] + best[previous]
+        back_pointers.append((positions, previous))
+        positions = current
+    return positions, best, back_pointers
+
+
+def best_chains(timeline, positions: np.ndarray, best: np.ndarray, back_pointers, limit: int):
+    """
+    Best chain of every video, top videos first.
+
+    Returns:
+        (list of (video_id, summed score, timeline rows of the chain), number of videos with a chain)
+    """
+    if len(positions) == 0:
+        return [], 0
+    # Chain ends are in (video, time) order: reduce over each video's contiguous run
+    ends_codes = timeline.sorted_codes[positions]
+    starts = np.flatnonzero(np.r_[True, ends_codes[1:] != ends_codes[:-1]])
+    video_best = np.maximum.reduceat(best, starts)
+    run_of = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(best)]))
+    # First end of every run that reaches the run's best score
+    reaching = np.flatnonzero(best == video_best[run_of])
+    _, first = np.unique(run_of[reaching], return_index=True)
+    video_ends = reaching[first]
+
+    chains = []
+    for run in top_k_indices(video_best, limit):
+        index = video_ends[run]
+        chain = [positions[index]]
+        for previous_positions, previous in reversed(back_pointers):
+            index = previous[index]
+            chain.append(previous_positions[index])
+        rows = timeline.order[chain[::-1]]
+        chains.append((timeline.videos[ends_codes[video_ends[run]]], float(video_best[run]), rows))
+    return chains, len(starts)
+
+
+def search_sequence(conn, timeline, steps: List[dict], video_id=None, limit: int = 20):
+    """
+    Find the best ordered chains of moments matching the steps.
+
+    Args:
+        conn: Database connection (for OCR text and object steps)
+        timeline: MomentTimeline of the embedding index
+        steps: Step dicts for step_scores, plus 'max_gap' / 'min_gap' (seconds
+            before the step) on every step after the first
+        video_id: Optional video to search in
+        limit: Maximum number of videos
+
+    Returns:
+        (list of chains {'video_id', 'score', 'moments': [(moment_id, step score)]},
+         number of videos with a chain)
+    """
+    scores = [step_scores(conn, step) for step in steps]
+    if video_id is not None:
+        outside = ~timeline.filter_mask(video_id=video_id)
+        for step in scores:
+            step[outside] = -np.inf
+    max_gaps = [float(step.get('max_gap', DEFAULT_MAX_GAP_SECONDS)) for step in steps[1:]]
+    min_gaps = [float(step.get('min_gap', 0.0)) for step in steps[1:]]
+
+    positions, best, back_pointers = chain_scores(timeline, scores, max_gaps, min_gaps)
+    chains, total = best_chains(timeline, positions, best, back_pointers, limit)
+    return [
+        {
+            'video_id': chain_video,
+            'score': score / len(steps),
+            'moments': [(timeline.moment_ids[row], float(step[row])) for row, step in zip(rows, scores)],
+        }
+        for chain_video, score, rows in chains
+    ], total
@@ -0,0 +1,128 @@
+"""
+Production launcher for the query server.
+
+    python serve.py --workers 8            # gunicorn workers running the Flask app
+    python serve.py --workers 8 --asgi     # gunicorn + uvicorn workers running asgi_app
+    python serve.py --build-only           # refresh the snapshot only (then: kill -HUP <gunicorn pid>)
+
+The embedding and color indexes are loaded from Postgres once and written
+to a shared snapshot directory (index_snapshot.py, /dev/shm by default).
+The workers start with SHARED_INDEX_DIR pointing at it and memory-map the
+matrices read-only. N workers therefore share one copy of the matrices and
+start without loading anything from the database. The snapshot is rebuilt
+only when the importers have bumped the data generation since it was
+written (or with --rebuild).
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from config import SHARED_INDEX_DIR
+from db_utils import db_connection, fetch_data_generation
+from embedding_index import load_embedding_index
+from color_index import ColorIndex
+from index_snapshot import read_manifest, write_index_snapshot
+
+logger = logging.getLogger(__name__)
+
+# RAM-backed by default, so attaching never touches the disk
+DEFAULT_SNAPSHOT_DIR = (os.path.join('/dev/shm', 'vbs-index') if os.path.isdir('/dev/shm')
+                        else os.path.join(tempfile.gettempdir(), 'vbs-index'))
+
+
+def current_generation():
+    """Data generation of the database, or None if it cannot be read."""
+    try:
+        with db_connection() as conn:
+            return fetch_data_generation(conn)
+    except Exception as e:
+        logger.warning(f"Could not read data generation: {e}")
+        return None
+
+
+def ensure_snapshot(directory: str, rebuild: bool = False) -> dict:
+    """
+    Build the shared index snapshot unless an up-to-date one already exists.
+
+    Returns:
+        The manifest of the snapshot in directory
+    """
+    generation = current_generation()
+    manifest = read_manifest(directory)
+    if manifest and not rebuild:
+        if generation is None:
+            logger.warning(f"Using the existing index snapshot in {directory} without a freshness check")
+            return manifest
+        if manifest.get('data_generation') == generation:
+            logger.info(f"Index snapshot in {directory} is current (data generation {generation})")
+            return manifest
+
+    start = time.time()
+    # From the importers' embedding store when it is current, else from the database
+    embedding_index = load_embedding_index(shared=False)
+    color_index = ColorIndex.load()
+    manifest = write_index_snapshot(directory, embedding_index, color_index, generation)
+    logger.info(
+        f"Wrote index snapshot to {directory}: {len(embedding_index)} embeddings, "
+        f"{len(color_index)} colors, data generation {generation} ({time.time() - start:.2f}s)"
+    )
+    return manifest
+
+
+def gunicorn_command(args) -> list:
+    """gunicorn command line for the chosen serving mode."""
+    command = [
+        'gunicorn',
+        '--chdir', os.path.dirname(os.path.abspath(__file__)),
+        '--workers', str(args.workers),
+        '--bind', args.bind,
+        '--timeout', str(args.timeout),
+    ]
+    if args.asgi:
+        command += ['--worker-class', 'uvicorn.workers.UvicornWorker', 'asgi_app:app']
+    else:
+        command += ['--threads', str(args.threads), 'app:app']
+    return command
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Run the query server with N workers sharing one index snapshot")
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('QUERY_SERVER_WORKERS', os.cpu_count() or 2)),
+                        help="Number of worker processes (default: QUERY_SERVER_WORKERS or the CPU count)")
+    parser.add_argument('--threads', type=int, default=4, help="Threads per worker in WSGI mode")
+    parser.add_argument('--bind', default=os.environ.get('QUERY_SERVER_BIND', '0.0.0.0:5000'))
+    parser.add_argument('--timeout', type=int, default=120, help="gunicorn worker timeout in seconds")
+    parser.add_argument('--asgi', action='store_true', help="Serve asgi_app with uvicorn workers")
+    parser.add_argument('--index-dir', default=SHARED_INDEX_DIR or DEFAULT_SNAPSHOT_DIR,
+                        help="Snapshot directory (default: SHARED_INDEX_DIR or /dev/shm/vbs-index)")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild the snapshot even if it is current")
+    parser.add_argument('--build-only', action='store_true', help="Build the snapshot and exit")
+    args = parser.parse_args()
+
+    try:
+        ensure_snapshot(args.index_dir, rebuild=args.rebuild)
+    except Exception as e:
+        # Workers fall back to loading the indexes from the database themselves
+        logger.error(f"Could not build the index snapshot: {e}")
+        if args.build_only:
+            sys.exit(1)
+    if args.build_only:
+        return
+
+    if shutil.which('gunicorn') is None:
+        sys.exit("gunicorn is not installed (pip install gunicorn); it is required for multi-worker serving")
+
+    os.environ['SHARED_INDEX_DIR'] = args.index_dir
+    command = gunicorn_command(args)
+    logger.info(f"Starting {args.workers} workers: {' '.join(command)}")
+    os.execvp(command[0], command)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Connection pool (db_utils.ConnectionPool) with a fake connection factory.
+"""
+
+import threading
+import time
+
+import pytest
+
+import db_utils
+from db_utils import ConnectionPool, PoolTimeoutError
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            self.conn.closed = 2
+            raise db_utils.psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.conn.executed.append(sql)
+
+
+class FakeConnection:
+    """Just enough of a psycopg2 connection for the pool."""
+
+    def __init__(self, number):
+        self.number = number
+        self.closed = 0
+        self.broken = False
+        self.rollbacks = 0
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if self.broken:
+            self.closed = 2
+            raise db_utils.psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+class Factory:
+    def __init__(self):
+        self.created = []
+        self.fail = False
+
+    def __call__(self):
+        if self.fail:
+            raise db_utils.psycopg2.OperationalError("could not connect to server")
+        conn = FakeConnection(len(self.created))
+        self.created.append(conn)
+        return conn
+
+
+@pytest.fixture
+def factory(monkeypatch):
+    fake = Factory()
+    monkeypatch.setattr(db_utils, 'get_db_connection', fake)
+    return fake
+
+
+def make_pool(min_size=1, max_size=2, timeout=0.2, health_check_seconds=30):
+    return ConnectionPool(min_size=min_size, max_size=max_size, timeout=timeout,
+                          health_check_seconds=health_check_seconds)
+
+
+def test_min_size_connections_are_opened_up_front(factory):
+    pool = make_pool(min_size=2, max_size=5)
+    assert len(factory.created) == 2
+    assert pool.stats() == {'size': 2, 'idle': 2, 'in_use': 0, 'max_size': 5}
+    # min_size never exceeds max_size
+    assert make_pool(min_size=4, max_size=3).stats()['size'] == 3
+
+
+def test_checkout_and_return_reuse_connections(factory):
+    pool = make_pool(min_size=1, max_size=3)
+    first = pool.getconn()
+    second = pool.getconn()
+    assert first is not second
+    assert pool.stats() == {'size': 2, 'idle': 0, 'in_use': 2, 'max_size': 3}
+
+    pool.putconn(first)
+    assert first.rollbacks == 1
+    assert pool.stats()['idle'] == 1
+    # The most recently returned connection is handed out again; no new connection is opened
+    assert pool.getconn() is first
+    assert len(factory.created) == 2
+
+
+def test_checkout_times_out_when_exhausted(factory):
+    pool = make_pool(min_size=0, max_size=2, timeout=0.1)
+    pool.getconn()
+    pool.getconn()
+    start = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+    assert time.monotonic() - start >= 0.1
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn(timeout=0)
+    assert pool.stats()['size'] == 2
+
+
+def test_waiting_checkout_gets_a_returned_connection(factory):
+    pool = make_pool(min_size=0, max_size=1, timeout=5)
+    held = pool.getconn()
+    threading.Timer(0.05, pool.putconn, args=(held,)).start()
+    assert pool.getconn() is held
+
+
+def test_closed_connections_are_dropped_on_return(factory):
+    pool = make_pool(min_size=0, max_size=2)
+    conn = pool.getconn()
+    conn.close()
+    pool.putconn(conn)
+    assert pool.stats() == {'size': 0, 'idle': 0, 'in_use': 0, 'max_size': 2}
+    assert pool.getconn() is not conn
+
+
+def test_connections_failing_rollback_are_dropped_on_return(factory):
+    pool = make_pool(min_size=0, max_size=1, timeout=0.1)
+    conn = pool.getconn()
+    conn.broken = True
+    pool.putconn(conn)
+    assert pool.stats()['size'] == 0
+    # Its slot is free again: the next checkout opens a new connection instead of timing out
+    replacement = pool.getconn()
+    assert replacement is not conn and not replacement.closed
+
+
+def test_stale_idle_connections_are_health_checked(factory):
+    pool = make_pool(min_size=2, max_size=2, health_check_seconds=0)
+    healthy, dead = factory.created
+    dead.broken = True
+    # dead was returned last, so it is tried first and discarded after SELECT 1 fails
+    conn = pool.getconn()
+    assert conn is not dead and dead.closed
+    assert conn.executed == ['SELECT 1']
+    assert pool.stats() == {'size': 1, 'idle': 0, 'in_use': 1, 'max_size': 2}
+    assert healthy is conn
+
+
+def test_recently_used_connections_skip_the_health_check(factory):
+    pool = make_pool(min_size=1, max_size=1, health_check_seconds=30)
+    assert pool.getconn().executed == []
+
+
+def test_failed_connect_frees_its_slot(factory):
+    pool = make_pool(min_size=0, max_size=1, timeout=0.1)
+    factory.fail = True
+    with pytest.raises(db_utils.psycopg2.OperationalError):
+        pool.getconn()
+    assert pool.stats()['size'] == 0
+    factory.fail = False
+    assert pool.getconn() is factory.created[0]
+
+
+def test_closeall(factory):
+    pool = make_pool(min_size=1, max_size=2)
+    idle = factory.created[0]
+    held = pool.getconn()
+    held_too = pool.getconn()
+    pool.putconn(held)
+    pool.closeall()
+    assert idle.closed and held.closed
+    with pytest.raises(Exception, match="closed"):
+        pool.getconn()
+    # Connections checked out before closeall are closed when returned
+    pool.putconn(held_too)
+    assert held_too.closed
+    assert pool.stats()['size'] == 0
+
+
+def test_db_connection_returns_the_connection_on_errors(factory, monkeypatch):
+    pool = make_pool(min_size=0, max_size=1)
+    monkeypatch.setattr(db_utils, 'connection_pool', pool)
+    with pytest.raises(RuntimeError):
+        with db_utils.db_connection() as conn:
+            raise RuntimeError("query failed")
+    assert conn.rollbacks == 1
+    assert pool.stats() == {'size': 1, 'idle': 1, 'in_use': 0, 'max_size': 1}
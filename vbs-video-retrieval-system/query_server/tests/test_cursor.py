@@ -0,0 +1,70 @@
+"""
+Keyset pagination cursors (utils_server.encode_cursor / decode_cursor).
+"""
+
+import base64
+import json
+
+import pytest
+
+from utils_server import decode_cursor, encode_cursor
+
+
+def raw_cursor(payload) -> str:
+    """A cursor holding an arbitrary JSON payload, as a client could forge it."""
+    text = payload if isinstance(payload, str) else json.dumps(payload)
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+@pytest.mark.parametrize('key, moment_id', [
+    (0.8734512345678901, 'video_001_frame_000123'),
+    (0.0, 'a'),
+    (-1.5, 'ü/ñ?&=+'),
+    (12, 'v1_000'),
+    (1e-300, ''),
+])
+def test_round_trip(key, moment_id):
+    cursor = encode_cursor(key, moment_id)
+    assert decode_cursor(cursor) == (key, moment_id)
+    # URL-safe without padding, so it can be passed in a query string as is
+    assert all(c.isalnum() or c in '-_' for c in cursor)
+
+
+def test_round_trip_keeps_the_exact_float():
+    key = 0.1 + 0.2
+    decoded_key, _ = decode_cursor(encode_cursor(key, 'm'))
+    assert decoded_key == key and isinstance(decoded_key, float)
+
+
+@pytest.mark.parametrize('cursor', [None, ''])
+def test_no_cursor(cursor):
+    assert decode_cursor(cursor) is None
+
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor',
+    '!!!!',
+    'eyJrIjo',  # truncated
+    raw_cursor('not json'),
+    raw_cursor([0.5, 'm1']),
+    raw_cursor({'k': 0.5}),
+    raw_cursor({'id': 'm1'}),
+])
+def test_garbage_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize('payload', [
+    {'k': '0.5; DROP TABLE video_moments', 'id': 'm1'},
+    {'k': [0.5], 'id': 'm1'},
+    {'k': True, 'id': 'm1'},
+    {'k': None, 'id': 'm1'},
+    {'k': 0.5, 'id': 17},
+    {'k': 0.5, 'id': {'$gt': ''}},
+    '{"k": NaN, "id": "m1"}',
+    '{"k": Infinity, "id": "m1"}',
+])
+def test_tampered_cursors_are_rejected(payload):
+    with pytest.raises(ValueError):
+        decode_cursor(raw_cursor(payload))
@@ -0,0 +1,186 @@
+"""
+Exact vector search kernels (embedding_index.py) against brute force on small random data.
+
+Results are ranked by (similarity desc, moment_id asc); a keyset cursor
+taken from the last row of one page must resume exactly where the ranking
+of all rows continues.
+"""
+
+import numpy as np
+import pytest
+
+import embedding_index
+from embedding_index import EmbeddingIndex, keyset_top_k, normalize_rows, top_k_indices
+
+DIM = 8
+
+
+def brute_force(keys, moment_ids, k, after=None, mask=None, descending=True):
+    """Rows ranked by (key, moment_id) the slow way."""
+    rows = [row for row in range(len(keys)) if mask is None or mask[row]]
+    ranked = sorted(rows, key=lambda row: (-keys[row] if descending else keys[row], moment_ids[row]))
+    if after is not None:
+        boundary = (-after[0] if descending else after[0], after[1])
+        ranked = [row for row in ranked
+                  if (-keys[row] if descending else keys[row], moment_ids[row]) > boundary]
+    return ranked[:max(k, 0)]
+
+
+def random_ids(rng, count):
+    return [f"m{value:04d}" for value in rng.permutation(count * 10)[:count]]
+
+
+def all_pages(search, page_size):
+    """Follow the cursor of every page until one comes back short."""
+    pages, after = [], None
+    while True:
+        page = search(page_size, after)
+        pages.append(page)
+        if len(page) < page_size:
+            return pages
+        after = (page[-1][1], page[-1][0])
+
+
+# --- keyset_top_k ----------------------------------------------------------------
+
+@pytest.mark.parametrize('descending', [True, False])
+def test_keyset_top_k_matches_brute_force_with_ties(descending):
+    rng = np.random.default_rng(0)
+    # Few distinct keys: almost every row is tied with others
+    keys = rng.integers(0, 5, size=50).astype(np.float64)
+    moment_ids = random_ids(rng, 50)
+    mask = rng.random(50) < 0.8
+    for k in (0, 1, 7, 50, 80):
+        expected = brute_force(keys, moment_ids, k, mask=mask, descending=descending)
+        assert keyset_top_k(keys, moment_ids, k, mask=mask, descending=descending).tolist() == expected
+
+
+def test_keyset_top_k_pages_through_ties():
+    rng = np.random.default_rng(1)
+    keys = rng.integers(0, 3, size=40).astype(np.float64)
+    moment_ids = random_ids(rng, 40)
+
+    seen, after = [], None
+    while True:
+        page = keyset_top_k(keys, moment_ids, 6, after=after).tolist()
+        seen.extend(page)
+        if len(page) < 6:
+            break
+        after = (keys[page[-1]], moment_ids[page[-1]])
+    assert seen == brute_force(keys, moment_ids, 40)
+
+
+def test_keyset_top_k_cursor_after_a_tied_row():
+    keys = np.array([0.5, 0.9, 0.5, 0.5, 0.1])
+    moment_ids = ['d', 'z', 'b', 'c', 'a']
+    # 0.9 'z', then the 0.5 tie in moment_id order b, c, d, then 0.1 'a'
+    assert keyset_top_k(keys, moment_ids, 2, after=(0.5, 'b')).tolist() == [3, 0]
+    assert keyset_top_k(keys, moment_ids, 10, after=(0.5, 'd')).tolist() == [4]
+    assert keyset_top_k(keys, moment_ids, 10, after=(0.1, 'a')).tolist() == []
+
+
+def test_keyset_top_k_empty_input():
+    assert keyset_top_k(np.empty(0), [], 5).tolist() == []
+    assert keyset_top_k(np.empty(0), [], 5, after=(0.5, 'a')).tolist() == []
+
+
+def test_top_k_indices_keeps_row_order_for_ties():
+    scores = np.array([0.2, 0.7, 0.7, 0.1, 0.7])
+    assert top_k_indices(scores, 2).tolist() == [1, 2]
+    assert top_k_indices(scores, 10).tolist() == [1, 2, 4, 0, 3]
+    assert top_k_indices(scores, 0).tolist() == []
+    assert top_k_indices(np.empty(0), 3).tolist() == []
+
+
+# --- EmbeddingIndex --------------------------------------------------------------
+
+@pytest.fixture
+def index():
+    rng = np.random.default_rng(2)
+    return EmbeddingIndex(random_ids(rng, 40), rng.normal(size=(40, DIM)).astype(np.float32))
+
+
+@pytest.fixture
+def tied_index():
+    # One-hot rows: a similarity is a single query component, exact in any BLAS
+    # kernel, so every row sharing an axis ties exactly on every query
+    rng = np.random.default_rng(6)
+    axes = rng.integers(0, 4, size=40)
+    return EmbeddingIndex(random_ids(rng, 40), np.eye(DIM, dtype=np.float32)[axes])
+
+
+def expected_search(index, query, threshold, limit):
+    scores = normalize_rows(index.embeddings) @ (query / np.linalg.norm(query))
+    matching = scores >= threshold
+    rows = brute_force(scores, index.moment_ids, limit, mask=matching)
+    return [index.moment_ids[row] for row in rows], int(np.count_nonzero(matching))
+
+
+def test_search_matches_brute_force(index):
+    rng = np.random.default_rng(3)
+    for threshold, limit in ((-1.0, 5), (0.2, 10), (0.0, 100), (0.99, 3)):
+        query = rng.normal(size=DIM)
+        results, total = index.search(query, threshold=threshold, limit=limit)
+        assert ([moment_id for moment_id, _ in results], total) == expected_search(index, query, threshold, limit)
+
+
+def test_search_pages_through_tied_rows(tied_index):
+    query = np.array([0.1, 0.7, 0.7, 0.2, 0, 0, 0, 0])
+    pages = all_pages(
+        lambda limit, after: tied_index.search(query, threshold=-1.0, limit=limit, after=after)[0], 4
+    )
+    assert [moment_id for page in pages for moment_id, _ in page] == expected_search(tied_index, query, -1.0, 40)[0]
+    # The first page boundary falls inside the tie of the two top axes
+    assert pages[1][0][1] == pages[0][-1][1]
+
+
+def test_search_on_an_empty_index():
+    index = EmbeddingIndex([], np.empty((0, DIM), dtype=np.float32))
+    assert index.search(np.ones(DIM), limit=5) == ([], 0)
+
+
+def test_search_rejects_wrong_dimension(index):
+    with pytest.raises(ValueError):
+        index.search(np.ones(DIM + 1))
+
+
+@pytest.mark.parametrize('block_rows', [7, 16384])
+def test_search_batch_matches_brute_force(index, monkeypatch, block_rows):
+    monkeypatch.setattr(embedding_index, 'SCORE_BLOCK_ROWS', block_rows)
+    rng = np.random.default_rng(4)
+    queries = [rng.normal(size=DIM) for _ in range(4)]
+    thresholds = [-1.0, 0.1, 0.5, 2.0]
+    limits = [4, 10, 100, 5]
+    masks = [None, rng.random(len(index)) < 0.5, None, None]
+
+    results = index.search_batch(queries, thresholds, limits, masks)
+    for query, threshold, limit, mask, (matches, total) in zip(queries, thresholds, limits, masks, results):
+        scores = normalize_rows(index.embeddings) @ (query / np.linalg.norm(query))
+        matching = scores >= threshold
+        if mask is not None:
+            matching &= mask
+        rows = brute_force(scores, index.moment_ids, limit, mask=matching)
+        assert [moment_id for moment_id, _ in matches] == [index.moment_ids[row] for row in rows]
+        assert total == int(np.count_nonzero(matching))
+
+
+def test_search_batch_breaks_ties_across_blocks(tied_index, monkeypatch):
+    # Every block holds several rows of the top axis; the limit ends inside that tie
+    monkeypatch.setattr(embedding_index, 'SCORE_BLOCK_ROWS', 7)
+    queries = [np.eye(DIM)[axis] for axis in range(4)] + [np.array([0.1, 0.7, 0.7, 0.2, 0, 0, 0, 0])]
+    for limit in (1, 2, 4, 11):
+        results = tied_index.search_batch(queries, [-1.0] * len(queries), [limit] * len(queries))
+        for query, (matches, total) in zip(queries, results):
+            assert [moment_id for moment_id, _ in matches] == expected_search(tied_index, query, -1.0, limit)[0]
+            assert total == len(tied_index)
+
+
+def test_search_batch_on_an_empty_index():
+    index = EmbeddingIndex([], np.empty((0, DIM), dtype=np.float32))
+    assert index.search_batch([np.ones(DIM), np.ones(DIM)], [0.0, 0.0], [3, 3]) == [([], 0), ([], 0)]
+
+
+def test_float16_rows_score_like_float32(index):
+    half = EmbeddingIndex(index.moment_ids, index.embeddings.astype(np.float16), normalized=True)
+    query = np.random.default_rng(5).normal(size=DIM)
+    np.testing.assert_allclose(half.scores(query), index.scores(query), atol=2e-3)
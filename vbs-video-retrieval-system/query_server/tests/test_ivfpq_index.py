@@ -0,0 +1,136 @@
+"""
+IVF-PQ index (ivfpq_index.py) against brute force on small random data.
+
+With every list probed and a shortlist covering all rows, re-ranked search
+must return exactly what an exhaustive cosine scan returns; the ADC scores
+must equal the dot product with each row's reconstruction.
+"""
+
+import numpy as np
+import pytest
+
+from embedding_index import EmbeddingIndex, normalize_rows
+from ivfpq_index import IVFPQIndex, default_nlist
+
+DIM = 16
+ROWS = 60
+
+
+def brute_force(embeddings, moment_ids, query, threshold, limit, after=None):
+    """Exhaustive cosine ranking by (similarity desc, moment_id asc)."""
+    scores = normalize_rows(np.asarray(embeddings, dtype=np.float32)) @ (query / np.linalg.norm(query))
+    ranked = sorted((-float(score), moment_id) for score, moment_id in zip(scores, moment_ids)
+                    if score >= threshold)
+    if after is not None:
+        ranked = [row for row in ranked if row > (-after[0], after[1])]
+    return [moment_id for _, moment_id in ranked[:limit]], int(np.count_nonzero(scores >= threshold))
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(7)
+    embeddings = normalize_rows(rng.normal(size=(ROWS, DIM)).astype(np.float32))
+    # Row ids deliberately not in row order, so the tie-break cannot follow the row index
+    moment_ids = [f"m{(ROWS - row) * 7 % 101:03d}" for row in range(ROWS)]
+    return moment_ids, embeddings
+
+
+def build(moment_ids, embeddings, nlist=4, reranked=True):
+    index = IVFPQIndex.build(moment_ids, embeddings, nlist=nlist, m=4, iterations=5)
+    if reranked:
+        index.attach_reranker(EmbeddingIndex(moment_ids, embeddings))
+    return index
+
+
+def test_adc_scores_match_reconstruction(data):
+    moment_ids, embeddings = data
+    index = build(moment_ids, embeddings, reranked=False)
+    query = index.prepare_query(np.random.default_rng(1).normal(size=DIM))
+
+    rows, scores = index.candidates(query, nprobe=index.nlist)
+    assert sorted(rows.tolist()) == list(range(ROWS))
+
+    list_of_row = np.repeat(np.arange(index.nlist), np.diff(index.offsets))
+    for row, score in zip(rows, scores):
+        residual = np.concatenate([index.codebooks[j, index.codes[row, j]] for j in range(index.m)])
+        reconstruction = index.centroids[list_of_row[row]] + residual
+        assert score == pytest.approx(float(reconstruction @ query), abs=1e-5)
+
+
+def test_candidates_cover_only_probed_lists(data):
+    moment_ids, embeddings = data
+    index = build(moment_ids, embeddings, reranked=False)
+    query = index.prepare_query(embeddings[3])
+
+    rows, _ = index.candidates(query, nprobe=2)
+    probed = np.argsort(-(index.centroids @ query), kind='stable')[:2]
+    expected = np.concatenate([np.arange(index.offsets[i], index.offsets[i + 1]) for i in probed])
+    assert sorted(rows.tolist()) == sorted(expected.tolist())
+
+
+def test_full_probe_with_rerank_equals_brute_force(data):
+    moment_ids, embeddings = data
+    index = build(moment_ids, embeddings)
+    rng = np.random.default_rng(2)
+    for _ in range(5):
+        query = rng.normal(size=DIM)
+        results, total = index.search(query, threshold=0.1, limit=10, nprobe=index.nlist, rerank=ROWS)
+        expected, expected_total = brute_force(embeddings, moment_ids, query, 0.1, 10)
+        assert [moment_id for moment_id, _ in results] == expected
+        assert total == expected_total
+
+
+def test_limit_above_row_count_returns_every_row(data):
+    moment_ids, embeddings = data
+    index = build(moment_ids, embeddings)
+    query = embeddings[0]
+
+    results, total = index.search(query, threshold=-1.0, limit=ROWS + 10, nprobe=index.nlist, rerank=ROWS)
+    assert [moment_id for moment_id, _ in results] == brute_force(embeddings, moment_ids, query, -1.0, ROWS)[0]
+    assert total == ROWS
+
+
+def test_ties_are_broken_by_moment_id_across_pages():
+    # Five identical rows tie on every query; the page boundary falls inside the tie
+    rng = np.random.default_rng(3)
+    embeddings = normalize_rows(rng.normal(size=(20, DIM)).astype(np.float32))
+    embeddings[5:10] = embeddings[0]
+    moment_ids = [f"m{row:02d}" for row in range(20)][::-1]
+    index = build(moment_ids, embeddings, nlist=2)
+    query = embeddings[0]
+
+    first, _ = index.search(query, threshold=-1.0, limit=3, nprobe=index.nlist, rerank=20)
+    last_id, last_score = first[-1]
+    second, _ = index.search(query, threshold=-1.0, limit=3, nprobe=index.nlist, rerank=20,
+                             after=(last_score, last_id))
+
+    expected = brute_force(embeddings, moment_ids, query, -1.0, 6)[0]
+    assert [moment_id for moment_id, _ in first + second] == expected
+    tied = sorted(moment_ids[row] for row in [0, 5, 6, 7, 8, 9])
+    assert [moment_id for moment_id, _ in first + second] == tied
+
+
+def test_search_without_reranker_returns_adc_scores(data):
+    moment_ids, embeddings = data
+    index = build(moment_ids, embeddings, reranked=False)
+    query = index.prepare_query(embeddings[10])
+
+    rows, scores = index.candidates(query, nprobe=index.nlist)
+    adc = {index.moment_ids[row]: float(score) for row, score in zip(rows, scores)}
+    results, _ = index.search(query, threshold=-1.0, limit=5, nprobe=index.nlist, rerank=0)
+    for moment_id, score in results:
+        assert score == pytest.approx(adc[moment_id])
+    assert [score for _, score in results] == sorted(adc.values(), reverse=True)[:5]
+
+
+def test_build_rejects_empty_input_and_bad_m():
+    with pytest.raises(ValueError):
+        IVFPQIndex.build([], np.empty((0, DIM), dtype=np.float32), m=4)
+    with pytest.raises(ValueError):
+        IVFPQIndex.build(['a'], np.ones((1, DIM), dtype=np.float32), m=5)
+
+
+def test_default_nlist_is_bounded_by_rows():
+    assert default_nlist(1) == 1
+    assert default_nlist(3) == 3
+    assert default_nlist(10000) == 400
@@ -0,0 +1,227 @@
+"""
+Result cache (result_cache.py) and data generation watcher (data_generation.py).
+
+Pure unit tests: time.monotonic is replaced by a fake clock and the data
+generation is read from a plain callable instead of the database.
+"""
+
+import time
+
+import pytest
+
+from data_generation import DataGenerationWatcher
+from result_cache import ResultCache, make_cache_key, normalize_payload
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(time, 'monotonic', fake)
+    return fake
+
+
+# --- normalize_payload / make_cache_key ------------------------------------------
+
+def test_equivalent_requests_share_a_key():
+    first = {'keywords': ['Exit', 'sign'], 'objects': ['person', 'car'], 'limit': 20, 'cursor': None}
+    second = {'objects': ['car', 'person'], 'limit': 20, 'keywords': ['sign', 'exit']}
+    assert normalize_payload('keywords', first) == normalize_payload('keywords', second)
+    assert make_cache_key('keywords', first) == make_cache_key('keywords', second)
+    # The endpoint is part of the key
+    assert make_cache_key('keywords', first) != make_cache_key('objects', first)
+
+
+def test_free_text_is_reduced_to_sorted_keywords():
+    assert normalize_payload('text', {'query': 'The red car, and a Dog!'}) == {'query': ['car', 'dog', 'red']}
+    assert normalize_payload('multimodal', {'text': 'dog car'}) == normalize_payload('multimodal', {'text': 'Car  dog'})
+    # Other endpoints keep the query field as is
+    assert normalize_payload('vector', {'query': 'The dog'}) == {'query': 'The dog'}
+
+
+def test_clip_text_queries_ignore_case_and_whitespace():
+    assert normalize_payload('clip-text', {'query': '  A  Red\tCar '}) == {'query': 'a red car'}
+
+
+def test_colors_are_rounded_and_embeddings_hashed():
+    assert normalize_payload('color', {'color': [10.4, 200.6, 0]}) == {'color': [10, 201, 0]}
+    embedding = [0.1, 0.2, 0.3]
+    nearly_equal = [0.10000001, 0.2, 0.30000002]
+    assert normalize_payload('vector', {'embedding': embedding}) == normalize_payload('vector', {'embedding': nearly_equal})
+    assert normalize_payload('vector', {'embedding': embedding}) != normalize_payload('vector', {'embedding': [0.1, 0.2, 0.4]})
+
+
+def test_sub_queries_are_normalized_like_single_searches():
+    first = {'queries': [{'query': 'Red  car', 'embedding': None}, {'color': [1.2, 2, 3]}]}
+    second = {'queries': [{'query': 'red car'}, {'color': [1, 2, 3]}]}
+    assert normalize_payload('batch', first) == normalize_payload('batch', second)
+    steps = {'steps': [{'objects': ['b', 'a']}, {'keywords': ['B', 'a']}]}
+    assert normalize_payload('sequence', steps) == {'steps': [{'objects': ['a', 'b']}, {'keywords': ['a', 'b']}]}
+
+
+# --- ResultCache -----------------------------------------------------------------
+
+def test_get_returns_what_put_stored(clock):
+    cache = ResultCache(max_bytes=100, ttl_seconds=60)
+    assert cache.get('a') is None
+    cache.put('a', {'results': [1]}, 10)
+    assert cache.get('a') == {'results': [1]}
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries'], stats['bytes']) == (1, 1, 1, 10)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResultCache(max_bytes=100, ttl_seconds=60)
+    cache.put('a', 'payload', 10)
+    clock.advance(59.9)
+    assert cache.get('a') == 'payload'
+    clock.advance(0.1)
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert (stats['expirations'], stats['entries'], stats['bytes']) == (1, 0, 0)
+
+
+def test_least_recently_used_entries_are_evicted_by_size(clock):
+    cache = ResultCache(max_bytes=30, ttl_seconds=60)
+    cache.put('a', 'A', 10)
+    cache.put('b', 'B', 10)
+    cache.put('c', 'C', 10)
+    # Reading 'a' makes 'b' the least recently used entry
+    assert cache.get('a') == 'A'
+    cache.put('d', 'D', 15)
+    assert cache.get('b') is None and cache.get('c') is None
+    assert cache.get('a') == 'A' and cache.get('d') == 'D'
+    assert cache.stats()['bytes'] == 25
+    assert cache.stats()['evictions'] == 2
+
+
+def test_replacing_an_entry_and_oversized_payloads(clock):
+    cache = ResultCache(max_bytes=30, ttl_seconds=60)
+    cache.put('a', 'old', 20)
+    cache.put('a', 'new', 5)
+    assert cache.get('a') == 'new'
+    assert cache.stats()['bytes'] == 5
+    # Larger than the whole budget: not stored, nothing evicted
+    cache.put('huge', 'x', 31)
+    assert cache.get('huge') is None
+    assert cache.get('a') == 'new'
+
+
+def test_apply_generation_clears_only_on_change(clock):
+    cache = ResultCache(max_bytes=100, ttl_seconds=60)
+    cache.put('a', 'A', 10)
+    # The first generation read does not invalidate anything
+    cache.apply_generation(3)
+    assert cache.get('a') == 'A'
+    cache.apply_generation(3)
+    assert cache.get('a') == 'A'
+    cache.apply_generation(4)
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert (stats['generation'], stats['invalidations'], stats['bytes']) == (4, 1, 0)
+
+
+def test_results_computed_under_an_older_generation_are_not_stored(clock):
+    cache = ResultCache(max_bytes=100, ttl_seconds=60)
+    cache.apply_generation(4)
+    cache.put('stale', 'S', 10, generation=3)
+    cache.put('fresh', 'F', 10, generation=4)
+    assert cache.get('stale') is None
+    assert cache.get('fresh') == 'F'
+
+
+# --- DataGenerationWatcher -------------------------------------------------------
+
+class Generations:
+    """Loader returning a settable generation and counting reads."""
+
+    def __init__(self, generation=1):
+        self.generation = generation
+        self.reads = 0
+
+    def __call__(self):
+        self.reads += 1
+        if isinstance(self.generation, Exception):
+            raise self.generation
+        return self.generation
+
+
+def test_listeners_are_called_on_every_change(clock):
+    loader = Generations(1)
+    watcher = DataGenerationWatcher(check_seconds=5, loader=loader)
+    calls = []
+    watcher.add_listener(lambda generation, previous: calls.append((generation, previous)))
+
+    watcher.check()
+    assert calls == [(1, None)]
+    loader.generation = 2
+    clock.advance(5)
+    watcher.check()
+    clock.advance(5)
+    watcher.check()
+    assert calls == [(1, None), (2, 1)]
+    assert watcher.generation == 2
+
+
+def test_check_is_rate_limited(clock):
+    loader = Generations(1)
+    watcher = DataGenerationWatcher(check_seconds=5, loader=loader)
+    watcher.check()
+    clock.advance(4.9)
+    watcher.check()
+    assert loader.reads == 1
+    clock.advance(0.1)
+    watcher.check()
+    assert loader.reads == 2
+
+
+def test_check_does_nothing_when_polled_elsewhere(clock):
+    loader = Generations(1)
+    watcher = DataGenerationWatcher(check_seconds=0, loader=loader)
+    watcher.polling = False
+    watcher.check()
+    assert loader.reads == 0 and watcher.generation is None
+    watcher.apply(7)
+    assert watcher.generation == 7
+
+
+def test_failures_do_not_break_the_watcher(clock):
+    loader = Generations(RuntimeError("database is down"))
+    watcher = DataGenerationWatcher(check_seconds=0, loader=loader)
+    calls = []
+    watcher.add_listener(lambda generation, previous: 1 / 0)
+    watcher.add_listener(lambda generation, previous: calls.append(generation))
+
+    watcher.check()
+    assert watcher.generation is None and calls == []
+    loader.generation = 5
+    watcher.check()
+    # A failing listener does not keep the others from running
+    assert watcher.generation == 5 and calls == [5]
+
+
+def test_watcher_feeds_the_result_cache(clock):
+    loader = Generations(1)
+    watcher = DataGenerationWatcher(check_seconds=0, loader=loader)
+    cache = ResultCache(max_bytes=100, ttl_seconds=60)
+    watcher.add_listener(lambda generation, previous: cache.apply_generation(generation))
+
+    watcher.check()
+    cache.put('a', 'A', 10, generation=watcher.generation)
+    watcher.check()
+    assert cache.get('a') == 'A'
+    loader.generation = 2
+    watcher.check()
+    assert cache.get('a') is None
+    assert cache.stats()['generation'] == 2
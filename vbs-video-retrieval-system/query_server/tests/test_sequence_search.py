@@ -0,0 +1,190 @@
+"""
+Temporal sequence search (sequence_search.py) against brute force on small random data.
+
+The reference enumerates every ordered tuple of moments per video and keeps
+the best one whose gaps are allowed, which is what the dynamic program over
+searchsorted windows and the sparse-table range maximum must reproduce.
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+import sequence_search
+from embedding_index import EmbeddingIndex
+from moment_timeline import MomentTimeline
+from sequence_search import best_chains, chain_scores, range_argmax, scaled, search_sequence
+
+DIM = 8
+
+
+def random_timeline(rng, videos=4, rows=36, unknown=3):
+    """Timeline with shuffled rows, integer timestamps and a few unknown moments."""
+    moment_ids = [f"m{row:03d}" for row in range(rows)]
+    video_ids = [f"v{value}" for value in rng.integers(0, videos, size=rows)]
+    timestamps = rng.integers(0, 40, size=rows).astype(float).tolist()
+    for row in rng.choice(rows, size=unknown, replace=False):
+        video_ids[row], timestamps[row] = None, None
+    return MomentTimeline(moment_ids, video_ids, timestamps)
+
+
+def random_scores(rng, rows, steps, density=0.4, levels=None):
+    """Per-step scores, -inf where a step does not match; levels > 0 forces ties."""
+    scores = []
+    for _ in range(steps):
+        values = rng.integers(1, levels + 1, size=rows) / levels if levels else rng.random(rows)
+        scores.append(np.where(rng.random(rows) < density, values, -np.inf))
+    return scores
+
+
+def allowed(previous_time, time, max_gap, min_gap):
+    if min_gap > 0:
+        return time - max_gap <= previous_time <= time - min_gap
+    return time - max_gap <= previous_time < time
+
+
+def brute_force(timeline, scores, max_gaps, min_gaps):
+    """Best chain score of every video with a chain, by enumeration."""
+    best = {}
+    for code, video_id in enumerate(timeline.videos):
+        rows = [row for row in range(len(timeline)) if timeline.video_codes[row] == code]
+        candidates = [[row for row in rows if np.isfinite(step[row])] for step in scores]
+        for chain in itertools.product(*candidates):
+            times = timeline.timestamps[list(chain)]
+            if all(allowed(times[k - 1], times[k], max_gaps[k - 1], min_gaps[k - 1]) for k in range(1, len(chain))):
+                total = sum(step[row] for step, row in zip(scores, chain))
+                best[video_id] = max(best.get(video_id, -np.inf), total)
+    return best
+
+
+def check_chains(timeline, scores, max_gaps, min_gaps, limit):
+    positions, best, back_pointers = chain_scores(timeline, scores, max_gaps, min_gaps)
+    chains, total = best_chains(timeline, positions, best, back_pointers, limit)
+    expected = brute_force(timeline, scores, max_gaps, min_gaps)
+
+    assert total == len(expected)
+    assert len(chains) == min(limit, len(expected))
+    returned = [score for _, score, _ in chains]
+    assert returned == sorted(returned, reverse=True)
+    assert returned == pytest.approx(sorted(expected.values(), reverse=True)[:len(chains)])
+    for video_id, score, rows in chains:
+        assert score == pytest.approx(expected[video_id])
+        # The returned chain itself is valid and adds up to the score
+        assert all(timeline.videos[timeline.video_codes[row]] == video_id for row in rows)
+        times = timeline.timestamps[rows]
+        assert all(allowed(times[k - 1], times[k], max_gaps[k - 1], min_gaps[k - 1]) for k in range(1, len(rows)))
+        assert sum(step[row] for step, row in zip(scores, rows)) == pytest.approx(score)
+    return chains
+
+
+# --- range_argmax ----------------------------------------------------------------
+
+@pytest.mark.parametrize('levels', [None, 3])
+def test_range_argmax_matches_brute_force(levels):
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, levels, size=50).astype(float) if levels else rng.random(50)
+    lo = rng.integers(0, 50, size=200)
+    hi = np.minimum(lo + rng.integers(0, 20, size=200), 50)
+
+    result = range_argmax(values, lo, hi)
+    for start, stop, position in zip(lo, hi, result):
+        if start == stop:
+            assert position == -1
+        else:
+            assert start <= position < stop
+            assert values[position] == values[start:stop].max()
+
+
+def test_range_argmax_empty_input():
+    assert range_argmax(np.empty(0), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)).tolist() == []
+    assert range_argmax(np.array([1.0, 2.0]), np.array([1, 0]), np.array([1, 0])).tolist() == [-1, -1]
+
+
+# --- chain_scores / best_chains --------------------------------------------------
+
+@pytest.mark.parametrize('seed', range(6))
+def test_chains_match_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    timeline = random_timeline(rng)
+    steps = 2 + seed % 3
+    scores = random_scores(rng, len(timeline), steps)
+    max_gaps = rng.integers(3, 20, size=steps - 1).astype(float).tolist()
+    min_gaps = [0.0 if k % 2 else float(rng.integers(1, 3)) for k in range(steps - 1)]
+    check_chains(timeline, scores, max_gaps, min_gaps, limit=2)
+
+
+def test_chains_with_tied_scores():
+    rng = np.random.default_rng(10)
+    timeline = random_timeline(rng)
+    scores = random_scores(rng, len(timeline), 3, density=0.6, levels=2)
+    check_chains(timeline, scores, [10.0, 10.0], [0.0, 0.0], limit=10)
+
+
+def test_gap_bounds_are_inclusive():
+    timeline = MomentTimeline(['a', 'b', 'c', 'd'], ['v1'] * 4, [0.0, 10.0, 10.0, 20.0])
+    first = np.array([1.0, -np.inf, -np.inf, -np.inf])
+    second = np.array([-np.inf, 1.0, -np.inf, -np.inf])
+    # Exactly max_gap and exactly min_gap apart are both allowed
+    assert check_chains(timeline, [first, second], [10.0], [10.0], limit=5)[0][1] == 2.0
+    # Past max_gap, or closer than min_gap, no chain
+    assert check_chains(timeline, [first, second], [9.0], [0.0], limit=5) == []
+    assert check_chains(timeline, [first, second], [20.0], [11.0], limit=5) == []
+    # With min_gap 0 the next step must still come strictly later
+    same_time = [np.array([-np.inf, 1.0, -np.inf, -np.inf]), np.array([-np.inf, -np.inf, 1.0, -np.inf])]
+    assert check_chains(timeline, same_time, [10.0], [0.0], limit=5) == []
+
+
+def test_chains_do_not_cross_videos():
+    timeline = MomentTimeline(['a', 'b'], ['v1', 'v2'], [0.0, 1.0])
+    scores = [np.array([1.0, -np.inf]), np.array([-np.inf, 1.0])]
+    assert check_chains(timeline, scores, [100.0], [0.0], limit=5) == []
+
+
+def test_limit_above_video_count_and_no_matches():
+    rng = np.random.default_rng(11)
+    timeline = random_timeline(rng)
+    scores = random_scores(rng, len(timeline), 2, density=0.8)
+    chains = check_chains(timeline, scores, [40.0], [0.0], limit=100)
+    assert len(chains) == len(brute_force(timeline, scores, [40.0], [0.0]))
+
+    nothing = [np.full(len(timeline), -np.inf), scores[1]]
+    assert check_chains(timeline, nothing, [40.0], [0.0], limit=5) == []
+
+
+def test_empty_timeline():
+    timeline = MomentTimeline([], [], [])
+    assert check_chains(timeline, [np.empty(0), np.empty(0)], [10.0], [0.0], limit=5) == []
+
+
+def test_scaled():
+    scores = np.array([0.2, 0.4, 0.8, -0.1])
+    matching = np.array([True, True, False, True])
+    np.testing.assert_allclose(scaled(scores, matching), [0.5, 1.0, -np.inf, 0.0])
+    assert np.isneginf(scaled(scores, np.zeros(4, dtype=bool))).all()
+
+
+# --- search_sequence -------------------------------------------------------------
+
+def test_search_sequence_with_embedding_steps(monkeypatch):
+    rng = np.random.default_rng(12)
+    timeline = random_timeline(rng, videos=3, rows=30, unknown=0)
+    index = EmbeddingIndex(timeline.moment_ids, rng.normal(size=(len(timeline), DIM)).astype(np.float32))
+    monkeypatch.setattr(sequence_search, 'get_embedding_index', lambda: index)
+    steps = [
+        {'embedding': rng.normal(size=DIM), 'threshold': 0.0},
+        {'embedding': rng.normal(size=DIM), 'threshold': 0.0, 'max_gap': 15, 'min_gap': 1},
+    ]
+
+    results, total = search_sequence(None, timeline, steps, limit=10)
+    scores = [scaled(index.scores(step['embedding']), index.scores(step['embedding']) >= 0.0) for step in steps]
+    expected = brute_force(timeline, scores, [15.0], [1.0])
+    assert total == len(expected)
+    assert {result['video_id']: result['score'] for result in results} == pytest.approx(
+        {video_id: score / 2 for video_id, score in expected.items()}
+    )
+
+    video_id = results[0]['video_id']
+    only, total = search_sequence(None, timeline, steps, video_id=video_id, limit=10)
+    assert total == 1 and only[0]['video_id'] == video_id
+    assert only[0]['moments'] == results[0]['moments']
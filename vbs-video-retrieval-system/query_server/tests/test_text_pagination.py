@@ -0,0 +1,81 @@
+"""
+Keyset pagination of the full-text search across tied ts_rank scores.
+
+Runs text_search_query against temporary video_moments / videos tables (they
+shadow the real tables for this connection only); skipped when PostgreSQL is
+not reachable.
+"""
+
+import pytest
+
+from db_utils import get_db_connection, text_search_query, TEXT_RANK_SQL
+from utils_server import encode_cursor, decode_cursor, build_prefix_tsquery
+
+
+@pytest.fixture
+def conn():
+    try:
+        connection = get_db_connection()
+    except Exception as e:
+        pytest.skip(f"PostgreSQL not available: {e}")
+    cursor = connection.cursor()
+    cursor.execute("""
+        CREATE TEMP TABLE videos (
+            video_id TEXT PRIMARY KEY, original_filename TEXT, compressed_filename TEXT, duration_seconds FLOAT8
+        )
+    """)
+    cursor.execute("""
+        CREATE TEMP TABLE video_moments (
+            moment_id TEXT PRIMARY KEY, video_id TEXT, frame_identifier TEXT, timestamp_seconds FLOAT8,
+            keyframe_image_path TEXT, detected_object_names JSONB, extracted_search_words JSONB,
+            average_color_rgb JSONB, search_document TSVECTOR
+        )
+    """)
+    cursor.execute("INSERT INTO videos VALUES ('v1', 'v1.mp4', 'compressed_for_web.mp4', 60.0)")
+    # Seven moments share one document (one tied score), four rank differently
+    documents = ["setweight(to_tsvector('simple', 'exit sign'), 'A')"] * 7 + [
+        "setweight(to_tsvector('simple', 'exit'), 'A')",
+        "setweight(to_tsvector('simple', 'exit exit exit'), 'A')",
+        "setweight(to_tsvector('simple', 'exit'), 'B')",
+        "setweight(to_tsvector('simple', 'emergency exit door'), 'C')",
+    ]
+    for position, document in enumerate(documents):
+        cursor.execute(
+            f"INSERT INTO video_moments VALUES (%s, 'v1', %s, %s, NULL, '[]', '[]', '[0, 0, 0]', {document})",
+            (f"v1_{position:03d}", f"frame_{position:03d}", float(position))
+        )
+    yield connection
+    connection.rollback()
+    connection.close()
+
+
+def fetch_pages(conn, tsquery, limit):
+    """All pages of a text search, following next cursors as a client would."""
+    pages, after = [], None
+    cursor = conn.cursor()
+    while True:
+        cursor.execute(*text_search_query(tsquery, limit + 1, after=after))
+        rows = cursor.fetchall()
+        # moment_id is the first selected column, score the last
+        page = rows[:limit]
+        pages.append([(row[0], row[-1]) for row in page])
+        if len(rows) <= limit:
+            return pages
+        # Round trip through the cursor string, like the API response does
+        after = decode_cursor(encode_cursor(page[-1][-1], page[-1][0]))
+
+
+def test_text_rank_is_float8():
+    assert TEXT_RANK_SQL.endswith("::float8")
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 5])
+def test_pages_across_tied_scores(conn, limit):
+    tsquery = build_prefix_tsquery(['exit'])
+    pages = fetch_pages(conn, tsquery, limit)
+    returned = [moment_id for page in pages for moment_id, _ in page]
+
+    assert len(returned) == len(set(returned)) == 11
+    # Pages continue the (score DESC, moment_id) order without gaps or repeats
+    ordered = sorted((row for page in pages for row in page), key=lambda row: (-row[1], row[0]))
+    assert returned == [moment_id for moment_id, _ in ordered]
@@ -0,0 +1,143 @@
+"""
+Video-level ranking (video_ranking.py) against brute force on small random data.
+
+The reference groups the matching moments per video in plain Python, pools
+them and sorts the videos by (pooled score desc, video_id asc), the order
+the keyset cursor of rank_by=video pages through.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from moment_timeline import MomentTimeline
+from video_ranking import rank_videos
+
+
+def random_timeline(rng, videos=8, rows=60):
+    """Timeline with shuffled rows, a few unknown moments and repeated timestamps."""
+    video_ids = [f"v{value}" for value in rng.integers(0, videos, size=rows)]
+    timestamps = rng.integers(0, 20, size=rows).astype(float).tolist()
+    for row in rng.choice(rows, size=4, replace=False):
+        video_ids[row], timestamps[row] = None, None
+    return MomentTimeline([f"m{row:03d}" for row in range(rows)], video_ids, timestamps)
+
+
+def dyadic_scores(rng, rows):
+    """Scores that are multiples of 1/8: sums are exact, and many videos tie."""
+    return rng.integers(0, 9, size=rows) / 8.0
+
+
+def pool(values, pooling, top_m, temperature):
+    if pooling == 'max':
+        return max(values)
+    if pooling == 'mean_top':
+        top = sorted(values, reverse=True)[:top_m]
+        return sum(top) / len(top)
+    return temperature * math.log(sum(math.exp(value / temperature) for value in values))
+
+
+def brute_force(timeline, scores, threshold, limit, pooling='max', top_m=3, temperature=0.05,
+                moments_per_video=3, after=None):
+    moments = {}
+    for row in range(len(timeline)):
+        code = timeline.video_codes[row]
+        if code >= 0 and scores[row] >= threshold:
+            moments.setdefault(timeline.videos[code], []).append(row)
+    ranked = sorted(
+        (-pool([scores[row] for row in rows], pooling, top_m, temperature), video_id, rows)
+        for video_id, rows in moments.items()
+    )
+    if after is not None:
+        ranked = [entry for entry in ranked if (entry[0], entry[1]) > (-after[0], after[1])]
+    return [
+        (video_id, -key, len(rows),
+         # Best moments first, earlier moments first among equal scores
+         [timeline.moment_ids[row] for row in
+          sorted(rows, key=lambda row: (-scores[row], timeline.timestamps[row], row))[:moments_per_video]])
+        for key, video_id, rows in ranked[:limit]
+    ], len(moments)
+
+
+def check(timeline, scores, threshold, limit, **options):
+    ranked, total = rank_videos(timeline, scores, threshold, limit, **options)
+    expected, expected_total = brute_force(timeline, scores, threshold, limit, **options)
+    assert total == expected_total
+    assert [(video_id, count) for video_id, _, count, _ in ranked] == [
+        (video_id, count) for video_id, _, count, _ in expected
+    ]
+    assert [pooled for _, pooled, _, _ in ranked] == pytest.approx([pooled for _, pooled, _, _ in expected])
+    assert [[moment_id for moment_id, _ in moments] for _, _, _, moments in ranked] == [
+        moments for _, _, _, moments in expected
+    ]
+    return ranked
+
+
+@pytest.mark.parametrize('pooling', ['max', 'mean_top', 'softmax'])
+@pytest.mark.parametrize('seed', range(3))
+def test_rank_videos_matches_brute_force(pooling, seed):
+    rng = np.random.default_rng(seed)
+    timeline = random_timeline(rng)
+    scores = rng.random(len(timeline))
+    for threshold, limit in ((0.0, 3), (0.5, 10), (0.9, 2)):
+        check(timeline, scores, threshold, limit, pooling=pooling, top_m=2, temperature=0.1)
+
+
+@pytest.mark.parametrize('pooling', ['max', 'mean_top'])
+def test_tied_videos_are_ordered_by_video_id(pooling):
+    rng = np.random.default_rng(3)
+    timeline = random_timeline(rng, videos=12)
+    scores = dyadic_scores(rng, len(timeline))
+    for moments_per_video in (1, 2, 5):
+        check(timeline, scores, 0.5, 12, pooling=pooling, top_m=2, moments_per_video=moments_per_video)
+
+
+@pytest.mark.parametrize('pooling', ['max', 'mean_top'])
+def test_cursor_pages_through_tied_videos(pooling):
+    rng = np.random.default_rng(5)
+    timeline = random_timeline(rng, videos=12)
+    scores = dyadic_scores(rng, len(timeline))
+
+    seen, after = [], None
+    while True:
+        page = check(timeline, scores, 0.25, 3, pooling=pooling, after=after)
+        seen.extend(video_id for video_id, _, _, _ in page)
+        if len(page) < 3:
+            break
+        after = (page[-1][1], page[-1][0])
+    expected, total = brute_force(timeline, scores, 0.25, 100, pooling=pooling)
+    assert seen == [video_id for video_id, _, _, _ in expected]
+    assert len(seen) == total
+    pooled = [pooled for _, pooled, _, _ in expected]
+    # At least one page boundary falls inside a tie
+    assert any(pooled[i] == pooled[i + 1] for i in range(2, len(pooled) - 1, 3))
+
+
+def test_limit_above_video_count():
+    rng = np.random.default_rng(4)
+    timeline = random_timeline(rng)
+    ranked = check(timeline, rng.random(len(timeline)), 0.0, 100)
+    assert len(ranked) == len(timeline.videos) - 1  # '' holds the unknown moments
+
+
+def test_no_matching_moments_and_empty_timeline():
+    rng = np.random.default_rng(6)
+    timeline = random_timeline(rng)
+    assert rank_videos(timeline, rng.random(len(timeline)), 2.0, 10) == ([], 0)
+    assert rank_videos(MomentTimeline([], [], []), np.empty(0), 0.0, 10) == ([], 0)
+
+
+def test_softmax_rewards_several_strong_moments():
+    timeline = MomentTimeline(['a1', 'a2', 'b1'], ['a', 'a', 'b'], [0.0, 1.0, 0.0])
+    scores = np.array([0.8, 0.8, 0.8])
+    ranked, _ = rank_videos(timeline, scores, 0.0, 2, pooling='softmax', temperature=0.1)
+    assert [video_id for video_id, _, _, _ in ranked] == ['a', 'b']
+    assert ranked[0][1] == pytest.approx(0.8 + 0.1 * math.log(2))
+    assert ranked[1][1] == pytest.approx(0.8)
+
+
+def test_unknown_pooling_is_rejected():
+    timeline = MomentTimeline(['a'], ['v'], [0.0])
+    with pytest.raises(ValueError):
+        rank_videos(timeline, np.array([1.0]), 0.0, 1, pooling='median')
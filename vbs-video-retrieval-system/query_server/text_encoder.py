@@ -0,0 +1,145 @@
+"""
+Warm, micro-batched CLIP text encoder for the query server.
+
+A single long-lived worker thread owns the CLIP model. Concurrent text
+queries are queued and encoded together in one `encode_text` call, so
+several operators typing at the same time share one forward pass instead
+of each paying the full model cost.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List
+
+import clip
+import numpy as np
+import torch
+
+from config import CLIP_MODEL_NAME, CLIP_TEXT_MAX_BATCH_SIZE, CLIP_TEXT_MAX_WAIT_MS, CLIP_TORCH_THREADS
+
+logger = logging.getLogger(__name__)
+
+
+class ClipTextEncoder:
+    """
+    Background CLIP text encoder that batches queued requests.
+    """
+
+    def __init__(self, model_name: str = CLIP_MODEL_NAME, max_batch_size: int = CLIP_TEXT_MAX_BATCH_SIZE,
+                 max_wait_ms: float = CLIP_TEXT_MAX_WAIT_MS, device: str = 'cpu'):
+        """
+        Args:
+            model_name: CLIP model to load (must match the image embeddings, ViT-L/14)
+            max_batch_size: Maximum number of texts encoded in one forward pass
+            max_wait_ms: How long the worker waits for more requests after the first one
+            device: Torch device for the model
+        """
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000.0
+        self.device = device
+        self.model = None
+        self.load_error = None
+
+        self._requests = queue.Queue()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='clip-text-encoder', daemon=True)
+        self._thread.start()
+
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        """Block until the model is loaded. Returns False if loading failed or timed out."""
+        return self._ready.wait(timeout) and self.model is not None
+
+    def encode(self, text: str, timeout: float = 30.0) -> np.ndarray:
+        """Encode one text into an L2-normalized float32 embedding."""
+        return self.encode_many([text], timeout=timeout)[0]
+
+    def encode_many(self, texts: List[str], timeout: float = 30.0) -> np.ndarray:
+        """Encode several texts; they may share a batch with other callers."""
+        futures = []
+        for text in texts:
+            future = Future()
+            self._requests.put((text, future))
+            futures.append(future)
+        deadline = time.monotonic() + timeout
+        return np.stack([future.result(timeout=max(0.0, deadline - time.monotonic())) for future in futures])
+
+    def _load_model(self):
+        if CLIP_TORCH_THREADS:
+            torch.set_num_threads(CLIP_TORCH_THREADS)
+        start = time.time()
+        model, _ = clip.load(self.model_name, device=self.device, jit=False)
+        model.eval()
+        self.model = model
+        logger.info(f"CLIP text encoder ({self.model_name}) loaded in {time.time() - start:.1f}s")
+
+    def _collect_batch(self):
+        """Wait for one request, then gather more until the batch is full or the wait window closes."""
+        batch = [self._requests.get()]
+        deadline = time.monotonic() + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _encode_batch(self, batch):
+        # Identical queries in the same batch are encoded once
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        tokens = clip.tokenize(unique_texts, truncate=True).to(self.device)
+        with torch.inference_mode():
+            features = self.model.encode_text(tokens).float()
+        features = features / features.norm(dim=-1, keepdim=True).clamp_min(1e-6)
+        embeddings = features.cpu().numpy().astype(np.float32)
+        rows = {text: row for row, text in enumerate(unique_texts)}
+        for text, future in batch:
+            future.set_result(embeddings[rows[text]])
+
+    def _run(self):
+        try:
+            self._load_model()
+        except Exception as e:
+            self.load_error = e
+            logger.error(f"Error loading CLIP text encoder: {e}")
+        finally:
+            self._ready.set()
+
+        while True:
+            batch = self._collect_batch()
+            if self.model is None:
+                for _, future in batch:
+                    future.set_exception(RuntimeError(f"CLIP text encoder unavailable: {self.load_error}"))
+                continue
+            try:
+                self._encode_batch(batch)
+            except Exception as e:
+                logger.error(f"Error encoding CLIP text batch: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+# Global CLIP text encoder instance
+text_encoder = None
+_text_encoder_lock = threading.Lock()
+
+def get_text_encoder() -> ClipTextEncoder:
+    """
+    Get or start the global CLIP text encoder.
+
+    Returns:
+        ClipTextEncoder instance
+    """
+    global text_encoder
+    if text_encoder is None:
+        with _text_encoder_lock:
+            if text_encoder is None:
+                text_encoder = ClipTextEncoder()
+    return text_encoder
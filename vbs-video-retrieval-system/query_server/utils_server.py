@@ -1,9 +1,13 @@
+import base64
 import json
+import math
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 import re
 import string
-from typing import List
+from typing import Dict, List, Optional, Tuple
+
+from config import DEFAULT_ITEMS_PER_PAGE, MAX_ITEMS_PER_PAGE
 
 def parse_json_field(field_value):
     """Parse a JSON string or return as-is if already parsed."""
@@ -87,6 +91,84 @@ def extract_keywords_from_sentence(sentence: str) -> List[str]:
     
     return keywords
 
+def build_prefix_tsquery(keywords: List[str], match_all: bool = False, weights: str = '',
+                         expansions: Dict[str, List[str]] = None) -> str:
+    """
+    Build a to_tsquery() string that prefix-matches every keyword.
+
+    Each keyword is reduced to alphanumeric tokens so user input cannot inject
+    tsquery operators. Multi-token keywords must match all of their tokens.
+
+    Args:
+        keywords: Keywords to match
+        match_all: Combine keywords with AND instead of OR
+        weights: Optional tsvector weight labels to restrict matches to, e.g. 'A'
+        expansions: Optional similar words per (lowercased) keyword, e.g. from fuzzy
+            OCR vocabulary lookup; a keyword also matches any of its expansions exactly
+
+    Returns:
+        str: Query such as "(red:*) | (car:* | cat)", or '' if no usable tokens remain
+    """
+    def tokens_query(text, prefix):
+        tokens = re.findall(r'[^\W_]+', str(text).lower())
+        if prefix:
+            suffix = ':*' + weights
+        else:
+            suffix = ':' + weights if weights else ''
+        query = ' & '.join(f'{token}{suffix}' for token in tokens)
+        return f'({query})' if len(tokens) > 1 else query
+
+    terms = []
+    for keyword in keywords:
+        alternatives = [tokens_query(keyword, prefix=True)]
+        for word in (expansions or {}).get(str(keyword).lower(), []):
+            alternatives.append(tokens_query(word, prefix=False))
+        alternatives = [alt for alt in dict.fromkeys(alternatives) if alt]
+        if alternatives:
+            terms.append('(' + ' | '.join(alternatives) + ')')
+    return (' & ' if match_all else ' | ').join(terms)
+
+def resolve_page_size(limit, default: int = DEFAULT_ITEMS_PER_PAGE, maximum: int = MAX_ITEMS_PER_PAGE) -> int:
+    """Requested page size, defaulting to DEFAULT_ITEMS_PER_PAGE and capped at MAX_ITEMS_PER_PAGE."""
+    try:
+        limit = int(limit) if limit is not None else default
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    return max(1, min(limit, maximum))
+
+def encode_cursor(key, moment_id: str) -> str:
+    """
+    Build an opaque pagination cursor from the sort key and moment_id of the
+    last result on a page.
+    """
+    payload = json.dumps({'k': key, 'id': moment_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[float, str]]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Returns:
+        (sort key, moment_id), or None when no cursor was given
+
+    Raises:
+        ValueError: if the cursor is malformed, or its key is not a finite
+            number or its moment_id not a string
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        key, moment_id = payload['k'], payload['id']
+    except Exception:
+        raise ValueError("Invalid cursor")
+    # Every sort key (score, distance, timestamp) is a number; anything else was tampered with
+    if isinstance(key, bool) or not isinstance(key, (int, float)) or not math.isfinite(key) \
+            or not isinstance(moment_id, str):
+        raise ValueError("Invalid cursor")
+    return float(key), moment_id
+
 def calculate_text_relevance_score(extracted_words: List[str], detected_objects: List[str], filename: str) -> float:
     """
     Calculate text relevance score based on word frequency and importance.
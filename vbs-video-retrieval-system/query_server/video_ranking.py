@@ -0,0 +1,87 @@
+"""
+Video-level ranking for known-item search.
+
+Moment scores are pooled per video so that one long video with many
+similar keyframes takes one slot instead of flooding the result page. The
+score vector is taken in timeline order (moment_timeline.py), where every
+video is a contiguous run, so pooling is a group-reduce (reduceat /
+bincount) over those runs rather than a per-video loop:
+
+    max       best moment score
+    mean_top  mean of the video's top_m moment scores
+    softmax   temperature * log(sum(exp(score / temperature))), a smooth max
+              that also rewards several strong moments
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+from embedding_index import keyset_top_k
+
+POOLING_METHODS = ('max', 'mean_top', 'softmax')
+
+
+def rank_videos(timeline, scores: np.ndarray, threshold: float, limit: int, pooling: str = 'max',
+                top_m: int = 3, temperature: float = 0.05, moments_per_video: int = 3,
+                after=None) -> Tuple[List[tuple], int]:
+    """
+    Rank videos by pooling the scores of their moments.
+
+    Args:
+        timeline: MomentTimeline aligned with the score vector
+        scores: Score per row of the embedding index (higher is better)
+        threshold: Moments below this score are ignored
+        limit: Maximum number of videos
+        pooling: One of POOLING_METHODS
+        top_m: Moments averaged by 'mean_top'
+        temperature: Temperature of 'softmax'
+        moments_per_video: Best moments returned per video
+        after: Optional (video score, video_id) cursor; only videos ranked after it are returned
+
+    Returns:
+        (list of (video_id, video score, matching moment count, [(moment_id, score)]),
+         number of videos with a matching moment)
+    """
+    if pooling not in POOLING_METHODS:
+        raise ValueError(f"pooling must be one of {', '.join(POOLING_METHODS)}")
+
+    # Matching moments in (video, timestamp) order: every video is a contiguous run
+    sorted_scores = scores[timeline.order]
+    positions = np.flatnonzero(sorted_scores >= threshold)
+    if positions.size == 0:
+        return [], 0
+    values = sorted_scores[positions].astype(np.float64)
+    codes = timeline.sorted_codes[positions]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    counts = np.diff(np.r_[starts, len(positions)])
+    run_of = np.repeat(np.arange(len(starts)), counts)
+
+    # Best moments first within every run; rank of each moment inside its run
+    order = np.lexsort((-values, run_of))
+    rank = np.arange(len(order)) - starts[run_of[order]]
+
+    if pooling == 'max':
+        pooled = np.maximum.reduceat(values, starts)
+    elif pooling == 'mean_top':
+        top = order[rank < top_m]
+        pooled = np.bincount(run_of[top], weights=values[top], minlength=len(starts)) / np.minimum(counts, top_m)
+    else:
+        peak = np.maximum.reduceat(values, starts)
+        mass = np.add.reduceat(np.exp((values - peak[run_of]) / temperature), starts)
+        pooled = peak + temperature * np.log(mass)
+
+    video_ids = [timeline.videos[code] for code in codes[starts]]
+    best = keyset_top_k(pooled, video_ids, limit, after=after)
+
+    # Best moments of the returned videos
+    shown = order[rank < moments_per_video]
+    shown_runs = run_of[shown]
+    ranked = []
+    for run in best:
+        moments = shown[shown_runs == run]
+        ranked.append((
+            video_ids[run], float(pooled[run]), int(counts[run]),
+            [(timeline.moment_ids[timeline.order[positions[i]]], float(values[i])) for i in moments]
+        ))
+    return ranked, len(starts)
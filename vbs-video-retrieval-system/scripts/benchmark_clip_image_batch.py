@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark batched CLIP image encoding (backend/image_encoding/feature_extractors_gpu.py).
+
+Encodes the same set of keyframes one image per forward pass
+(get_image_clip_embedding, the baseline) and with
+get_image_clip_embeddings_batch at several batch sizes, and reports
+images/sec per setting. Use the fastest batch size as CLIP_IMAGE_BATCH_SIZE
+on the ingestion hosts. Keyframes are read from --images, else from the
+extracted frames of the dataset, else random images are generated.
+
+Examples:
+    python scripts/benchmark_clip_image_batch.py
+    python scripts/benchmark_clip_image_batch.py --batch-sizes 1,8,16,32,64 --images 256 --threads 16
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.append(os.path.join(BACKEND_DIR, 'config'))
+sys.path.append(os.path.join(BACKEND_DIR, 'image_encoding'))
+
+from PIL import Image
+import torch
+
+from settings import DATASET_ROOT_DIR, KEYFRAME_IMAGES_SUBDIR
+from feature_extractors_gpu import DEVICE, get_image_clip_embedding, get_image_clip_embeddings_batch
+
+
+def parse_int_list(value: str):
+    """Parse '1,8,16' into [1, 8, 16]."""
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def load_images(source, count, seed):
+    """Load up to count keyframes from a directory (or the dataset), or generate random ones."""
+    pattern = os.path.join(source, '*.jp*g') if source else os.path.join(DATASET_ROOT_DIR, '*', KEYFRAME_IMAGES_SUBDIR, '*.jp*g')
+    paths = sorted(glob.glob(pattern))
+    rng = np.random.default_rng(seed)
+    if paths:
+        paths = [paths[i] for i in sorted(rng.choice(len(paths), size=min(count, len(paths)), replace=False))]
+        print(f"Loading {len(paths)} keyframes from {os.path.dirname(paths[0])}...")
+        return [Image.open(path).convert("RGB") for path in paths]
+    print(f"No keyframes found ({pattern}); generating {count} random 1280x720 images.")
+    return [Image.fromarray(rng.integers(0, 256, size=(720, 1280, 3), dtype=np.uint8)) for _ in range(count)]
+
+
+def measure(encode, images, repeats):
+    """Best-of-repeats images/sec of an encoding function over all images."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        encode(images)
+        best = min(best, time.perf_counter() - start)
+    return len(images) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLIP image encoding throughput per batch size")
+    parser.add_argument('--batch-sizes', default='1,4,8,16,32,64', help="Batch sizes to sweep")
+    parser.add_argument('--images', type=int, default=128, help="Number of keyframes encoded per run")
+    parser.add_argument('--image-dir', default=None, help="Directory of keyframe JPEGs (default: dataset keyframes)")
+    parser.add_argument('--threads', type=int, default=0, help="torch.set_num_threads (0 = torch default)")
+    parser.add_argument('--repeats', type=int, default=2, help="Runs per setting; the fastest is reported")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    if args.threads > 0:
+        torch.set_num_threads(args.threads)
+    images = load_images(args.image_dir, args.images, args.seed)
+    if get_image_clip_embeddings_batch(images[:2]) is None:
+        print("❌ CLIP model is not available.")
+        return False
+
+    # Batched and one-by-one embeddings must agree
+    reference = np.array([get_image_clip_embedding(image) for image in images[:8]], dtype=np.float32)
+    batched, _ = get_image_clip_embeddings_batch(images[:8], batch_size=8)
+    max_difference = float(np.abs(reference - batched).max())
+
+    results = {
+        'device': DEVICE, 'threads': torch.get_num_threads(), 'images': len(images),
+        'max_abs_difference_vs_single': max_difference, 'runs': []
+    }
+    print(f"\n📊 {len(images)} images on {DEVICE}, {torch.get_num_threads()} torch threads "
+          f"(max |batched - single| = {max_difference:.2e})")
+    print(f"{'setting':<28}{'images/sec':>12}{'ms/image':>12}{'speedup':>10}")
+
+    # Warm up the kernels before measuring
+    get_image_clip_embeddings_batch(images[:4])
+    baseline = measure(lambda batch: [get_image_clip_embedding(image) for image in batch], images, args.repeats)
+    print(f"{'single image per pass':<28}{baseline:>12.1f}{1000 / baseline:>12.1f}{1.0:>9.2f}x")
+    results['runs'].append({'label': 'single', 'images_per_second': baseline})
+
+    for batch_size in parse_int_list(args.batch_sizes):
+        rate = measure(lambda batch: get_image_clip_embeddings_batch(batch, batch_size=batch_size), images, args.repeats)
+        print(f"{f'batch_size={batch_size}':<28}{rate:>12.1f}{1000 / rate:>12.1f}{rate / baseline:>9.2f}x")
+        results['runs'].append({'label': 'batch', 'batch_size': batch_size, 'images_per_second': rate})
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    print("\nSet CLIP_IMAGE_BATCH_SIZE in backend/config/settings.py to the fastest batch size.")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
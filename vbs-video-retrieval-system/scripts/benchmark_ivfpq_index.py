@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark the in-process IVF-PQ index against exact search.
+
+A sample of stored embeddings is used as queries. For every nprobe and
+rerank setting the script reports recall@k against the exact top-k of the
+resident embedding matrix, together with p50/p95 latency. rerank=0 measures
+the ADC (approximate) ranking alone.
+
+Examples:
+    python scripts/benchmark_ivfpq_index.py
+    python scripts/benchmark_ivfpq_index.py --nprobe 4,8,16,32,64 --rerank 0,200,1000 --k 50
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'query_server')))
+
+from config import IVFPQ_INDEX_DIR
+from embedding_index import load_embedding_index
+from ivfpq_index import IVFPQIndex
+from benchmark_vector_index import parse_int_list, latency_summary, exact_ground_truth, print_row
+
+
+def run_ivfpq_queries(index, queries, truth, k, nprobe, rerank):
+    """Search every sample with one setting and measure recall and latency."""
+    recalls, latencies = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        matches, _ = index.search(query, threshold=-1.0, limit=k, nprobe=nprobe, rerank=rerank)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found = {moment_id for moment_id, _ in matches}
+        recalls.append(len(found & expected) / max(len(expected), 1))
+    return float(np.mean(recalls)), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recall and latency of the IVF-PQ index")
+    parser.add_argument('--index-dir', default=IVFPQ_INDEX_DIR, help="Index directory (default: IVFPQ_INDEX_DIR)")
+    parser.add_argument('--nprobe', default='1,4,8,16,32,64', help="nprobe values to sweep")
+    parser.add_argument('--rerank', default='0,100,1000', help="Shortlist sizes re-ranked exactly")
+    parser.add_argument('--queries', type=int, default=100, help="Number of sampled query embeddings")
+    parser.add_argument('--k', type=int, default=50, help="Top-k for recall@k")
+    parser.add_argument('--noise', type=float, default=0.0,
+                        help="Gaussian noise added to sampled queries (0 = use stored embeddings as queries)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    print("Loading embeddings for exact ground truth...")
+    embedding_index = load_embedding_index(shared=False)
+    if len(embedding_index) == 0:
+        print("❌ No embeddings found in video_moments.")
+        return False
+    index = IVFPQIndex.load(args.index_dir)
+    index.attach_reranker(embedding_index)
+
+    rng = np.random.default_rng(args.seed)
+    sample = rng.choice(len(embedding_index), size=min(args.queries, len(embedding_index)), replace=False)
+    queries = np.asarray(embedding_index.embeddings[sample], dtype=np.float32)
+    if args.noise > 0:
+        queries = queries + rng.normal(scale=args.noise, size=queries.shape).astype(np.float32)
+
+    truth, exact_latencies = exact_ground_truth(embedding_index, queries, args.k)
+    results = {
+        'rows': len(embedding_index), 'queries': len(queries), 'k': args.k,
+        'index': index.manifest, 'runs': []
+    }
+
+    print(f"\n📊 {len(embedding_index)} embeddings, IVF-PQ nlist={index.nlist} m={index.m}, "
+          f"{len(queries)} queries, k={args.k}")
+    exact_summary = latency_summary(exact_latencies)
+    print_row("exact (in-memory matrix)", 1.0, exact_summary)
+    results['runs'].append({'label': 'exact-memory', 'recall': 1.0, **exact_summary})
+
+    for rerank in parse_int_list(args.rerank):
+        for nprobe in parse_int_list(args.nprobe):
+            # Warm the page cache before measuring
+            run_ivfpq_queries(index, queries[:5], truth[:5], args.k, nprobe, rerank)
+            recall, latencies = run_ivfpq_queries(index, queries, truth, args.k, nprobe, rerank)
+            summary = latency_summary(latencies)
+            print_row(f"nprobe={nprobe} rerank={rerank}", recall, summary)
+            results['runs'].append({'label': 'ivfpq', 'nprobe': nprobe, 'rerank': rerank, 'recall': recall, **summary})
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    print("\nSet IVFPQ_NPROBE / IVFPQ_RERANK for the query server to the chosen setting.")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark ANN index configurations for video_moments.clip_embedding.
+
+For every index configuration the script (re)builds the index with
+database/migrate_vector_index.py, runs a sample of query embeddings through
+the same pgvector query the server uses, and reports recall@k against exact
+search together with p50/p95 latency for each search-time setting
+(ivfflat.probes / hnsw.ef_search). Exact search latency is measured both in
+Postgres (index scans disabled) and with the in-memory embedding matrix.
+
+NOTE: building an index replaces idx_moments_clip_embedding. Re-run
+migrate_vector_index.py with the chosen parameters afterwards.
+
+Examples:
+    python scripts/benchmark_vector_index.py \\
+        --index ivfflat:lists=auto --index ivfflat:lists=200 \\
+        --index hnsw:m=16,ef_construction=64 --index hnsw:m=32,ef_construction=128 \\
+        --probes 1,5,10,20 --ef-search 40,100,200 --queries 200 --k 50
+    python scripts/benchmark_vector_index.py --current --probes 5,10,20
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'query_server')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'database')))
+
+from db_utils import get_db_connection, search_moments_by_embedding
+from embedding_index import EmbeddingIndex
+from migrate_vector_index import rebuild_vector_index
+
+
+def parse_index_spec(spec: str) -> dict:
+    """Parse 'hnsw:m=16,ef_construction=64' or 'ivfflat:lists=auto' into build kwargs."""
+    index_type, _, options = spec.partition(':')
+    if index_type not in ('hnsw', 'ivfflat'):
+        raise ValueError(f"Unknown index type in '{spec}'")
+    params = {'index_type': index_type}
+    for option in filter(None, options.split(',')):
+        key, _, value = option.partition('=')
+        params[key.strip()] = None if value == 'auto' else int(value)
+    return params
+
+
+def parse_int_list(value: str):
+    return [int(v) for v in value.split(',') if v]
+
+
+def latency_summary(latencies_ms) -> dict:
+    return {
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'mean_ms': float(np.mean(latencies_ms)),
+    }
+
+
+def exact_ground_truth(index: EmbeddingIndex, queries: np.ndarray, k: int):
+    """Exact top-k moment_ids per query plus in-memory latencies."""
+    truth, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        matches, _ = index.search(query, threshold=-1.0, limit=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        truth.append({moment_id for moment_id, _ in matches})
+    return truth, latencies
+
+
+def run_pgvector_queries(conn, queries, truth, k, probes=1, ef_search=40, exact=False):
+    """Run the server's pgvector query for every sample and measure recall and latency."""
+    recalls, latencies = [], []
+    for query, expected in zip(queries, truth):
+        if exact:
+            cursor = conn.cursor()
+            cursor.execute("SET LOCAL enable_indexscan = off")
+        start = time.perf_counter()
+        rows = search_moments_by_embedding(conn, query, threshold=-1.0, limit=k, probes=probes, ef_search=ef_search)
+        latencies.append((time.perf_counter() - start) * 1000)
+        conn.rollback()
+        found = {row['moment_id'] for row in rows}
+        recalls.append(len(found & expected) / max(len(expected), 1))
+    return float(np.mean(recalls)), latencies
+
+
+def print_row(label, recall, summary):
+    recall_text = f"{recall:.3f}" if recall is not None else "  -  "
+    print(f"  {label:<42} recall@k={recall_text}  p50={summary['p50_ms']:7.2f}ms  p95={summary['p95_ms']:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pgvector ANN index configurations")
+    parser.add_argument('--index', action='append', default=[],
+                        help="Index to build, e.g. 'hnsw:m=16,ef_construction=64' or 'ivfflat:lists=auto' (repeatable)")
+    parser.add_argument('--current', action='store_true', help="Benchmark the existing index without rebuilding")
+    parser.add_argument('--probes', default='1,5,10,20', help="ivfflat.probes values to sweep")
+    parser.add_argument('--ef-search', default='40,100,200', help="hnsw.ef_search values to sweep")
+    parser.add_argument('--queries', type=int, default=100, help="Number of sampled query embeddings")
+    parser.add_argument('--k', type=int, default=50, help="Top-k for recall@k")
+    parser.add_argument('--noise', type=float, default=0.0,
+                        help="Gaussian noise added to sampled queries (0 = use stored embeddings as queries)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    if not args.index and not args.current:
+        parser.error("pass at least one --index or --current")
+
+    print("Loading embeddings for exact ground truth...")
+    index = EmbeddingIndex.load()
+    if len(index) == 0:
+        print("❌ No embeddings found in video_moments.")
+        return False
+
+    rng = np.random.default_rng(args.seed)
+    sample = rng.choice(len(index), size=min(args.queries, len(index)), replace=False)
+    queries = index.embeddings[sample].astype(np.float32)
+    if args.noise > 0:
+        queries = queries + rng.normal(scale=args.noise, size=queries.shape).astype(np.float32)
+
+    truth, memory_latencies = exact_ground_truth(index, queries, args.k)
+    results = {'rows': len(index), 'queries': len(queries), 'k': args.k, 'runs': []}
+
+    print(f"\n📊 {len(index)} embeddings, {len(queries)} queries, k={args.k}")
+    memory_summary = latency_summary(memory_latencies)
+    print_row("exact (in-memory matrix)", 1.0, memory_summary)
+    results['runs'].append({'label': 'exact-memory', 'recall': 1.0, **memory_summary})
+
+    conn = get_db_connection()
+    try:
+        recall, latencies = run_pgvector_queries(conn, queries, truth, args.k, exact=True)
+        summary = latency_summary(latencies)
+        print_row("exact (postgres, no index)", recall, summary)
+        results['runs'].append({'label': 'exact-postgres', 'recall': recall, **summary})
+
+        specs = [parse_index_spec(spec) for spec in args.index] or [None]
+        for spec in specs:
+            if spec is not None:
+                info = rebuild_vector_index(conn, **spec)
+                label = info['sql'].split('USING ')[1]
+                print(f"\n🔧 Built {label} in {info['build_seconds']:.1f}s")
+                index_type = spec['index_type']
+            else:
+                label, index_type = 'current index', None
+                print(f"\n🔧 Using {label}")
+
+            sweeps = []
+            if index_type in ('ivfflat', None):
+                sweeps += [('probes', value) for value in parse_int_list(args.probes)]
+            if index_type in ('hnsw', None):
+                sweeps += [('ef_search', value) for value in parse_int_list(args.ef_search)]
+
+            for setting, value in sweeps:
+                kwargs = {setting: value}
+                # Warm the cache before measuring
+                run_pgvector_queries(conn, queries[:5], truth[:5], args.k, **kwargs)
+                recall, latencies = run_pgvector_queries(conn, queries, truth, args.k, **kwargs)
+                summary = latency_summary(latencies)
+                print_row(f"{setting}={value}", recall, summary)
+                results['runs'].append({
+                    'label': label, 'setting': setting, 'value': value,
+                    'build_seconds': info['build_seconds'] if spec is not None else None,
+                    'recall': recall, **summary
+                })
+    finally:
+        conn.close()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    print("\nRebuild the production index with database/migrate_vector_index.py using the chosen parameters.")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
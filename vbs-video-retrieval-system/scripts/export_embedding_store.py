@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Export all moment embeddings to the binary embedding store.
+
+The store is a row-aligned, L2-normalized embedding matrix (.npy, float32
+and/or float16) plus a moment_id file and a manifest recording the data
+generation (see query_server/index_snapshot.py). When the store is current,
+the query server memory-maps it at startup instead of parsing every
+embedding out of Postgres. The importers write it after each import, in
+the transaction that bumps the data generation (scripts/import_maintenance.py).
+
+Examples:
+    python scripts/export_embedding_store.py
+    python scripts/export_embedding_store.py --output /data/embedding_store --dtypes float16
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'query_server')))
+
+from config import EMBEDDING_STORE_DIR
+from db_utils import get_db_connection, fetch_data_generation
+from embedding_index import EMBEDDING_DIM
+from index_snapshot import write_embedding_store
+
+
+def parse_vector(value) -> np.ndarray:
+    """Parse a clip_embedding value (pgvector text '[0.1,...]' or a list) into float32."""
+    if isinstance(value, str):
+        return np.array(value.strip('[]').split(','), dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+def export_embedding_store(directory: str = EMBEDDING_STORE_DIR, dtypes=('float32', 'float16'),
+                           batch_size: int = 5000, conn=None, generation=None) -> dict:
+    """
+    Stream every stored embedding into the embedding store in directory.
+
+    Rows are read through a server-side cursor in one snapshot transaction,
+    in the same (video_id, timestamp_seconds) order the server loads them in.
+
+    Args:
+        conn: Connection to read from, inside the caller's transaction (default:
+            a new read-only REPEATABLE READ connection, closed afterwards)
+        generation: Data generation recorded in the manifest (default: the one conn sees)
+
+    Returns:
+        The store manifest
+    """
+    own_connection = conn is None
+    if own_connection:
+        conn = get_db_connection()
+        conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    try:
+        if generation is None:
+            generation = fetch_data_generation(conn)
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM video_moments WHERE clip_embedding IS NOT NULL")
+        count = cursor.fetchone()[0]
+
+        cursor = conn.cursor(name='export_embedding_store')
+        cursor.itersize = batch_size
+        cursor.execute("""
+            SELECT m.moment_id, m.clip_embedding
+            FROM video_moments m
+            WHERE m.clip_embedding IS NOT NULL
+            ORDER BY m.video_id, m.timestamp_seconds
+        """)
+
+        def chunks():
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield [row[0] for row in rows], np.stack([parse_vector(row[1]) for row in rows])
+
+        manifest = write_embedding_store(directory, chunks(), count, EMBEDDING_DIM, generation, dtypes)
+        cursor.close()
+        return manifest
+    finally:
+        if own_connection:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export moment embeddings to the binary embedding store")
+    parser.add_argument('--output', default=EMBEDDING_STORE_DIR, help="Store directory (default: EMBEDDING_STORE_DIR)")
+    parser.add_argument('--dtypes', default='float32,float16', help="Comma-separated matrix variants to write")
+    parser.add_argument('--batch-size', type=int, default=5000, help="Rows fetched per round trip")
+    args = parser.parse_args()
+
+    start = time.time()
+    manifest = export_embedding_store(args.output, tuple(args.dtypes.split(',')), args.batch_size)
+    print(f"Exported {manifest['rows']} embeddings ({', '.join(manifest['dtypes'])}) "
+          f"at data generation {manifest['data_generation']} to {args.output} in {time.time() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -19,6 +19,7 @@ import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from query_server.config import DB_CONFIG
+from import_maintenance import publish_import, refresh_ocr_vocabulary
 
 DATASET_PATH = r"E:\image and video deep learning\trial_new_project\vbs-video-retrieval-system\Dataset\V3C1-200" # change according to location of your video files
 
@@ -188,6 +189,16 @@ def main():
             failed += 1
             logger.error(f"Failed: {message}")
 
+    if successful:
+        conn = get_db_connection()
+        try:
+            refresh_ocr_vocabulary(conn, logger)
+            # Writes the embedding store before the bump becomes visible to the query servers
+            publish_import(conn, logger)
+        finally:
+            if conn:
+                conn.close()
+
     logger.info("\n=== IMPORT SUMMARY ===")
     logger.info(f"Successful imports: {successful}")
     logger.info(f"Failed imports: {failed}")
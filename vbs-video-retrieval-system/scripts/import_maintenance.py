@@ -0,0 +1,75 @@
+"""
+Post-import maintenance shared by the importers (import_data_fixed.py and
+scripts/import_data.py).
+
+Each importer passes its own database connection, so the work runs against
+the database it imported into.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from export_embedding_store import export_embedding_store
+
+
+def refresh_ocr_vocabulary(conn, logger):
+    """
+    Rebuild the trigram-indexed OCR vocabulary used for fuzzy keyword search.
+
+    Args:
+        conn: The importer's connection, with no transaction in progress (closed by the caller)
+        logger: The importer's logger
+    """
+    if not conn:
+        logger.warning("Could not refresh OCR vocabulary: database connection failed")
+        return
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT refresh_ocr_vocabulary()")
+        vocabulary_size = cursor.fetchone()[0]
+        conn.commit()
+        logger.info(f"OCR vocabulary refreshed: {vocabulary_size} distinct words")
+    except Exception as e:
+        conn.rollback()
+        logger.warning(f"Could not refresh OCR vocabulary (run database/migrate_ocr_vocabulary.py): {e}")
+
+
+def publish_import(conn, logger):
+    """
+    Bump the data generation and write the embedding store in one transaction.
+
+    The store is exported inside the transaction that bumps the generation and
+    records the new generation; the bump is committed only afterwards. A query
+    server that sees the new generation (and reloads its indexes) therefore
+    finds a store that is already current instead of falling back to a full
+    database load. If the export fails, the bump is still committed.
+
+    Args:
+        conn: The importer's connection, with no transaction in progress (closed by the caller)
+        logger: The importer's logger
+    """
+    if not conn:
+        logger.warning("Could not bump data generation: database connection failed")
+        return
+    try:
+        # One snapshot for the bump and the export: the store holds exactly the rows of this generation
+        conn.set_session(isolation_level='REPEATABLE READ')
+        cursor = conn.cursor()
+        cursor.execute("SELECT bump_data_generation()")
+        generation = cursor.fetchone()[0]
+
+        cursor.execute("SAVEPOINT export_embedding_store")
+        try:
+            manifest = export_embedding_store(conn=conn, generation=generation)
+            logger.info(f"Embedding store written: {manifest['rows']} embeddings ({', '.join(manifest['dtypes'])})")
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT export_embedding_store")
+            logger.warning(f"Could not write the embedding store (run scripts/export_embedding_store.py): {e}")
+
+        conn.commit()
+        logger.info(f"Data generation bumped to {generation}")
+    except Exception as e:
+        conn.rollback()
+        logger.warning(f"Could not bump data generation (run database/migrate_data_generation.py): {e}")
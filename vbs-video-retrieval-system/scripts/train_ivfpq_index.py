@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Train the in-process IVF-PQ index (query_server/ivfpq_index.py) offline.
+
+The embeddings are read from the embedding store when it is current (else
+from the database), the coarse and PQ quantizers are trained on a sample,
+every embedding is encoded, and the index is saved to IVFPQ_INDEX_DIR. The
+query server loads it for vector searches in 'ivfpq' mode. Re-run after
+imports; until then newly imported moments are not found in 'ivfpq' mode.
+
+Examples:
+    python scripts/train_ivfpq_index.py
+    python scripts/train_ivfpq_index.py --nlist 4096 --m 96 --train-size 250000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'query_server')))
+
+from config import IVFPQ_INDEX_DIR
+from db_utils import db_connection, fetch_data_generation
+from embedding_index import load_embedding_index
+from ivfpq_index import IVFPQIndex
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Train and save the IVF-PQ vector index")
+    parser.add_argument('--output', default=IVFPQ_INDEX_DIR, help="Index directory (default: IVFPQ_INDEX_DIR)")
+    parser.add_argument('--nlist', type=int, default=None, help="Inverted lists (default: about 4 * sqrt(N))")
+    parser.add_argument('--m', type=int, default=64, help="PQ sub-quantizers = bytes per vector (must divide 768)")
+    parser.add_argument('--train-size', type=int, default=100000, help="Rows sampled to train the quantizers")
+    parser.add_argument('--iterations', type=int, default=20, help="k-means iterations")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with db_connection() as conn:
+        generation = fetch_data_generation(conn)
+    embedding_index = load_embedding_index(shared=False)
+    if len(embedding_index) == 0:
+        print("❌ No embeddings found in video_moments.")
+        return False
+
+    start = time.time()
+    index = IVFPQIndex.build(
+        embedding_index.moment_ids, embedding_index.embeddings, nlist=args.nlist, m=args.m,
+        train_size=args.train_size, iterations=args.iterations, seed=args.seed, generation=generation
+    )
+    index.save(args.output)
+    code_mb = index.codes.nbytes / 2**20
+    print(f"✅ Trained IVF-PQ index ({len(index)} rows, nlist={index.nlist}, m={index.m}, "
+          f"{code_mb:.1f} MB of codes) at data generation {generation} in {time.time() - start:.2f}s")
+    print(f"   Saved to {args.output}; measure recall with scripts/benchmark_ivfpq_index.py")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)